@@ -4,13 +4,18 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 import streamlit as st
 import pandas as pd
-from src.config import get_agent
-from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.config import get_agent, get_repository
+from src.core.interfaces import IInvoiceStore
 from src.models import InvoiceStatus
 
 # Page Config must be the first Streamlit command
 st.set_page_config(page_title="Auto Invoice Reconciler", layout="wide", page_icon="🤖")
 
+@st.cache_resource
+def get_repo() -> IInvoiceStore:
+    # One repository (and its connections / pool) for the whole app, not per rerun
+    return get_repository()
+
 def main():
     st.title("")
 
@@ -24,32 +29,32 @@ def main():
             return
 
     # 2. Database Connection (For Sidebar & Analytics)
-    repo = SQLiteInvoiceRepository()
+    repo = get_repo()
 
     # --- SIDEBAR: DATABASE VIEW ---
     st.sidebar.header("Database Status")
     if st.sidebar.button("Refresh DB"):
         st.rerun()
 
-    invoices = repo.get_all_invoices()
-    
-    pending = [i for i in invoices if i.status == InvoiceStatus.PENDING]
-    received = [i for i in invoices if i.status == InvoiceStatus.RECEIVED]
+    # Counts come from one aggregate query; only the 10 rows shown are loaded
+    kpis = repo.get_kpi_totals()
+    pending_count = kpis["pending_count"]
+    received_count = kpis["received_count"]
     
-    st.sidebar.subheader(f"Pending ({len(pending)})")
+    st.sidebar.subheader(f"Pending ({pending_count})")
     # Show top 10 pending to avoid sidebar clutter
-    for p in pending[:10]:
+    for p in repo.get_invoice_page(status=InvoiceStatus.PENDING, limit=10).invoices:
         st.sidebar.text(f"{p.invoice_number} - {p.vendor_email}")
-    if len(pending) > 10:
-        st.sidebar.text(f"...and {len(pending)-10} more")
+    if pending_count > 10:
+        st.sidebar.text(f"...and {pending_count-10} more")
         
     st.sidebar.divider()
     
-    st.sidebar.subheader(f"Received ({len(received)})")
-    for r in received[:10]:
+    st.sidebar.subheader(f"Received ({received_count})")
+    for r in repo.get_invoice_page(status=InvoiceStatus.RECEIVED, limit=10).invoices:
         st.sidebar.success(f"{r.invoice_number}")
-    if len(received) > 10:
-        st.sidebar.text(f"...and {len(received)-10} more")
+    if received_count > 10:
+        st.sidebar.text(f"...and {received_count-10} more")
 
     # --- MAIN AREA: TABS ---
     tab1, tab2, tab3 = st.tabs(["🚀 Kickoff & Reminders", "🔄 Process Replies", "📊 Analytics Dashboard"])
@@ -137,6 +142,12 @@ def main():
                     if item.get('poc_update'):
                         st.warning(f"⚠️ POC Update Detected: {item['poc_update']}")
 
+                    if item.get('failed_documents'):
+                        st.warning(f"⚠️ Could not read: {', '.join(item['failed_documents'])}")
+
+                    if item.get('skipped_documents'):
+                        st.info(f"⏩ Not scanned (all pending invoices already found): {', '.join(item['skipped_documents'])}")
+
                     draft_text = st.text_area(
                         "Proposed Reply:", 
                         value=item['draft_reply'], 
@@ -163,46 +174,25 @@ def main():
     with tab3:
         st.subheader("📊 Daily Reconciliation Report")
         
-        # 1. Fetch Data
-        raw_invoices = repo.get_all_invoices()
-        
-        # 2. Convert to DataFrame
-        if not raw_invoices:
+        # 1. Aggregates (GROUP BY / LIMIT run in SQLite, only the small results come back)
+        if not kpis["received_count"] and not kpis["pending_count"]:
             st.warning("Database is empty.")
         else:
-            data = []
-            for i in raw_invoices:
-                data.append({
-                    "Invoice No": i.invoice_number,
-                    "Status": i.status.value,
-                    "Hotel": i.hotel_name,
-                    "Client": i.workspace,
-                    "Amount": i.amount,
-                    "GSTIN": i.gstin,
-                    # Fallback for old DB schema compatibility
-                    "Received Date": getattr(i, 'received_at', None) 
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # 3. Filter for Received
-            received_df = df[df["Status"] == "RECEIVED"].copy()
-            
-            # 4. KPI Cards
+            # 2. KPI Cards
             c1, c2, c3 = st.columns(3)
-            c1.metric("Total Received", len(received_df))
-            c2.metric("Total Value", f"${received_df['Amount'].sum():,.2f}")
-            c3.metric("Total Pending", len(df[df["Status"] == "PENDING"]))
+            c1.metric("Total Received", kpis["received_count"])
+            c2.metric("Total Value", f"${kpis['received_value']:,.2f}")
+            c3.metric("Total Pending", kpis["pending_count"])
 
             st.divider()
 
-            if not received_df.empty:
+            if kpis["received_count"]:
                 col_a, col_b = st.columns(2)
                 
                 with col_a:
                     st.markdown("### 🏢 Client Breakdown (Value)")
-                    client_stats = received_df.groupby("Client")["Amount"].sum().reset_index()
-                    client_stats = client_stats.sort_values(by="Amount", ascending=False)
+                    client_stats = pd.DataFrame(repo.get_client_breakdown(), columns=["workspace", "amount"])
+                    client_stats = client_stats.rename(columns={"workspace": "Client", "amount": "Amount"})
                     st.dataframe(
                         client_stats.style.format({"Amount": "${:,.2f}"}), 
                         use_container_width=True, 
@@ -211,10 +201,13 @@ def main():
 
                 with col_b:
                     st.markdown("### 🏨 Hotel / GST Breakdown")
-                    hotel_stats = received_df.groupby(["Hotel", "GSTIN"]).agg(
-                        Count=('Invoice No', 'count'),
-                        Total_Value=('Amount', 'sum')
-                    ).reset_index()
+                    hotel_stats = pd.DataFrame(
+                        repo.get_hotel_breakdown(),
+                        columns=["hotel_name", "gstin", "invoice_count", "total_value"]
+                    ).rename(columns={
+                        "hotel_name": "Hotel", "gstin": "GSTIN",
+                        "invoice_count": "Count", "total_value": "Total_Value"
+                    })
                     st.dataframe(
                         hotel_stats.style.format({"Total_Value": "${:,.2f}"}), 
                         use_container_width=True, 
@@ -222,7 +215,14 @@ def main():
                     )
                 
                 st.markdown("### 📜 Recent Transactions")
-                st.dataframe(received_df.tail(10), use_container_width=True, hide_index=True)
+                recent_df = pd.DataFrame(
+                    repo.get_recent_received(limit=10),
+                    columns=["invoice_number", "status", "hotel_name", "workspace", "amount", "gstin", "received_at"]
+                ).rename(columns={
+                    "invoice_number": "Invoice No", "status": "Status", "hotel_name": "Hotel",
+                    "workspace": "Client", "amount": "Amount", "gstin": "GSTIN", "received_at": "Received Date"
+                })
+                st.dataframe(recent_df, use_container_width=True, hide_index=True)
             else:
                 st.info("No invoices received yet. Statistics will appear here once data flows in.")
 
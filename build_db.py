@@ -2,12 +2,12 @@ import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.config import get_repository
 from src.models import Invoice, InvoiceStatus
 
 def seed_db():
     print("Seeding Database...")
-    repo = SQLiteInvoiceRepository()
+    repo = get_repository()
     
     # Dummy Expected Invoices
     # Note: Ensure the 'vendor_email' matches what your Gmail API will see (e.g., your own secondary email for testing)
@@ -17,8 +17,7 @@ def seed_db():
         Invoice(None, "INV-103", "vendor@example.com", 300.0, InvoiceStatus.PENDING),
     ]
     
-    for inv in dummies:
-        repo.add_invoice(inv)
+    repo.add_invoices(dummies)
         
     print(f"Seeded {len(dummies)} invoices.")
 
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import time
+import random
+from difflib import SequenceMatcher
+
+# Run from anywhere: add the repo root (one level up from 'dev_tools') to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import similarity
+from src.core.matching import normalize_invoice_id, FUZZY_THRESHOLD
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_config.json")
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+ROUNDS = 5
+
+
+def ocr_noise(invoice_id: str, rnd: random.Random) -> str:
+    """Applies 0-3 random substitutions / drops / insertions."""
+    chars = list(invoice_id)
+    for _ in range(rnd.randint(0, 3)):
+        op = rnd.random()
+        if op < 0.33 and chars:
+            chars[rnd.randrange(len(chars))] = rnd.choice(ALPHABET)
+        elif op < 0.66 and chars:
+            del chars[rnd.randrange(len(chars))]
+        else:
+            chars.insert(rnd.randrange(len(chars) + 1), rnd.choice(ALPHABET))
+    return "".join(chars)
+
+
+def build_pairs():
+    with open(CONFIG_FILE, 'r') as f:
+        invoice_ids = [normalize_invoice_id(i) for i in json.load(f).values()]
+
+    rnd = random.Random(42)
+    noisy = [ocr_noise(i, rnd) for i in invoice_ids]
+    # Every extracted ID against every expected ID, like a vendor-wide scan
+    return [(expected, extracted) for extracted in noisy for expected in invoice_ids]
+
+
+def bench(label, fn, pairs):
+    best = float("inf")
+    hits = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        hits = sum(1 for a, b in pairs if fn(a, b))
+        best = min(best, time.perf_counter() - start)
+    per_pair_us = best / len(pairs) * 1e6
+    print(f"   {label:<28} {best * 1000:8.1f} ms  ({per_pair_us:.2f} us/pair, {hits} matches)")
+    return best
+
+
+if __name__ == "__main__":
+    pairs = build_pairs()
+    print(f"⏱️  Fuzzy stage on {len(pairs)} realistic invoice-number pairs (best of {ROUNDS})")
+
+    baseline = bench("SequenceMatcher.ratio()", lambda a, b: SequenceMatcher(None, a, b).ratio() > FUZZY_THRESHOLD, pairs)
+    bound = bench("similarity.lcs_bound()", lambda a, b: similarity.lcs_bound(a, b) > FUZZY_THRESHOLD, pairs)
+    bounded = bench("similarity.matches()", lambda a, b: similarity.matches(a, b, FUZZY_THRESHOLD), pairs)
+
+    differing = sum(
+        1 for a, b in pairs
+        if similarity.matches(a, b, FUZZY_THRESHOLD) != (SequenceMatcher(None, a, b).ratio() > FUZZY_THRESHOLD)
+    )
+    print(f"   Speedup: lcs_bound {baseline / bound:.1f}x, matches {baseline / bounded:.1f}x")
+    print(f"   Decisions differing from SequenceMatcher: {differing}")
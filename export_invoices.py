@@ -0,0 +1,24 @@
+import argparse
+from src.config import get_repository
+from src.infra.invoice_export import export_invoices_csv
+from src.models import InvoiceStatus
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream invoices from the DB to a CSV file.")
+    parser.add_argument("out", help="Output CSV path")
+    parser.add_argument("--db", default="invoices.db", help="SQLite file (ignored when INVOICE_DB_URL is set)")
+    parser.add_argument("--status", choices=[s.value for s in InvoiceStatus])
+    parser.add_argument("--vendor", help="Vendor email (any of its registered contacts)")
+    args = parser.parse_args()
+
+    repo = get_repository(args.db)
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        count = export_invoices_csv(
+            repo, f,
+            status=InvoiceStatus(args.status) if args.status else None,
+            vendor_email=args.vendor
+        )
+    print(f"✅ Exported {count:,} invoices to {args.out}")
+
+if __name__ == "__main__":
+    main()
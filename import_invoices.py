@@ -0,0 +1,47 @@
+import os
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+import time
+import argparse
+from src.config import get_repository
+from src.infra.invoice_import import InvoiceImporter
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream an ERP export (CSV / JSONL) of expected invoices into the DB.")
+    parser.add_argument("path", help="Export file (.csv, .jsonl)")
+    parser.add_argument("--db", default="invoices.db", help="SQLite file (ignored when INVOICE_DB_URL is set)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Override detection by extension")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--offset", type=int, help="Start at this data row (overrides the saved checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start at row 0")
+    parser.add_argument("--keep-indexes", action="store_true", help="Maintain indexes during the load (slower)")
+    parser.add_argument("--keep-summary", action="store_true", help="Maintain the status summary per row instead of rebuilding it at the end (slower)")
+    args = parser.parse_args()
+
+    repo = get_repository(args.db)
+    started = time.time()
+
+    def report(progress):
+        rate = progress.imported / max(time.time() - started, 1e-6)
+        print(f"   ⏳ Row {progress.row_offset:,}: {progress.imported:,} imported, {progress.rejected:,} rejected ({rate:,.0f} rows/s)")
+
+    importer = InvoiceImporter(repo, chunk_size=args.chunk_size, on_progress=report)
+    print(f"📥 Importing {args.path} ...")
+    result = importer.import_file(
+        args.path,
+        fmt=args.format,
+        resume=not args.restart,
+        start_offset=args.offset,
+        defer_indexes=not args.keep_indexes,
+        defer_summary=not args.keep_summary
+    )
+
+    print(f"✅ Done in {time.time() - started:.1f}s: {result.imported:,} imported, {result.rejected:,} rejected.")
+    for row_number, reason in result.rejects[:20]:
+        print(f"   ❌ Row {row_number}: {reason}")
+    if result.rejected > 20:
+        print(f"   ...and {result.rejected - 20:,} more")
+
+if __name__ == "__main__":
+    main()
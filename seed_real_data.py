@@ -1,7 +1,7 @@
 import os
 import time
 from dotenv import load_dotenv
-from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.config import get_repository
 from src.infra.gemini import GeminiLLMProvider
 from src.infra.attachments import PdfAttachmentProcessor
 from src.models import Invoice, InvoiceStatus
@@ -14,17 +14,8 @@ def seed_real_data():
         print("❌ Error: GOOGLE_API_KEY not found.")
         return
 
-    # 1. Clean Slate: Delete old DB to remove "poisoned" OCR typos
-    if os.path.exists("invoices.db"):
-        try:
-            os.remove("invoices.db")
-            print("🗑️  Deleted old database to update schema and fix typos.")
-        except PermissionError:
-            print("❌ Error: Could not delete 'invoices.db'. Is the app running? Close it first.")
-            return
-
-    # 2. Initialize
-    repo = SQLiteInvoiceRepository() # Creates new table
+    # 1. Initialize (schema changes are applied in place by the repository's migrations)
+    repo = get_repository()
     llm = GeminiLLMProvider(api_key)
     processor = PdfAttachmentProcessor()
     
@@ -37,12 +28,18 @@ def seed_real_data():
     files = [f for f in os.listdir(s3_folder) if f.lower().endswith('.pdf')]
     print(f"📂 Found {len(files)} PDFs. Starting Vision Extraction...")
     
-    # 3. User Input
+    # 2. User Input
     sim_email = input("Enter your Test Sender Email Address (e.g., orionbee13@gmail.com): ").strip()
     if not sim_email:
         print("❌ Email required.")
         return
 
+    # 3. Clean Slate for this vendor only: drop old PENDING rows ("poisoned" OCR typos),
+    # keep everything already RECEIVED and every other vendor untouched
+    removed = repo.delete_pending_invoices(sim_email)
+    if removed:
+        print(f"🗑️  Removed {removed} old pending invoices for {sim_email}.")
+
     # 4. Processing Loop
     for idx, filename in enumerate(files):
         pdf_path = os.path.join(s3_folder, filename)
@@ -4,21 +4,71 @@ from dotenv import load_dotenv
 from src.infra.gmail import GmailProvider
 from src.infra.gemini import GeminiLLMProvider
 from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.infra.sqlalchemy_db import SQLAlchemyInvoiceRepository
+from src.infra.cached_repo import CachingInvoiceRepository
 from src.infra.faiss_db import FAISSVectorStore
+from src.infra.message_ledger import SQLiteProcessedLedger
+from src.infra.extraction_cache import SQLiteExtractionCache
+from src.infra.work_table import SQLiteWorkTable
 from src.infra.attachments import PdfAttachmentProcessor
 from src.core.agent import InvoiceAgent
+from src.core.interfaces import IInvoiceStore
+from src.core.rate_limit import RateLimiter
 
 load_dotenv()
 
+def get_repository(sqlite_path: str = "invoices.db") -> IInvoiceStore:
+    # INVOICE_DB_URL (e.g. postgresql+psycopg://...) lets several workers and the UI share one server DB
+    db_url = os.getenv("INVOICE_DB_URL")
+    if db_url:
+        return SQLAlchemyInvoiceRepository(
+            db_url,
+            pool_size=int(os.getenv("INVOICE_DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("INVOICE_DB_MAX_OVERFLOW", "10"))
+        )
+    return SQLiteInvoiceRepository(sqlite_path)
+
 def get_agent() -> InvoiceAgent:
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in .env")
 
+    # Local agent state (ledger, extraction cache, checkpoints), whatever the invoice DB is
+    state_db = os.getenv("AGENT_STATE_DB", "agent_state.db")
+
+    # Off by default: a cycle already loads each vendor's pending set once, so the cache
+    # only saves queries between cycles of one scheduler process. It is not shared and only
+    # sees this process's writes: receipts from the UI, another worker or an import stay
+    # invisible here for up to PENDING_CACHE_TTL_SECONDS (stale pending sets, wrong drafts).
+    db = get_repository()
+    pending_ttl = float(os.getenv("PENDING_CACHE_TTL_SECONDS", "0"))
+    if pending_ttl > 0:
+        db = CachingInvoiceRepository(db, ttl_seconds=pending_ttl)
+
     return InvoiceAgent(
         email_provider=GmailProvider(),
         llm_provider=GeminiLLMProvider(api_key=api_key),
-        db=SQLiteInvoiceRepository(),
+        db=db,
         vector_store=FAISSVectorStore(),
-        attachment_processor=PdfAttachmentProcessor()
+        attachment_processor=PdfAttachmentProcessor(),
+        optimal_matching=os.getenv("OPTIMAL_MATCHING", "false").lower() == "true",
+        max_workers=int(os.getenv("AGENT_MAX_WORKERS", "1")),
+        extraction_concurrency=int(os.getenv("EXTRACTION_CONCURRENCY", "1")),
+        # Emails buffered between pipeline stages (bounds memory on large inboxes)
+        pipeline_queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "4")),
+        ledger=SQLiteProcessedLedger(state_db),
+        extraction_cache=SQLiteExtractionCache(
+            state_db,
+            max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_MB", "50")) * 1024 * 1024
+        ),
+        checkpoints=SQLiteWorkTable(state_db),
+        # Cycles an email may fail in (deleted message, API errors) before it is given up on
+        max_attempts=int(os.getenv("MAX_EMAIL_ATTEMPTS", "3")),
+        # cycle_report.json + metrics.prom (node_exporter textfile collector) after every cycle
+        metrics_dir=os.getenv("METRICS_DIR"),
+        # Vision calls per second across all workers (0 = unlimited)
+        llm_rate_limiter=RateLimiter(
+            rate=float(os.getenv("LLM_REQUESTS_PER_SECOND", "0")),
+            burst=int(os.getenv("LLM_REQUEST_BURST", "1"))
+        )
     )
\ No newline at end of file
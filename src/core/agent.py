@@ -1,13 +1,105 @@
 import re
 import os
+import hashlib
+import itertools
+import threading
 import zipfile
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Iterator
 from src.core.interfaces import (
     IEmailProvider, ILLMProvider, IInvoiceRepository, 
-    IAttachmentProcessor, IVectorStore
+    IAttachmentProcessor, IVectorStore, IProcessedLedger, IExtractionCache,
+    IWorkCheckpoints
 )
 from src.core.logic import ReconciliationService
-from src.models import InvoiceStatus, ExtractedInvoiceData
+from src.core.matching import InvoiceMatchIndex, find_invoice_ids_in_text, invoice_id_candidates
+from src.core.rate_limit import RateLimiter
+from src.core.pipeline import Stage, run_pipeline
+from src.core.metrics import CycleMetrics
+from src.models import (
+    Invoice, InvoiceStatus, ExtractedInvoiceData, EmailMessage, ReconciliationResult, InvoiceReceipt,
+    MessageOutcome, ProcessedAttachment, EmailCheckpoint
+)
+
+# Candidate keys per cross-vendor lookup when scanning a forward's text layers
+TEXT_KEY_LOOKUP_BATCH = 500
+# Worker threads per pipeline stage; download/text/rasterize/extract/draft default to max_workers
+DEFAULT_PIPELINE_WORKERS = {"download": 1, "unpack": 1, "text": 1, "rasterize": 1, "extract": 1, "draft": 1}
+
+
+@dataclass
+class _CycleState:
+    """Live per-vendor pending sets for one cycle, owned by the (single) reconcile step."""
+    pending: Dict[str, List[Invoice]] = field(default_factory=dict)
+    own_ids: Dict[str, set] = field(default_factory=dict)
+    claimed: set = field(default_factory=set)   # Invoice ids received during this cycle
+    # Per-vendor pending rows as first loaded this cycle (one query per vendor),
+    # shared by the extraction workers and the reconcile step
+    snapshots: Dict[str, List[Invoice]] = field(default_factory=dict)
+    # Per sender: do other vendors have pending invoices (cross-vendor matches possible)?
+    others_pending: Dict[str, bool] = field(default_factory=dict)
+    snapshot_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass
+class _Document:
+    """One PDF of an email and how far its extraction got."""
+    path: str
+    sha256: Optional[str] = None
+    images: Optional[List[str]] = None
+    data: Optional[ExtractedInvoiceData] = None
+    error: Optional[Exception] = None
+    # Where `data` came from: "ledger", "cache", "checkpoint", "text", "vision"; "skipped" once
+    # every pending invoice was already found (no data, never scanned)
+    source: Optional[str] = None
+
+
+
+@dataclass
+class _EmailWork:
+    """One email travelling through the pipeline stages."""
+    email: Optional[EmailMessage]
+    state: _CycleState
+    message_id: str = ""
+    attempt: int = 1                 # Cycles that started this email, this one included
+    # A stage failed: the remaining stages skip the email and it is retried next cycle
+    error: Optional[Exception] = None
+    documents: List[_Document] = field(default_factory=list)
+    # Sender's pending invoice numbers (loaded on first use) and the match
+    # index over them that tracks which ones the documents already cover
+    expected: Optional[List[str]] = None
+    match_index: Optional[InvoiceMatchIndex] = None
+    extraction: Optional[Tuple[List[str], Optional[str], bool, List[str]]] = None
+    entry: Optional[Dict] = None
+    receipts: List[InvoiceReceipt] = field(default_factory=list)
+    draft_request: Optional[Dict] = None
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    """Hex SHA-256 of a file's bytes (None if it cannot be read)."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _message_outcome(entry: Dict) -> MessageOutcome:
+    """Ledger outcome of a report entry (see _reconcile_email for the shapes)."""
+    if "received" not in entry:
+        return MessageOutcome.NO_PENDING
+    if entry.get("status", "").startswith("🔴 MANUAL REVIEW"):
+        return MessageOutcome.MANUAL_REVIEW
+    if "status" in entry:
+        return MessageOutcome.NO_ATTACHMENTS
+    if entry.get("failed_documents"):
+        return MessageOutcome.PARTIAL
+    return MessageOutcome.RECONCILED
+
 
 class InvoiceAgent:
     def __init__(
@@ -16,13 +108,46 @@ class InvoiceAgent:
         llm_provider: ILLMProvider,
         db: IInvoiceRepository,
         vector_store: IVectorStore,
-        attachment_processor: IAttachmentProcessor
+        attachment_processor: IAttachmentProcessor,
+        optimal_matching: bool = False,
+        max_workers: int = 1,
+        extraction_concurrency: int = 1,
+        llm_rate_limiter: Optional[RateLimiter] = None,
+        pipeline_workers: Optional[Dict[str, int]] = None,
+        pipeline_queue_size: int = 4,
+        ledger: Optional[IProcessedLedger] = None,
+        extraction_cache: Optional[IExtractionCache] = None,
+        checkpoints: Optional[IWorkCheckpoints] = None,
+        metrics_dir: Optional[str] = None,
+        max_attempts: int = 3
     ):
         self.email = email_provider
         self.llm = llm_provider
         self.db = db
         self.vector_store = vector_store
         self.processor = attachment_processor
+        # Batch one-to-one assignment instead of first-match-wins (see ReconciliationService)
+        self.optimal_matching = optimal_matching
+        # Default worker count of the download / text / rasterize / extract / draft stages
+        self.max_workers = max(1, max_workers)
+        # Documents of ONE email extracted in parallel; the limiter is the request
+        # budget for the vision API shared by every worker
+        self.extraction_concurrency = max(1, extraction_concurrency)
+        self.llm_rate_limiter = llm_rate_limiter
+        # Streaming cycle: per-stage worker overrides and the bound on each stage's input queue
+        self.pipeline_workers = dict(pipeline_workers or {})
+        self.pipeline_queue_size = pipeline_queue_size
+        # Processed messages / attachment hashes: reruns skip finished work
+        self.ledger = ledger
+        # PDF hash -> extraction: re-sent invoices skip rasterizing and the vision call
+        self.extraction_cache = extraction_cache
+        # In-flight emails: per-document results + reconcile outcome survive a restart
+        self.checkpoints = checkpoints
+        # Cycles an email may fail in (fetch, stage error) before it is given up on
+        self.max_attempts = max(1, max_attempts)
+        # Spans / counters of the current (or last) cycle; exported to metrics_dir if set
+        self.metrics = CycleMetrics()
+        self.metrics_dir = metrics_dir
 
     def _extract_email_address(self, sender_string: str) -> str:
         """Helper to extract 'email@domain.com' from 'Name <email@domain.com>'"""
@@ -91,6 +216,7 @@ class InvoiceAgent:
             subject=f"Action Required: GST Tax Invoices Required | {len(pending_invoices)} Pending",
             body=html_body
         )
+        self.db.record_kickoff(vendor_email, thread_id, [inv.id for inv in pending_invoices])
         return f"Request sent! Thread ID: {thread_id}"
 
     def run_daily_reminders(self) -> List[str]:
@@ -129,141 +255,708 @@ class InvoiceAgent:
             
         return reminded_vendors
 
-    def run_reconciliation_cycle(self) -> List[Dict]:
+    def run_reconciliation_cycle(self, limit: int = 5) -> List[Dict]:
+        """
+        Streams unread emails through a staged pipeline with bounded queues:
+        download -> unpack -> text -> rasterize -> extract -> reconcile -> draft,
+        then commits the cycle's receipts once per vendor (see _persist).
+
+        Each stage has its own workers (`pipeline_workers`); a slow stage fills
+        its input queue and stalls the ones before it, so only a bounded number
+        of emails (and their attachments) are in memory however big the inbox is.
+        Reconcile runs on one thread in fetch order against live per-vendor
+        pending sets, so the report order and matching are deterministic.
+        """
         print("\n" + "="*40)
         print("⚡ STARTING RECONCILIATION CYCLE")
-        
-        report = []
-        emails = self.email.fetch_unread_emails()
-        
-        print(f"📧 FOUND {len(emails)} UNREAD EMAILS")
 
-        for email in emails:
-            print(f"👉 Processing email from: {email.sender}")
-            
-            clean_sender = self._extract_email_address(email.sender)
-            pending_invoices = self.db.get_pending_invoices_by_sender(clean_sender)
-            
-            if not pending_invoices:
-                print("   ❌ No pending invoices found.")
-                report.append({
-                    "thread_id": email.thread_id, 
-                    "sender": email.sender, 
-                    "status": f"Log: No pending invoices for {clean_sender}"
-                })
+        state = _CycleState()
+        report = self._run_stages(
+            self._unprocessed_message_ids(limit), "download",
+            lambda message_id: self._stage_download(state, message_id), state
+        )
+
+        print(f"📧 PROCESSED {len(report)} UNREAD EMAILS")
+        print("="*40 + "\n")
+        return report
+
+    def reconcile_many(self, emails: List[EmailMessage]) -> List[Dict]:
+        """
+        Reconciles a batch of already fetched emails through the same stages
+        as run_reconciliation_cycle (no listing, download or ledger skip).
+
+        Each vendor's pending set is loaded once and shared by all of its emails
+        (in arrival order), so a second reply sees what the first one matched.
+        Status changes are committed once per vendor. Report order follows `emails`.
+        """
+        state = _CycleState()
+        return self._run_stages(emails, "receive", lambda email: self._stage_receive(state, email), state)
+
+    def _run_stages(self, source, first_name: str, first_fn, state: "_CycleState") -> List[Dict]:
+        """Runs `source` through `first_fn` and the shared stages, then persists the batch."""
+        metrics = self.metrics = CycleMetrics()
+        workers = dict(DEFAULT_PIPELINE_WORKERS, **{
+            name: self.max_workers for name in ("download", "text", "rasterize", "extract", "draft")
+        })
+        workers.update(self.pipeline_workers)
+
+        stages = [
+            Stage(first_name, first_fn, workers.get(first_name, 1), self.pipeline_queue_size),
+            Stage("unpack", self._stage_unpack, workers["unpack"], self.pipeline_queue_size),
+            Stage("text", self._stage_text, workers["text"], self.pipeline_queue_size),
+            Stage("rasterize", self._stage_rasterize, workers["rasterize"], self.pipeline_queue_size),
+            Stage("extract", self._stage_extract, workers["extract"], self.pipeline_queue_size),
+            Stage("reconcile", self._stage_reconcile, 1, self.pipeline_queue_size, ordered=True),
+            Stage("draft", self._stage_draft, workers["draft"], self.pipeline_queue_size),
+        ]
+        # The first stage turns a source item into an _EmailWork and isolates its own errors
+        for stage in stages[1:]:
+            stage.fn = self._isolated(stage.name, stage.fn)
+        for stage in stages:
+            stage.fn = metrics.timed(f"stage.{stage.name}", stage.fn)
+
+        works = []
+        try:
+            for work in run_pipeline(source, stages):
+                works.append(work)
+            self._persist(works)
+        finally:
+            metrics.incr("emails_processed", len(works))
+            self._finish_metrics()
+        return [work.entry for work in works]
+
+    def _unprocessed_message_ids(self, limit: int) -> Iterator[str]:
+        """
+        Up to `limit` message IDs to process: emails an interrupted cycle left
+        unfinished first, then unread mail the ledger doesn't have yet.
+        """
+        resumed = self.checkpoints.in_progress() if self.checkpoints else []
+        if resumed:
+            print(f"   🔁 Resuming {len(resumed)} interrupted emails")
+
+        # Recorded mail is flagged (mark_processed) and not listed again; the rest of
+        # the listing is walked lazily, only as far as `limit` fresh emails
+        listing = self.metrics.timed_iter(
+            "gmail.list_unread_message_ids", self.email.list_unread_message_ids(None if self.ledger else limit)
+        )
+        seen = set()
+        skipped = 0
+        fresh = 0
+        for message_id in itertools.chain(resumed, listing):
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+            if self.ledger and self.ledger.is_processed(message_id):
+                if message_id in resumed:
+                    self.checkpoints.finish(message_id)   # Recorded, but died before cleanup
+                else:
+                    skipped += 1
+                    self.metrics.incr("emails_skipped_processed")
+                self._mark_processed(message_id)   # Died before flagging it (or recorded before flags)
                 continue
+            if message_id in resumed and self.checkpoints.attempts(message_id) >= self.max_attempts:
+                self._give_up(message_id)
+                continue
+            if message_id in resumed:
+                self.metrics.incr("emails_resumed")
+            yield message_id
+            fresh += 1
+            if fresh >= limit:
+                break
+        if skipped:
+            print(f"   ⏭️  Skipped {skipped} already-processed emails")
+
+    def _give_up(self, message_id: str):
+        """Stops retrying an email that failed `max_attempts` cycles in a row (deleted, unreadable...)."""
+        print(f"   🛑 Giving up on email {message_id} after {self.max_attempts} failed attempts")
+        self.metrics.incr("emails_abandoned")
+        if self.ledger:
+            self.ledger.record_message(message_id, "", "", MessageOutcome.FAILED, [])
+            self._mark_processed(message_id)
+        self.checkpoints.finish(message_id)
+
+    def _mark_processed(self, message_id: str):
+        with self.metrics.span("gmail.mark_processed"):
+            self.email.mark_processed(message_id)
+
+    def _isolated(self, name: str, fn):
+        """
+        Wraps a stage so an error only fails its own email: the rest of the
+        stages pass it through, it is reported, left unrecorded and retried.
+        """
+        def run(work: "_EmailWork") -> "_EmailWork":
+            if work.error is not None:
+                return work
+            try:
+                return fn(work)
+            except Exception as e:
+                print(f"   ❌ {name} failed for email {work.message_id} (attempt {work.attempt}): {e}")
+                self.metrics.incr("emails_failed")
+                work.error = e
+                work.entry = {
+                    "thread_id": work.email.thread_id if work.email else None,
+                    "sender": work.email.sender if work.email else None,
+                    "status": f"Log: {name} failed for email {work.message_id}, will retry: {e}"
+                }
+                return work
+        return run
+
+    # --- PIPELINE STAGES (each takes and returns one _EmailWork) ---
+    def _stage_download(self, state: "_CycleState", message_id: str) -> "_EmailWork":
+        # Started before the fetch so a message that can't be fetched still counts its attempts
+        return self._isolated("download", self._fetch)(self._start_work(state, message_id))
+
+    def _fetch(self, work: "_EmailWork") -> "_EmailWork":
+        work.email = self.email.fetch_email(work.message_id)
+        return work
+
+    def _stage_receive(self, state: "_CycleState", email: EmailMessage) -> "_EmailWork":
+        work = self._start_work(state, email.id)
+        work.email = email
+        return work
+
+    def _start_work(self, state: "_CycleState", message_id: str) -> "_EmailWork":
+        attempt = self.checkpoints.start(message_id) if self.checkpoints else 1
+        return _EmailWork(email=None, state=state, message_id=message_id, attempt=attempt)
+
+    def _stage_unpack(self, work: "_EmailWork") -> "_EmailWork":
+        work.documents = self._collect_documents(work.email)
+        return work
+
+    def _stage_text(self, work: "_EmailWork") -> "_EmailWork":
+        if work.documents:
+            self._read_text_layers(work)
+        return work
+
+    def _stage_rasterize(self, work: "_EmailWork") -> "_EmailWork":
+        if work.documents:
+            print(f"   📄 PDFs to process: {len(work.documents)}")
+            self._rasterize_documents(work)
+        return work
+
+    def _stage_extract(self, work: "_EmailWork") -> "_EmailWork":
+        if work.documents:
+            self._scan_documents(work)
+            work.extraction = self._merge_extraction(work.documents)
+        return work
+
+    def _stage_reconcile(self, work: "_EmailWork") -> "_EmailWork":
+        saved = self.checkpoints.load_result(work.email.id) if self.checkpoints else None
+        # An outcome with unreadable PDFs is redone: the retry may read them this time
+        if saved and not saved.entry.get("failed_documents"):
+            # Reconciled before a restart: reuse the outcome (its receipts may not be committed yet)
+            work.entry, work.receipts, work.draft_request = saved.entry, saved.receipts, saved.draft_request
+            self._claim(work.state, {r.invoice_id for r in saved.receipts})
+            return work
 
-            # --- STEP 1: COLLECT PDF PATHS (Don't process yet) ---
-            pdf_queue = []
-            has_zip = False
+        work.entry, work.receipts, work.draft_request = self._reconcile_email(
+            work.state, work.email, work.documents, work.extraction
+        )
+        if self.checkpoints:
+            # Saved BEFORE the commit: a crash in between replays the (idempotent) receipts
+            self.checkpoints.save_result(
+                work.email.id, EmailCheckpoint(work.entry, work.receipts, work.draft_request)
+            )
+        return work
+
+    def _stage_draft(self, work: "_EmailWork") -> "_EmailWork":
+        if work.draft_request:
+            work.entry["draft_reply"] = self._draft_reply(work.draft_request)
+        return work
+
+    def _persist(self, works: List["_EmailWork"]):
+        """
+        Commits the batch's receipts in one pass per vendor (emails grouped by
+        clean sender), then marks each email processed. Reconcile claims every
+        invoice once, so no two groups touch the same row. A crash before this
+        point replays the receipts from the saved reconcile outcomes.
+        """
+        by_vendor: Dict[str, List[_EmailWork]] = {}
+        for work in works:
+            sender = self._extract_email_address(work.email.sender) if work.email else ""
+            by_vendor.setdefault(sender, []).append(work)
+
+        for group in by_vendor.values():
+            with self.metrics.span("stage.persist"):
+                # Receipts exist once reconcile succeeded: a later failure (draft) doesn't void them
+                self._commit_receipts([receipt for work in group for receipt in work.receipts])
+                for work in group:
+                    # Checkpoint kept: retried next cycle, up to max_attempts
+                    if work.error is not None or not self._record_processed(work):
+                        continue
+                    if self.checkpoints:
+                        self.checkpoints.finish(work.email.id)
+
+    @staticmethod
+    def _claim(state: "_CycleState", invoice_ids: set):
+        """Marks invoices as received this cycle and drops them from the live pending sets."""
+        state.claimed.update(invoice_ids)
+        for sender, pending in state.pending.items():
+            state.pending[sender] = [inv for inv in pending if inv.id not in invoice_ids]
+
+    def _commit_receipts(self, receipts: List[InvoiceReceipt]):
+        with self.metrics.span("db.mark_many_as_received"):
+            self.db.mark_many_as_received(receipts)
+        self.metrics.incr("invoices_received", len(receipts))
+
+    def _draft_reply(self, draft_request: Dict) -> str:
+        with self.metrics.span("llm.draft_reply"):
+            return self.llm.draft_reply(**draft_request)
+
+    def _finish_metrics(self):
+        """Closes the cycle's metrics and, if configured, writes the JSON / Prometheus files."""
+        self.metrics.finish()
+        report = self.metrics.report()
+        if report["bottleneck"]:
+            print(f"⏱️  Cycle took {report['duration_seconds']:.2f}s, slowest stage: {report['bottleneck']}")
+        if self.metrics_dir:
+            try:
+                self.metrics.write(self.metrics_dir)
+            except OSError as e:
+                print(f"   ❌ Could not write metrics: {e}")
+
+    def _collect_pdf_queue(self, email: EmailMessage) -> List[str]:
+        """Collects PDF paths from the attachments, unpacking ZIPs next to them."""
+        pdf_queue = []
+        
+        for attachment_path in email.attachments:
+            ext = attachment_path.lower()
             
-            for attachment_path in email.attachments:
-                ext = attachment_path.lower()
-                
-                if ext.endswith(".pdf"):
-                    pdf_queue.append(attachment_path)
-                
-                elif ext.endswith(".zip"):
-                    has_zip = True
-                    print(f"   📦 Unzipping: {attachment_path}")
-                    try:
-                        extract_path = os.path.dirname(attachment_path)
-                        with zipfile.ZipFile(attachment_path, 'r') as zip_ref:
-                            zip_ref.extractall(extract_path)
-                            for filename in zip_ref.namelist():
-                                # Only process PDFs (ignore Mac junk/other files)
-                                if filename.lower().endswith(".pdf") and not filename.startswith('__MACOSX'):
-                                    full_path = os.path.join(extract_path, filename)
-                                    pdf_queue.append(full_path)
-                    except Exception as e:
-                        print(f"   ❌ Error unzipping: {e}")
-
-            # --- STEP 2: TRIAGE (Links / Empty) ---
-            body_lower = email.body.lower()
-            has_link = "http" in body_lower or "www." in body_lower or "drive.google" in body_lower
-
-            if not pdf_queue and has_link:
-                report.append({
-                    "thread_id": email.thread_id, "sender": email.sender,
-                    "received": [], "missing": [], "draft_reply": "",
-                    "status": "🔴 MANUAL REVIEW: External Link Detected", "poc_update": None
-                })
-                continue
+            if ext.endswith(".pdf"):
+                pdf_queue.append(attachment_path)
+            
+            elif ext.endswith(".zip"):
+                print(f"   📦 Unzipping: {attachment_path}")
+                try:
+                    extract_path = os.path.dirname(attachment_path)
+                    with self.metrics.span("zip.extract"), zipfile.ZipFile(attachment_path, 'r') as zip_ref:
+                        zip_ref.extractall(extract_path)
+                        for filename in zip_ref.namelist():
+                            # Only process PDFs (ignore Mac junk/other files)
+                            if filename.lower().endswith(".pdf") and not filename.startswith('__MACOSX'):
+                                full_path = os.path.join(extract_path, filename)
+                                pdf_queue.append(full_path)
+                except Exception as e:
+                    print(f"   ❌ Error unzipping: {e}")
 
-            if not pdf_queue:
-                missing_numbers = [inv.invoice_number for inv in pending_invoices]
-                draft = self.llm.draft_reply(
-                    sender=email.sender, missing_invoices=missing_numbers, received_invoices=[], 
-                    context="The sender replied but forgot to attach files."
-                )
-                report.append({
-                    "thread_id": email.thread_id, "sender": email.sender,
-                    "received": [], "missing": missing_numbers, "draft_reply": draft,
-                    "status": "Drafting: No Attachments", "poc_update": None
-                })
+        return pdf_queue
+
+    def _collect_documents(self, email: EmailMessage) -> List["_Document"]:
+        """
+        The email's PDFs as documents, hashed when there is a ledger or cache.
+        A PDF the ledger saw before reuses its invoice IDs; otherwise a cached
+        extraction of the same bytes (same model + prompt) is used, or the
+        checkpoint an interrupted cycle left for this email. Either way it
+        skips rasterizing and the vision call.
+        """
+        documents = [_Document(path) for path in self._collect_pdf_queue(email)]
+
+        if self.ledger or self.extraction_cache:
+            version = self.llm.extraction_version()
+            for doc in documents:
+                doc.sha256 = _file_sha256(doc.path)
+                if not doc.sha256:
+                    continue
+                known = self.ledger.get_attachment(doc.sha256) if self.ledger else None
+                if known and not known.failed:
+                    doc.data = ExtractedInvoiceData(invoice_numbers=list(known.invoice_numbers), detected_poc_change=False)
+                    doc.source = "ledger"
+                elif self.extraction_cache:
+                    doc.data = self.extraction_cache.get(doc.sha256, version)
+                    doc.source = "cache" if doc.data else None
+
+        if self.checkpoints:
+            saved = self.checkpoints.load_documents(email.id)
+            for doc in documents:
+                if doc.data is None and doc.path in saved:
+                    doc.data, doc.source = saved[doc.path], "checkpoint"
+
+        for source, label in (
+            ("ledger", "already processed"),
+            ("cache", "found in extraction cache"),
+            ("checkpoint", "restored from checkpoint"),
+        ):
+            count = sum(1 for doc in documents if doc.source == source)
+            if count:
+                print(f"   ♻️  {count}/{len(documents)} PDFs {label}, skipping OCR")
+        return documents
+
+    def _fan_out(self, fn, items: List) -> List[Tuple[object, Optional[Exception]]]:
+        """
+        (result, error) for fn over one email's documents, up to
+        `extraction_concurrency` at a time, in input order. A document that
+        raises only fails itself.
+        """
+        def run(item):
+            try:
+                return fn(item), None
+            except Exception as e:
+                return None, e
+
+        if self.extraction_concurrency == 1 or len(items) < 2:
+            return [run(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.extraction_concurrency, len(items))) as pool:
+            return list(pool.map(run, items))
+
+    def _vendor_snapshot(self, state: "_CycleState", clean_sender: str) -> List[Invoice]:
+        """The sender's pending invoices as first loaded this cycle (one query per vendor)."""
+        with state.snapshot_lock:
+            if clean_sender not in state.snapshots:
+                with self.metrics.span("db.get_pending_invoices_by_sender"):
+                    state.snapshots[clean_sender] = self.db.get_pending_invoices_by_sender(clean_sender)
+            return state.snapshots[clean_sender]
+
+    def _others_pending(self, state: "_CycleState", clean_sender: str) -> bool:
+        """Whether any other vendor has pending invoices, checked once per sender per cycle."""
+        with state.snapshot_lock:
+            if clean_sender not in state.others_pending:
+                with self.metrics.span("db.has_pending_from_other_vendors"):
+                    state.others_pending[clean_sender] = self.db.has_pending_from_other_vendors(clean_sender)
+            return state.others_pending[clean_sender]
+
+    def _pending_numbers(self, work: "_EmailWork") -> List[str]:
+        """The sender's pending invoice numbers when this email's extraction started."""
+        if work.expected is None:
+            clean_sender = self._extract_email_address(work.email.sender)
+            # Reconcile flips statuses on these same objects; already received ones are dropped
+            work.expected = [
+                inv.invoice_number for inv in self._vendor_snapshot(work.state, clean_sender)
+                if inv.status == InvoiceStatus.PENDING
+            ]
+            work.match_index = InvoiceMatchIndex(work.expected) if work.expected else None
+        return work.expected
+
+    def _read_text_layers(self, work: "_EmailWork"):
+        """
+        Fast path: a digitally generated PDF carries its invoice numbers in its
+        text layer. A document whose text contains any of the sender's pending
+        numbers (strict / normalized match) is settled here and never
+        rasterized or sent to the vision model.
+
+        A sender with nothing pending (forward, newsletter...) can only match
+        other vendors' invoices (cross-vendor fallback), so its PDFs must earn
+        the vision call: none is read while no vendor has anything pending,
+        and one whose text layer holds no pending number of any vendor is
+        settled as empty. Only scanned PDFs (no text layer) go on to vision.
+        """
+        documents = work.documents
+        todo = [doc for doc in documents if doc.data is None and doc.error is None]
+        if not todo:
+            return
+        forward = not self._pending_numbers(work)
+        if forward and not self._others_pending(work.state, self._extract_email_address(work.email.sender)):
+            for doc in todo:
+                doc.source = "skipped"
+            print(f"   ⏩ Nothing pending for any vendor: skipped {len(todo)} PDFs")
+            return
+
+        extract_text = self.metrics.timed("processor.extract_text", self.processor.extract_text)
+        texts = self._fan_out(lambda doc: extract_text(doc.path), todo)
+        # Scanned PDFs (no text layer at all) don't need the pending lookup
+        if not any(text and text.strip() for text, _ in texts):
+            return
+
+        expected = self._other_vendors_numbers([text for text, _ in texts]) if forward else self._pending_numbers(work)
+        for doc, (text, _) in zip(todo, texts):
+            found = find_invoice_ids_in_text(text or "", expected)
+            if found or (forward and text and text.strip()):
+                doc.data = ExtractedInvoiceData(invoice_numbers=found, detected_poc_change=False)
+                doc.source = "text"
+
+        settled = sum(1 for doc in todo if doc.source == "text")
+        if settled:
+            print(f"   📝 {settled}/{len(documents)} PDFs read from their text layer, skipping OCR")
+
+    def _other_vendors_numbers(self, texts: List[Optional[str]]) -> List[str]:
+        """Pending invoice numbers (any vendor) whose normalized key appears in one of the texts."""
+        keys = list(dict.fromkeys(key for text in texts for key in invoice_id_candidates(text or "")))
+        numbers: List[str] = []
+        with self.metrics.span("db.find_pending_by_invoice_keys"):
+            for start in range(0, len(keys), TEXT_KEY_LOOKUP_BATCH):
+                batch = keys[start:start + TEXT_KEY_LOOKUP_BATCH]
+                numbers.extend(inv.invoice_number for inv in self.db.find_pending_by_invoice_keys(batch))
+        return numbers
+
+    def _skip_if_all_found(self, work: "_EmailWork") -> bool:
+        """
+        Early termination: once the documents read so far account for every
+        invoice the sender has pending, the unread rest (duplicates, invoices
+        we never asked for) are marked "skipped" instead of being scanned.
+        Only while no other vendor has anything pending: otherwise the rest
+        may hold their invoices (cross-vendor fallback) and is read in full,
+        as are the emails of senders with nothing pending (forwards).
+        """
+        if not self._pending_numbers(work):
+            return False
+        if self._others_pending(work.state, self._extract_email_address(work.email.sender)):
+            return False
+
+        outstanding = set(range(len(work.match_index)))
+        for doc in work.documents:
+            for invoice_id in (doc.data.invoice_numbers if doc.data else ()):
+                outstanding.discard(work.match_index.find_position(invoice_id))
+        if outstanding:
+            return False
+
+        for doc in work.documents:
+            if doc.data is None and doc.error is None and doc.source is None:
+                doc.source = "skipped"
+        return True
+
+    def _rasterize_documents(self, work: "_EmailWork"):
+        """Fills `images` (or `error`) for every document still without a result."""
+        documents = work.documents
+        self._skip_if_all_found(work)
+        todo = [(i, doc) for i, doc in enumerate(documents) if doc.data is None and doc.error is None and doc.source is None]
+
+        def rasterize(item):
+            index, doc = item
+            print(f"      [{index+1}/{len(documents)}] Converting...")
+            with self.metrics.span("processor.convert_pdf_to_images"):
+                return self.processor.convert_pdf_to_images(doc.path)
+
+        for (_, doc), (images, error) in zip(todo, self._fan_out(rasterize, todo)):
+            doc.images, doc.error = images, error
+
+    def _scan_documents(self, work: "_EmailWork"):
+        """
+        One vision call per rasterized document still without a result, in
+        waves of `extraction_concurrency`; after each wave the rest may be
+        skipped (see _skip_if_all_found).
+        """
+        email, documents = work.email, work.documents
+        # Documents that failed to rasterize or produced no pages are not sent
+        todo = [
+            (i, doc) for i, doc in enumerate(documents)
+            if doc.data is None and doc.error is None and doc.source is None and doc.images
+        ]
+
+        def extract(item):
+            index, doc = item
+            print(f"      [{index+1}/{len(documents)}] Scanning...")
+            if self.llm_rate_limiter:
+                with self.metrics.span("rate_limiter.wait"):
+                    self.llm_rate_limiter.acquire()
+            # Send ONLY this document's images to Gemini
+            # This prevents "Lazy AI" issues with large batches
+            with self.metrics.span("llm.extract_invoice_data"):
+                return self.llm.extract_invoice_data(email.body, doc.images)
+
+        version = self.llm.extraction_version()
+        for start in range(0, len(todo), self.extraction_concurrency):
+            if self._skip_if_all_found(work):
+                break
+            wave = todo[start:start + self.extraction_concurrency]
+            for (_, doc), (data, error) in zip(wave, self._fan_out(extract, wave)):
+                doc.data, doc.error = data, error
+                if data is None:
+                    continue
+                doc.source = "vision"
+                # An empty result is a real one (cover letter, T&C): provider errors raise instead
+                if self.checkpoints:
+                    self.checkpoints.save_document(email.id, doc.path, data)
+                if self.extraction_cache and doc.sha256:
+                    self.extraction_cache.put(doc.sha256, version, data)
+
+        skipped = sum(1 for doc in documents if doc.source == "skipped")
+        if skipped:
+            print(f"   ⏩ All pending invoices found: skipped {skipped} PDFs ({skipped} vision calls saved)")
+
+    def _merge_extraction(self, documents: List["_Document"]) -> Tuple[List[str], Optional[str], bool, List[str]]:
+        """
+        Merges per-document results in queue order.
+        Returns (invoice IDs, POC details, POC changed, failed PDF paths).
+        """
+        all_found_invoices = []
+        poc_change_detected = False
+        new_poc_info = None
+        failed_documents = []
+
+        self.metrics.incr("documents_total", len(documents))
+        for doc in documents:
+            # Where each document's IDs came from: ledger / cache / checkpoint / text / vision,
+            # or skipped (early termination = vision calls saved), failed, empty
+            self.metrics.incr(f"documents_{'failed' if doc.error is not None else doc.source or 'empty'}")
+
+        for index, doc in enumerate(documents):
+            if doc.error is not None:
+                print(f"      ❌ [{index+1}/{len(documents)}] Extraction failed for {doc.path}: {doc.error}")
+                failed_documents.append(doc.path)
                 continue
+            if doc.data is None:
+                continue
+            data = doc.data
 
-            # --- STEP 3: PROCESS QUEUE ONE BY ONE ---
-            # This Loop ensures the AI looks at every single file individually
-            print(f"   📄 PDFs to process: {len(pdf_queue)}")
-            
-            all_found_invoices = []
-            poc_change_detected = False
-            new_poc_info = None
-
-            for i, pdf_path in enumerate(pdf_queue):
-                print(f"      [{i+1}/{len(pdf_queue)}] Converting & Scanning...")
-                
-                # Convert specific PDF to images
-                images = self.processor.convert_pdf_to_images(pdf_path)
-                
-                if not images: continue
-
-                # Send ONLY this document's images to Gemini
-                # This prevents "Lazy AI" issues with large batches
-                data = self.llm.extract_invoice_data(email.body, images)
-                
-                # Accumulate results
-                if data.invoice_numbers:
-                    print(f"         Found IDs: {data.invoice_numbers}")
-                    all_found_invoices.extend(data.invoice_numbers)
-                
-                if data.detected_poc_change:
-                    poc_change_detected = True
-                    new_poc_info = data.new_poc_details
-
-            # --- DEBUG OUTPUT ---
-            print(f"\n   🔎 FINAL MATCH RESULTS:")
-            print(f"   ➡️  DB Expects (Sample): {[i.invoice_number for i in pending_invoices[:3]]}...")
-            print(f"   ⬅️  Agent Found Total: {all_found_invoices}")
-            print("   ------------------\n")
-
-            # --- RECONCILE ---
-            recon_result = ReconciliationService.reconcile(pending_invoices, all_found_invoices)
-
-            for inv in recon_result.updated_invoices:
-                # We link the first attachment found as reference for simplicity
-                filename = email.attachments[0] if email.attachments else "extracted_from_zip"
-                self.db.mark_as_received(inv.invoice_number, filename, email.thread_id)
-
-            draft = self.llm.draft_reply(
-                sender=email.sender,
-                missing_invoices=recon_result.missing_invoices,
-                received_invoices=recon_result.received_invoices,
-                context=f"POC Change: {new_poc_info}" if poc_change_detected else ""
+            # Accumulate results
+            if data.invoice_numbers:
+                print(f"         Found IDs: {data.invoice_numbers}")
+                all_found_invoices.extend(data.invoice_numbers)
+
+            if data.detected_poc_change:
+                poc_change_detected = True
+                new_poc_info = data.new_poc_details
+
+        return all_found_invoices, new_poc_info, poc_change_detected, failed_documents
+
+    def _record_processed(self, work: "_EmailWork") -> bool:
+        """
+        Marks the email (and every hashed document's outcome) as done in the
+        ledger. Returns False, recording nothing, while a PDF failed to extract
+        and the email has attempts left: the next cycle retries it. After the
+        last attempt it is recorded as PARTIAL, the PDF flagged failed.
+        """
+        if self.ledger is None:
+            return True
+        email, documents = work.email, work.documents
+        failed = [doc for doc in documents if doc.error is not None]
+        # Attempts are counted by the checkpoints; without them there is no bound, so no retry
+        if failed and self.checkpoints and work.attempt < self.max_attempts:
+            print(f"   ⚠️ {len(failed)} PDF(s) failed, email {email.id} will be retried "
+                  f"(attempt {work.attempt}/{self.max_attempts}).")
+            return False
+        attachments = [
+            ProcessedAttachment(
+                sha256=doc.sha256,
+                filename=os.path.basename(doc.path),
+                invoice_numbers=list(doc.data.invoice_numbers) if doc.data else [],
+                failed=doc.error is not None
             )
+            # Text-layer hits only hold the numbers pending at the time: re-read them instead
+            for doc in documents if doc.sha256 and doc.source not in ("text", "skipped")
+        ]
+        self.ledger.record_message(email.id, email.thread_id, email.sender, _message_outcome(work.entry), attachments)
+        self._mark_processed(email.id)
+        return True
 
-            report.append({
-                "thread_id": email.thread_id,
-                "sender": email.sender,
-                "received": recon_result.received_invoices,
-                "missing": recon_result.missing_invoices,
-                "draft_reply": draft,
-                "poc_update": new_poc_info
-            })
+    def _match_other_vendors(self, recon_result: ReconciliationResult, claimed_ids: set):
+        """
+        Resolves IDs the sender's pending set didn't account for against every
+        vendor (e.g. a forwarded email) and folds the hits into `recon_result`.
+        """
+        candidates = [
+            inv for inv in self.db.find_pending_by_invoice_keys(recon_result.unmatched_extracted)
+            if inv.id not in claimed_ids
+        ]
+        if not candidates:
+            return
 
-        print("="*40 + "\n")
-        return report
+        cross_result = ReconciliationService.reconcile(
+            candidates, recon_result.unmatched_extracted, optimal=self.optimal_matching
+        )
+        if cross_result.received_invoices:
+            print(f"   🔁 Matched other vendors' invoices: {cross_result.received_invoices}")
+        recon_result.received_invoices.extend(cross_result.received_invoices)
+        recon_result.updated_invoices.extend(cross_result.updated_invoices)
+        recon_result.unmatched_extracted = cross_result.unmatched_extracted
+
+    @staticmethod
+    def _no_pending_entry(email: EmailMessage, clean_sender: str) -> Dict:
+        return {
+            "thread_id": email.thread_id,
+            "sender": email.sender,
+            "status": f"Log: No pending invoices for {clean_sender}"
+        }
+
+    def _reconcile_email(
+        self,
+        state: "_CycleState",
+        email: EmailMessage,
+        documents: List["_Document"],
+        extraction: Optional[Tuple[List[str], Optional[str], bool, List[str]]]
+    ) -> Tuple[Dict, List[InvoiceReceipt], Optional[Dict]]:
+        """
+        Reconciles ONE email against its vendor's live pending set (shrinking it).
+        Returns the report entry, the receipts to commit and, when a reply is
+        needed, the draft_reply kwargs. Nothing is written here.
+        """
+        clean_sender = self._extract_email_address(email.sender)
+        print(f"👉 Processing email from: {email.sender}")
+
+        # --- LOAD ONCE PER VENDOR (per cycle) ---
+        if clean_sender not in state.pending:
+            state.pending[clean_sender] = [
+                inv for inv in self._vendor_snapshot(state, clean_sender)
+                if inv.id not in state.claimed and inv.status == InvoiceStatus.PENDING
+            ]
+            state.own_ids[clean_sender] = {inv.id for inv in state.pending[clean_sender]}
+        pending_invoices = state.pending[clean_sender]
+
+        # Forwarded replies still get scanned: their PDFs may belong to another vendor
+        if not pending_invoices and not documents:
+            print("   ❌ No pending invoices found.")
+            return self._no_pending_entry(email, clean_sender), [], None
+
+        # --- TRIAGE (Links / Empty) ---
+        body_lower = email.body.lower()
+        has_link = "http" in body_lower or "www." in body_lower or "drive.google" in body_lower
+
+        if not documents and has_link:
+            return {
+                "thread_id": email.thread_id, "sender": email.sender,
+                "received": [], "missing": [], "draft_reply": "",
+                "status": "🔴 MANUAL REVIEW: External Link Detected", "poc_update": None
+            }, [], None
+
+        if not documents:
+            missing_numbers = [inv.invoice_number for inv in pending_invoices]
+            return {
+                "thread_id": email.thread_id, "sender": email.sender,
+                "received": [], "missing": missing_numbers, "draft_reply": None,
+                "status": "Drafting: No Attachments", "poc_update": None
+            }, [], dict(
+                sender=email.sender, missing_invoices=missing_numbers, received_invoices=[],
+                context="The sender replied but forgot to attach files."
+            )
+
+        # --- EXTRACTED IDS (every PDF, one document per vision call) ---
+        all_found_invoices, new_poc_info, poc_change_detected, failed_documents = extraction
+
+        # --- DEBUG OUTPUT ---
+        print(f"\n   🔎 FINAL MATCH RESULTS:")
+        print(f"   ➡️  DB Expects (Sample): {[i.invoice_number for i in pending_invoices[:3]]}...")
+        print(f"   ⬅️  Agent Found Total: {all_found_invoices}")
+        print("   ------------------\n")
+
+        # --- RECONCILE (against the live pending set) ---
+        with self.metrics.span("reconcile.match"):
+            recon_result = ReconciliationService.reconcile(
+                pending_invoices, all_found_invoices, optimal=self.optimal_matching
+            )
+        state.pending[clean_sender] = [inv for inv in pending_invoices if inv.status == InvoiceStatus.PENDING]
+
+        # --- CROSS-VENDOR FALLBACK (indexed key / suffix lookup) ---
+        if recon_result.unmatched_extracted:
+            with self.metrics.span("reconcile.other_vendors"):
+                self._match_other_vendors(recon_result, state.own_ids[clean_sender] | state.claimed)
+
+        # Unknown sender and nothing resolved to another vendor either: log it, don't draft
+        if not state.own_ids[clean_sender] and not recon_result.received_invoices:
+            print("   ❌ No pending invoices found (sender or attachments).")
+            return self._no_pending_entry(email, clean_sender), [], None
+
+        # We link the first attachment found as reference for simplicity
+        filename = email.attachments[0] if email.attachments else "extracted_from_zip"
+        receipts = [InvoiceReceipt(inv.id, filename, email.thread_id) for inv in recon_result.updated_invoices]
+        state.claimed.update(inv.id for inv in recon_result.updated_invoices)
+
+        entry = {
+            "thread_id": email.thread_id,
+            "sender": email.sender,
+            "received": recon_result.received_invoices,
+            "missing": recon_result.missing_invoices,
+            "draft_reply": None,
+            "poc_update": new_poc_info,
+            # PDFs that could not be read; their invoices may be wrongly listed as missing
+            "failed_documents": failed_documents,
+            # Not scanned: every pending invoice (of any vendor) was already found in earlier PDFs
+            "skipped_documents": [doc.path for doc in documents if doc.source == "skipped"]
+        }
+        return entry, receipts, dict(
+            sender=email.sender,
+            missing_invoices=recon_result.missing_invoices,
+            received_invoices=recon_result.received_invoices,
+            context=f"POC Change: {new_poc_info}" if poc_change_detected else ""
+        )
 
     def send_approved_reply(self, thread_id: str, to_email: str, body: str):
         self.email.send_reply(thread_id, to_email, body)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Batch matching: one NumPy pass builds the extracted x expected score matrix,
+then a maximum-score one-to-one assignment picks the pairs.
+
+Scores follow the same stages as ReconciliationService._is_match:
+    strict 4.0 > normalized 3.0 > suffix 2.0 + similarity > fuzzy similarity
+Pairs that no stage accepts score 0 and are never assigned. A stronger stage
+always outranks a weaker one: the assignment is solved tier by tier (strict
+pairs first, then normalized, then suffix / fuzzy by score), so no number of
+weaker pairs can displace a stronger one, as summed scores would let them.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+
+from src.core.matching import (
+    normalize_invoice_id, SUFFIX_LENGTH, MIN_HEURISTIC_LENGTH,
+    MAX_SUFFIX_LENGTH_DELTA, FUZZY_THRESHOLD
+)
+
+STRICT_SCORE = 4.0
+NORMALIZED_SCORE = 3.0
+SUFFIX_SCORE = 2.0
+
+
+def _intern(values: List[str], table: Dict[str, int]) -> np.ndarray:
+    """Maps strings to shared integer codes so equality becomes an array compare."""
+    return np.array([table.setdefault(v, len(table)) for v in values], dtype=np.int64)
+
+
+def _encode(ids: List[str], width: int, pad: int) -> np.ndarray:
+    """Encodes IDs as a (len(ids), width) code-point matrix padded with `pad`."""
+    codes = np.full((len(ids), width), pad, dtype=np.int32)
+    for row, value in enumerate(ids):
+        codes[row, :len(value)] = [ord(ch) for ch in value]
+    return codes
+
+
+def _lcs_matrix(a_ids: List[str], b_ids: List[str]) -> np.ndarray:
+    """
+    LCS length for every (a, b) pair at once.
+
+    The classic DP runs over character positions only; each step updates the
+    full (len(a_ids), len(b_ids)) plane, so there is no Python loop over IDs.
+    """
+    width_a = max(len(s) for s in a_ids)
+    width_b = max(len(s) for s in b_ids)
+    # Different pads on each side so padding never counts as a match
+    a_codes = _encode(a_ids, width_a, -1)
+    b_codes = _encode(b_ids, width_b, -2)
+
+    shape = (len(a_ids), len(b_ids))
+    prev = [np.zeros(shape, dtype=np.int16) for _ in range(width_b + 1)]
+    for i in range(width_a):
+        cur = [np.zeros(shape, dtype=np.int16)]
+        a_col = a_codes[:, i][:, None]
+        for j in range(width_b):
+            equal = a_col == b_codes[:, j][None, :]
+            cur.append(np.where(equal, prev[j] + 1, np.maximum(prev[j + 1], cur[j])))
+        prev = cur
+    return prev[width_b]
+
+
+def score_matrix(expected_ids: List[str], extracted_ids: List[str]) -> np.ndarray:
+    """Returns a (len(expected_ids), len(extracted_ids)) matrix of match scores."""
+    scores = np.zeros((len(expected_ids), len(extracted_ids)))
+    if not expected_ids or not extracted_ids:
+        return scores
+
+    exp_norm = [normalize_invoice_id(e) for e in expected_ids]
+    ext_norm = [normalize_invoice_id(x) for x in extracted_ids]
+    exp_len = np.array([len(s) for s in exp_norm])[:, None]
+    ext_len = np.array([len(s) for s in ext_norm])[None, :]
+
+    raw_codes, key_codes, suffix_codes = {}, {}, {}
+    strict = _intern(expected_ids, raw_codes)[:, None] == _intern(extracted_ids, raw_codes)[None, :]
+    normalized = _intern(exp_norm, key_codes)[:, None] == _intern(ext_norm, key_codes)[None, :]
+
+    long_pair = (exp_len > MIN_HEURISTIC_LENGTH) & (ext_len > MIN_HEURISTIC_LENGTH)
+    same_suffix = (
+        _intern([s[-SUFFIX_LENGTH:] for s in exp_norm], suffix_codes)[:, None]
+        == _intern([s[-SUFFIX_LENGTH:] for s in ext_norm], suffix_codes)[None, :]
+    )
+    suffix = long_pair & same_suffix & (np.abs(exp_len - ext_len) < MAX_SUFFIX_LENGTH_DELTA)
+
+    total = exp_len + ext_len
+    similarity = np.divide(
+        2.0 * _lcs_matrix(exp_norm, ext_norm), total,
+        out=np.ones(total.shape), where=total > 0
+    )
+    fuzzy = (exp_len > MIN_HEURISTIC_LENGTH) & (similarity > FUZZY_THRESHOLD)
+
+    # Weakest stage first so stronger stages overwrite it
+    scores = np.where(fuzzy, similarity, scores)
+    scores = np.where(suffix, SUFFIX_SCORE + similarity, scores)
+    scores = np.where(normalized, NORMALIZED_SCORE, scores)
+    scores = np.where(strict, STRICT_SCORE, scores)
+    return scores
+
+
+def _min_cost_assignment(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Hungarian algorithm (shortest augmenting path) for rows <= cols.
+
+    The inner column scan is vectorized; rows are added one at a time.
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)   # owner[j] = row (1-based) assigned to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    return [(int(owner[j]) - 1, j - 1) for j in range(1, m + 1) if owner[j]]
+
+
+def _components(rows: np.ndarray, cols: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+    """Connected components of the bipartite graph of non-zero scores (union-find)."""
+    parent: Dict[tuple, tuple] = {}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        a, b = ("r", r), ("c", c)
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    groups: Dict[tuple, Tuple[List[int], List[int]]] = {}
+    for node in parent:
+        side, idx = node
+        group = groups.setdefault(find(node), ([], []))
+        group[0 if side == "r" else 1].append(idx)
+    return [(sorted(r), sorted(c)) for r, c in groups.values()]
+
+
+def max_score_assignment(scores: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    One-to-one (row, col) pairs, stage by stage: as many strict pairs as
+    possible, then normalized ones among the rows / columns left, then the
+    suffix / fuzzy pairs maximizing their total score. Zero scores are never
+    paired.
+    """
+    pairs: List[Tuple[int, int]] = []
+    free = scores.copy()
+    for tier in (scores == STRICT_SCORE, scores == NORMALIZED_SCORE, (scores > 0) & (scores < NORMALIZED_SCORE)):
+        tier_pairs = _max_score_pairs(np.where(tier, free, 0.0))
+        for r, c in tier_pairs:
+            free[r, :] = 0.0
+            free[:, c] = 0.0
+        pairs.extend(tier_pairs)
+    return sorted(pairs)
+
+
+def _max_score_pairs(scores: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    One-to-one (row, col) pairs maximizing the total score; zero scores are never paired.
+
+    Most IDs only compete with one or two rows, so the problem is split into
+    connected components and each (small) component is solved exactly.
+    """
+    rows, cols = np.nonzero(scores > 0)
+    pairs = []
+    for comp_rows, comp_cols in _components(rows, cols):
+        block = scores[np.ix_(comp_rows, comp_cols)]
+        transposed = len(comp_rows) > len(comp_cols)
+        if transposed:
+            block = block.T
+        # Max score == min (top - score); zero-score pairs are dropped below
+        for r, c in _min_cost_assignment(block.max() - block):
+            if transposed:
+                r, c = c, r
+            if scores[comp_rows[r], comp_cols[c]] > 0:
+                pairs.append((comp_rows[r], comp_cols[c]))
+    return pairs
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Any, Optional
-from src.models import EmailMessage, Invoice, ExtractedInvoiceData
+from datetime import datetime
+from typing import List, Any, Optional, Iterator, Dict, ContextManager
+from src.models import (
+    EmailMessage, Invoice, InvoiceStatus, InvoicePage, ExtractedInvoiceData, InvoiceReceipt, InvoiceEvent,
+    MessageOutcome, ProcessedAttachment, EmailCheckpoint
+)
 
 class IEmailProvider(ABC):
     @abstractmethod
@@ -8,6 +12,20 @@ class IEmailProvider(ABC):
         """Fetches unread emails that have attachments."""
         pass
 
+    @abstractmethod
+    def list_unread_message_ids(self, limit: Optional[int] = 5) -> Iterator[str]:
+        """Yields unread, not yet processed message IDs (metadata only, nothing downloaded)."""
+        pass
+
+    @abstractmethod
+    def fetch_email(self, message_id: str) -> EmailMessage:
+        """Fetches one message and downloads its PDF / ZIP attachments."""
+        pass
+
+    def mark_processed(self, message_id: str):
+        """Flags a handled message so list_unread_message_ids stops returning it (no-op by default)."""
+        pass
+
     @abstractmethod
     def send_reply(self, thread_id: str, to_email: str, body: str):
         """Replies to an existing conversation thread."""
@@ -26,6 +44,7 @@ class ILLMProvider(ABC):
     def extract_invoice_data(self, text_context: str, image_paths: List[str]) -> ExtractedInvoiceData:
         """
         Uses OCR/Vision to extract invoice numbers and POC details.
+        Raises on provider errors: an empty result means nothing was found.
         """
         pass
 
@@ -36,6 +55,14 @@ class ILLMProvider(ABC):
         """
         pass
 
+    def extraction_version(self) -> str:
+        """
+        Identifies the model + prompt behind extract_invoice_data. Cached
+        extractions are only reused under the same version, so bump it
+        whenever either changes.
+        """
+        return type(self).__name__
+
 class IInvoiceRepository(ABC):
     @abstractmethod
     def get_pending_invoices_by_sender(self, sender_email: str) -> List[Invoice]:
@@ -43,8 +70,23 @@ class IInvoiceRepository(ABC):
         pass
 
     @abstractmethod
-    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str):
-        """Updates status to RECEIVED and links the file/thread."""
+    def find_pending_by_invoice_keys(self, invoice_ids: List[str]) -> List[Invoice]:
+        """Returns PENDING invoices of ANY vendor whose normalized key or suffix matches one of the IDs."""
+        pass
+
+    @abstractmethod
+    def has_pending_from_other_vendors(self, sender_email: str) -> bool:
+        """True if any vendor other than the sender has a PENDING invoice (a cross-vendor match is possible)."""
+        pass
+
+    @abstractmethod
+    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str, invoice_id: Optional[int] = None):
+        """Updates status to RECEIVED and links the file/thread (by primary key when given)."""
+        pass
+
+    @abstractmethod
+    def mark_many_as_received(self, receipts: List[InvoiceReceipt]):
+        """Applies many RECEIVED updates, by primary key, in a single transaction."""
         pass
 
     @abstractmethod
@@ -52,11 +94,195 @@ class IInvoiceRepository(ABC):
         """Adds a new expected invoice to the database."""
         pass
 
+    @abstractmethod
+    def add_invoices(self, invoices: List[Invoice]):
+        """Adds many expected invoices in a single transaction."""
+        pass
+
     @abstractmethod
     def get_all_invoices(self) -> List[Invoice]:
         """Returns all invoices (used for UI display)."""
         pass
 
+    @abstractmethod
+    def record_kickoff(self, vendor_email: str, thread_id: str, invoice_ids: List[int]):
+        """Logs a KICKOFF_SENT event for each invoice listed in a kickoff email."""
+        pass
+
+    @abstractmethod
+    def changes_since(self, seq: int = 0, limit: int = 1000) -> List[InvoiceEvent]:
+        """Returns up to `limit` invoice events with a sequence number greater than `seq`, oldest first."""
+        pass
+
+    @abstractmethod
+    def get_vendors_needing_reminders(self, days_interval: int = 2) -> List[str]:
+        """Vendor emails with PENDING invoices not reminded in the last `days_interval` days."""
+        pass
+
+    @abstractmethod
+    def update_reminder_timestamp(self, vendor_email: str):
+        """Stamps the vendor's PENDING invoices as reminded now."""
+        pass
+
+class IInvoiceStore(IInvoiceRepository):
+    """
+    The invoice database itself (SQLite or SQLAlchemy): on top of what the
+    agent needs, the dashboard reads, admin writes and bulk-load hooks used
+    by the UI, the scripts, exports and imports.
+    """
+    # --- DASHBOARD / EXPORT READS ---
+    @abstractmethod
+    def get_kpi_totals(self) -> Dict:
+        """received_count, received_value and pending_count over all invoices."""
+        pass
+
+    @abstractmethod
+    def get_client_breakdown(self) -> List[Dict]:
+        """Received value per workspace (client), largest first."""
+        pass
+
+    @abstractmethod
+    def get_hotel_breakdown(self) -> List[Dict]:
+        """Received count and value per hotel / GSTIN."""
+        pass
+
+    @abstractmethod
+    def get_recent_received(self, limit: int = 10) -> List[Dict]:
+        """The latest received invoices, newest first."""
+        pass
+
+    @abstractmethod
+    def get_invoice_page(
+        self,
+        status: Optional[InvoiceStatus] = None,
+        vendor_email: Optional[str] = None,
+        received_after: Optional[datetime] = None,
+        received_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> InvoicePage:
+        """One page of matching invoices in id order; pass the page's next_cursor for the next one."""
+        pass
+
+    @abstractmethod
+    def iter_invoices(self, page_size: int = 1000, **filters) -> Iterator[Invoice]:
+        """Streams every invoice matching get_invoice_page's filters, one page in memory at a time."""
+        pass
+
+    # --- ADMIN WRITES ---
+    @abstractmethod
+    def add_vendor_contact(self, vendor_email: str, address: str):
+        """Links another billing address, or a whole domain as '@hotel.com', to the vendor of `vendor_email`."""
+        pass
+
+    @abstractmethod
+    def delete_pending_invoices(self, vendor_email: str) -> int:
+        """Drops a vendor's PENDING rows; returns how many."""
+        pass
+
+    # --- BULK LOAD ---
+    @abstractmethod
+    def transaction(self) -> ContextManager[Any]:
+        """One write transaction around the block; nested calls join it."""
+        pass
+
+    @abstractmethod
+    def get_import_offset(self, source: str) -> int:
+        """Rows of `source` already imported (0 if none)."""
+        pass
+
+    @abstractmethod
+    def set_import_offset(self, source: str, row_offset: int):
+        """Call inside the chunk's transaction so the rows and the offset commit together."""
+        pass
+
+    @abstractmethod
+    def drop_secondary_indexes(self):
+        pass
+
+    @abstractmethod
+    def create_secondary_indexes(self):
+        pass
+
+    @abstractmethod
+    def defer_summary(self):
+        """Stops per-row invoice_summary maintenance until rebuild_summary()."""
+        pass
+
+    @abstractmethod
+    def rebuild_summary(self):
+        """Recomputes invoice_summary and resumes its per-row maintenance."""
+        pass
+
+class IProcessedLedger(ABC):
+    """Durable record of emails / attachments the reconciliation cycle already handled."""
+    @abstractmethod
+    def is_processed(self, message_id: str) -> bool:
+        """True if the message was fully handled by an earlier cycle."""
+        pass
+
+    @abstractmethod
+    def get_attachment(self, sha256: str) -> Optional[ProcessedAttachment]:
+        """The extraction outcome of an identical PDF, if one was processed before."""
+        pass
+
+    @abstractmethod
+    def record_message(
+        self, message_id: str, thread_id: str, sender: str,
+        outcome: MessageOutcome, attachments: List[ProcessedAttachment]
+    ):
+        """Marks the message (and its attachments) as processed, in one transaction."""
+        pass
+
+class IExtractionCache(ABC):
+    """Extraction results keyed by PDF content hash + extraction_version()."""
+    @abstractmethod
+    def get(self, sha256: str, version: str) -> Optional[ExtractedInvoiceData]:
+        pass
+
+    @abstractmethod
+    def put(self, sha256: str, version: str, data: ExtractedInvoiceData):
+        pass
+
+class IWorkCheckpoints(ABC):
+    """Durable progress of emails the reconciliation cycle has started but not finished."""
+    @abstractmethod
+    def start(self, message_id: str) -> int:
+        """Registers (another) attempt at the message; returns the attempt number, from 1."""
+        pass
+
+    @abstractmethod
+    def attempts(self, message_id: str) -> int:
+        """Attempts started so far (0 if the message is not in progress)."""
+        pass
+
+    @abstractmethod
+    def in_progress(self) -> List[str]:
+        """Started, unfinished message IDs, oldest first."""
+        pass
+
+    @abstractmethod
+    def save_document(self, message_id: str, path: str, data: ExtractedInvoiceData):
+        pass
+
+    @abstractmethod
+    def load_documents(self, message_id: str) -> Dict[str, ExtractedInvoiceData]:
+        """Extraction results already paid for, by document path."""
+        pass
+
+    @abstractmethod
+    def save_result(self, message_id: str, checkpoint: EmailCheckpoint):
+        pass
+
+    @abstractmethod
+    def load_result(self, message_id: str) -> Optional[EmailCheckpoint]:
+        pass
+
+    @abstractmethod
+    def finish(self, message_id: str):
+        """Drops the message's checkpoints once it is recorded as processed."""
+        pass
+
 class IVectorStore(ABC):
     @abstractmethod
     def add_documents(self, texts: List[str], metadata: List[dict]):
@@ -70,4 +296,8 @@ class IAttachmentProcessor(ABC):
     @abstractmethod
     def convert_pdf_to_images(self, pdf_path: str) -> List[str]:
         """Converts a PDF file into a list of image file paths (for OCR/Vision)."""
-        pass
\ No newline at end of file
+        pass
+
+    def extract_text(self, pdf_path: str) -> str:
+        """Embedded text layer of a PDF ('' if it has none or it can't be read)."""
+        return ""
\ No newline at end of file
@@ -1,5 +1,9 @@
-from typing import List
-from difflib import SequenceMatcher
+from typing import List, Dict
+from src.core.assignment import score_matrix, max_score_assignment
+from src.core.matching import (
+    InvoiceMatchIndex, normalize_invoice_id, is_fuzzy_match,
+    SUFFIX_LENGTH, MIN_HEURISTIC_LENGTH, MAX_SUFFIX_LENGTH_DELTA
+)
 from src.models import Invoice, ReconciliationResult, InvoiceStatus
 
 class ReconciliationService:
@@ -18,11 +22,8 @@ class ReconciliationService:
             
         # 2. Normalization
         # Remove common separators and normalize 1/I, 0/O
-        def normalize(s):
-            return s.upper().replace("1", "I").replace("0", "O").replace(" ", "").replace("-", "").replace("_", "")
-            
-        s1 = normalize(expected_id)
-        s2 = normalize(extracted_id)
+        s1 = normalize_invoice_id(expected_id)
+        s2 = normalize_invoice_id(extracted_id)
         
         if s1 == s2:
             return True
@@ -31,38 +32,62 @@ class ReconciliationService:
         # If the invoice number is long (>8 chars) and the last 6 chars are identical,
         # it's extremely likely to be the same invoice, just with OCR noise at the start.
         # Example: 'FI18HL...' vs 'H18HL...' -> Both end in '000150'
-        if len(s1) > 8 and len(s2) > 8:
-            if s1[-6:] == s2[-6:]:
+        if len(s1) > MIN_HEURISTIC_LENGTH and len(s2) > MIN_HEURISTIC_LENGTH:
+            if s1[-SUFFIX_LENGTH:] == s2[-SUFFIX_LENGTH:]:
                 # Optional: Ensure the rest isn't totally different (length check)
-                if abs(len(s1) - len(s2)) < 4: 
+                if abs(len(s1) - len(s2)) < MAX_SUFFIX_LENGTH_DELTA: 
                     return True
 
-        # 4. Fuzzy Similarity (Levenshtein Ratio)
+        # 4. Fuzzy Similarity (SequenceMatcher ratio behind an LCS prune, see src/core/similarity.py)
         # We lowered the threshold to 0.70 (70%) to catch cases like missing 1 char ('H29' vs 'H2')
-        similarity = SequenceMatcher(None, s1, s2).ratio()
-        
-        if len(s1) > 8 and similarity > 0.70:
+        if is_fuzzy_match(s1, s2):
             return True
             
         return False
 
     @staticmethod
-    def reconcile(expected_invoices: List[Invoice], extracted_numbers: List[str]) -> ReconciliationResult:
+    def _optimal_matches(expected_ids: List[str], extracted_numbers: List[str]) -> Dict[str, str]:
+        """
+        Batch mode: scores every extracted x expected pair in one NumPy pass and
+        solves a maximum-score one-to-one assignment (extracted ID -> expected ID).
+        IDs are sorted first so the result never depends on input order.
+        """
+        expected_sorted = sorted(set(expected_ids))
+        extracted_sorted = sorted(set(extracted_numbers))
+        scores = score_matrix(expected_sorted, extracted_sorted)
+        return {
+            extracted_sorted[col]: expected_sorted[row]
+            for row, col in max_score_assignment(scores)
+        }
+
+    @staticmethod
+    def reconcile(expected_invoices: List[Invoice], extracted_numbers: List[str], optimal: bool = False) -> ReconciliationResult:
         expected_map = {inv.invoice_number: inv for inv in expected_invoices}
+
+        if optimal:
+            matches = ReconciliationService._optimal_matches(list(expected_map), extracted_numbers)
+            find = matches.get
+        else:
+            # Greedy: built once per call, hash lookups + a small fuzzy shortlist per extracted ID
+            find = InvoiceMatchIndex(list(expected_map)).find
         
         received_numbers = []
         updated_invoices = []
+        unmatched = []
         
         for extracted_id in extracted_numbers:
-            # Check against every EXPECTED invoice
-            for expected_id, inv in expected_map.items():
-                if ReconciliationService._is_match(expected_id, extracted_id):
-                    # Check if we already matched this one (avoid duplicates)
-                    if expected_id not in received_numbers:
-                        received_numbers.append(expected_id)
-                        inv.status = InvoiceStatus.RECEIVED
-                        updated_invoices.append(inv)
-                    break 
+            # Expected invoice this extracted ID resolves to (if any)
+            expected_id = find(extracted_id)
+            if expected_id is None:
+                unmatched.append(extracted_id)
+                continue
+
+            # Check if we already matched this one (avoid duplicates)
+            if expected_id not in received_numbers:
+                received_numbers.append(expected_id)
+                inv = expected_map[expected_id]
+                inv.status = InvoiceStatus.RECEIVED
+                updated_invoices.append(inv)
 
         received_set = set(received_numbers)
         missing_numbers = [
@@ -74,5 +99,6 @@ class ReconciliationService:
         return ReconciliationResult(
             received_invoices=received_numbers,
             missing_invoices=missing_numbers,
-            updated_invoices=updated_invoices
+            updated_invoices=updated_invoices,
+            unmatched_extracted=unmatched
         )
\ No newline at end of file
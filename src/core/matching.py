@@ -0,0 +1,170 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional
+from src.core import similarity
+
+# Tuning knobs shared by the pairwise matcher and the index below.
+SUFFIX_LENGTH = 6
+MIN_HEURISTIC_LENGTH = 8   # Suffix and fuzzy stages only apply to IDs longer than this
+MAX_SUFFIX_LENGTH_DELTA = 4
+FUZZY_THRESHOLD = 0.70
+# Text-layer scan: an ID split by the PDF layout may span this many words
+MAX_TEXT_WORDS_PER_ID = 3
+
+_TEXT_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9/_.-]*")
+
+
+def normalize_invoice_id(invoice_id: str) -> str:
+    """Removes common separators and normalizes 1/I, 0/O (OCR look-alikes)."""
+    return (
+        invoice_id.upper()
+        .replace("1", "I")
+        .replace("0", "O")
+        .replace(" ", "")
+        .replace("-", "")
+        .replace("_", "")
+    )
+
+
+def is_fuzzy_match(s1: str, s2: str) -> bool:
+    """Fuzzy stage on two normalized IDs (expected first, extracted second)."""
+    return len(s1) > MIN_HEURISTIC_LENGTH and similarity.matches(s1, s2, FUZZY_THRESHOLD)
+
+
+class InvoiceMatchIndex:
+    """
+    Pre-computed lookup structures over the EXPECTED invoice numbers.
+
+    Built once per reconcile call so every extracted ID is resolved with hash
+    lookups instead of a scan over all pending rows. `find` returns exactly the
+    expected ID that the pairwise strict -> normalized -> suffix -> fuzzy loop
+    would have picked (the first one in expected order that matches).
+    """
+
+    def __init__(self, expected_ids: List[str]):
+        # dict.fromkeys keeps first-seen order and drops duplicates
+        self.expected_ids = list(dict.fromkeys(expected_ids))
+        self.normalized = [normalize_invoice_id(e) for e in self.expected_ids]
+
+        # 1. Strict + normalized keys -> first position
+        self.exact: Dict[str, int] = {}
+        self.by_key: Dict[str, int] = {}
+        # 2. Last-6 suffix -> all positions (length rules are applied per query)
+        self.by_suffix: Dict[str, List[int]] = defaultdict(list)
+        # 3. Character gram postings for the fuzzy shortlist: gram -> [(pos, count)]
+        self.grams: Dict[str, List[tuple]] = defaultdict(list)
+
+        for pos, (raw, key) in enumerate(zip(self.expected_ids, self.normalized)):
+            self.exact.setdefault(raw, pos)
+            self.by_key.setdefault(key, pos)
+            if len(key) > MIN_HEURISTIC_LENGTH:
+                self.by_suffix[key[-SUFFIX_LENGTH:]].append(pos)
+                for gram, count in Counter(key).items():
+                    self.grams[gram].append((pos, count))
+
+    def __len__(self) -> int:
+        return len(self.expected_ids)
+
+    def _fuzzy_shortlist(self, key: str, limit: int) -> List[int]:
+        """
+        Blocks candidates on shared characters.
+
+        2 * shared_chars / total_len is an upper bound on the fuzzy score (an
+        LCS never uses more of a character than both IDs hold), so anything
+        that cannot reach the threshold is dropped without running the full
+        comparison. Single-character grams
+        are used on purpose: longer grams are not a safe bound for OCR noise
+        that alternates with correct characters.
+        """
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram, count in Counter(key).items():
+            for pos, expected_count in self.grams.get(gram, ()):
+                if pos < limit:
+                    overlap[pos] += min(count, expected_count)
+
+        shortlist = []
+        for pos, shared in overlap.items():
+            total = len(self.normalized[pos]) + len(key)
+            if 2.0 * shared / total > FUZZY_THRESHOLD:
+                shortlist.append(pos)
+        shortlist.sort()
+        return shortlist
+
+    def find_position(self, extracted_id: str) -> Optional[int]:
+        """Returns the position of the first expected ID matching `extracted_id`."""
+        # Every stage can only lower `best`, the earliest matching position so far
+        best = self.exact.get(extracted_id)
+
+        key = normalize_invoice_id(extracted_id)
+        pos = self.by_key.get(key)
+        if pos is not None and (best is None or pos < best):
+            best = pos
+
+        if len(key) > MIN_HEURISTIC_LENGTH:
+            for pos in self.by_suffix.get(key[-SUFFIX_LENGTH:], ()):
+                if best is not None and pos >= best:
+                    break
+                if abs(len(self.normalized[pos]) - len(key)) < MAX_SUFFIX_LENGTH_DELTA:
+                    best = pos
+                    break
+
+        # Fuzzy stage only needs to beat whatever the cheap stages found
+        limit = len(self.expected_ids) if best is None else best
+        for pos in self._fuzzy_shortlist(key, limit):
+            if is_fuzzy_match(self.normalized[pos], key):
+                return pos
+
+        return best
+
+    def find(self, extracted_id: str) -> Optional[str]:
+        """Returns the expected invoice number matching `extracted_id`, if any."""
+        pos = self.find_position(extracted_id)
+        return None if pos is None else self.expected_ids[pos]
+
+
+def _text_runs(text: str) -> Iterator[str]:
+    """Every run of up to MAX_TEXT_WORDS_PER_ID consecutive words, joined without spaces."""
+    words = [w.rstrip("./-_") for w in _TEXT_TOKEN.findall(text)]
+    for start in range(len(words)):
+        joined = ""
+        for word in words[start:start + MAX_TEXT_WORDS_PER_ID]:
+            joined += word
+            yield joined
+
+
+def find_invoice_ids_in_text(text: str, expected_ids: List[str]) -> List[str]:
+    """
+    Expected invoice numbers that appear in free text (e.g. a PDF text layer),
+    in order of first appearance.
+
+    Only strict and normalized keys count here: suffix and fuzzy matching on
+    every word of a document would produce false positives. Runs of up to
+    MAX_TEXT_WORDS_PER_ID words are joined, since the normalizer drops spaces
+    ("INV 2024 001" matches INV-2024-001).
+    """
+    index = InvoiceMatchIndex(expected_ids)
+    if not len(index) or not text:
+        return []
+
+    found: Dict[int, None] = {}
+    for joined in _text_runs(text):
+        pos = index.exact.get(joined)
+        if pos is None:
+            pos = index.by_key.get(normalize_invoice_id(joined))
+        if pos is not None:
+            found.setdefault(pos)
+    return [index.expected_ids[pos] for pos in found]
+
+
+def invoice_id_candidates(text: str) -> List[str]:
+    """
+    Normalized keys of the word runs in `text` that could be an invoice
+    number (at least one digit), deduplicated: the keys to look up when
+    there is no expected list to scan the text against.
+    """
+    keys: Dict[str, None] = {}
+    for joined in _text_runs(text or ""):
+        # Checked before normalizing, which reads O / I as digits
+        if any(ch.isdigit() for ch in joined):
+            keys.setdefault(normalize_invoice_id(joined))
+    return list(keys)
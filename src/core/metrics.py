@@ -0,0 +1,131 @@
+"""
+Per-cycle timing spans and counters for the reconciliation agent.
+
+One CycleMetrics collects everything a cycle does (stage spans, provider
+calls, document counts) from any number of worker threads, and renders it
+as a JSON cycle report or in Prometheus text exposition format. Values
+describe the last cycle, so they are exported as gauges.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+
+class CycleMetrics:
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._started = clock()
+        self._finished: Optional[float] = None
+        # name -> [count, total_seconds, max_seconds]
+        self.spans: Dict[str, list] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times the block under `name` (also when it raises)."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - start)
+
+    def timed(self, name: str, fn: Callable) -> Callable:
+        """`fn` wrapped in a span, e.g. for pipeline stages."""
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def timed_iter(self, name: str, iterable) -> Iterator:
+        """Yields from `iterable`, timing each fetch (lazy, paginated sources)."""
+        iterator = iter(iterable)
+        while True:
+            with self.span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.spans.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self._finished = self._clock()
+
+    # --- EXPORT ---
+    def report(self) -> Dict:
+        """Structured cycle report; `bottleneck` is the stage with the most time."""
+        end = self._finished if self._finished is not None else self._clock()
+        with self._lock:
+            spans = {
+                name: {
+                    "count": count,
+                    "total_seconds": round(total, 6),
+                    "avg_seconds": round(total / count, 6) if count else 0.0,
+                    "max_seconds": round(peak, 6),
+                }
+                for name, (count, total, peak) in sorted(self.spans.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+        stages = {name: s for name, s in spans.items() if name.startswith("stage.")}
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round(end - self._started, 6),
+            "bottleneck": max(stages, key=lambda n: stages[n]["total_seconds"]) if stages else None,
+            "spans": spans,
+            "counters": counters,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+    def to_prometheus(self, prefix: str = "autoemail_cycle") -> str:
+        report = self.report()
+        lines = [
+            f"# HELP {prefix}_duration_seconds Wall time of the last reconciliation cycle.",
+            f"# TYPE {prefix}_duration_seconds gauge",
+            f"{prefix}_duration_seconds {report['duration_seconds']}",
+            f"# HELP {prefix}_started_at_seconds Unix time the last cycle started.",
+            f"# TYPE {prefix}_started_at_seconds gauge",
+            f"{prefix}_started_at_seconds {report['started_at']}",
+        ]
+        for field, help_text in (
+            ("count", "Spans observed in the last cycle."),
+            ("total_seconds", "Total time spent in each span during the last cycle."),
+            ("max_seconds", "Slowest single span in the last cycle."),
+        ):
+            metric = f"{prefix}_span_{field}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{span="{name}"}} {s[field]}' for name, s in report["spans"].items()]
+        metric = f"{prefix}_events"
+        lines += [f"# HELP {metric} Counters of the last cycle.", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{name="{name}"}} {value}' for name, value in report["counters"].items()]
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str):
+        """
+        Writes cycle_report.json and metrics.prom (node_exporter textfile
+        collector format) into `directory`, replacing the previous cycle's
+        files atomically so a scraper never reads half a file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for filename, content in (("cycle_report.json", self.to_json()), ("metrics.prom", self.to_prometheus())):
+            path = os.path.join(directory, filename)
+            with open(path + ".tmp", "w") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
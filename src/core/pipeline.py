@@ -0,0 +1,174 @@
+"""
+Bounded, multi-stage streaming pipeline.
+
+Items flow from a source iterator through stages connected by bounded
+queues. Every stage has its own worker threads; when a downstream stage is
+slow its input queue fills up and upstream workers block (backpressure), so
+the number of items in flight never exceeds the sum of queue sizes and
+worker counts, however long the source is.
+
+Stages marked `ordered` see their items in source order (needed by stages
+with shared state). Results are yielded in source order too. A window on
+items between the source and the sink keeps the reorder buffers bounded
+when one early item is slow.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# How often blocked threads re-check for cancellation (seconds)
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 4       # Bound on the queue feeding this stage
+    ordered: bool = False     # Process items in source order (forces one worker)
+
+
+class _Failed:
+    """An item whose stage raised; skips the remaining stages and re-raises at the sink."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item, cancel: threading.Event):
+    while True:
+        if cancel.is_set():
+            raise _Cancelled()
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, cancel: threading.Event):
+    while True:
+        if cancel.is_set():
+            raise _Cancelled()
+        try:
+            return q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+
+
+def _in_order(q: queue.Queue, cancel: threading.Event) -> Iterator:
+    """Yields (seq, value) from `q` in seq order, buffering early arrivals until _DONE."""
+    buffered: Dict[int, Any] = {}
+    next_seq = 0
+    while True:
+        message = _get(q, cancel)
+        if message is _DONE:
+            break
+        buffered[message[0]] = message[1]
+        while next_seq in buffered:
+            yield next_seq, buffered.pop(next_seq)
+            next_seq += 1
+    for seq in sorted(buffered):
+        yield seq, buffered[seq]
+
+
+def _acquire(slots: threading.Semaphore, cancel: threading.Event):
+    while not slots.acquire(timeout=POLL_INTERVAL):
+        if cancel.is_set():
+            raise _Cancelled()
+
+
+def run_pipeline(source: Iterable, stages: List[Stage], max_in_flight: int = 0) -> Iterator[Any]:
+    """
+    Streams `source` through `stages`, yielding the last stage's results in
+    source order. At most `max_in_flight` items (default: total queue and
+    worker capacity) are between the source and the consumer at any time.
+    A stage exception is re-raised here, at that item's turn; closing the
+    generator early stops every worker.
+    """
+    if max_in_flight <= 0:
+        max_in_flight = sum(stage.queue_size + max(1, stage.workers) for stage in stages)
+    slots = threading.Semaphore(max_in_flight)
+    cancel = threading.Event()
+    queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in stages]
+    results: queue.Queue = queue.Queue(maxsize=max(1, sum(s.queue_size for s in stages)))
+    threads: List[threading.Thread] = []
+
+    def feed():
+        try:
+            for seq, item in enumerate(source):
+                _acquire(slots, cancel)
+                _put(queues[0], (seq, item), cancel)
+            _put(queues[0], _DONE, cancel)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            # Source failure: surfaces after the items already read
+            _put(queues[0], (float("inf"), _Failed(e)), cancel)
+            _put(queues[0], _DONE, cancel)
+
+    def apply(stage: Stage, value):
+        if isinstance(value, _Failed):
+            return value
+        try:
+            return stage.fn(value)
+        except BaseException as e:
+            # Anything escaping a worker thread would leave the sink waiting forever
+            return _Failed(e)
+
+    def work(index: int, stage: Stage, remaining: List[int], lock: threading.Lock):
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else results
+        try:
+            if stage.ordered:
+                for seq, value in _in_order(inbox, cancel):
+                    _put(outbox, (seq, apply(stage, value)), cancel)
+            else:
+                while True:
+                    message = _get(inbox, cancel)
+                    if message is _DONE:
+                        _put(inbox, _DONE, cancel)   # Let sibling workers see it too
+                        break
+                    seq, value = message
+                    _put(outbox, (seq, apply(stage, value)), cancel)
+
+            # The last worker of a stage closes the next queue
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                _put(outbox, _DONE, cancel)
+        except _Cancelled:
+            pass
+
+    threads.append(threading.Thread(target=feed, name="pipeline-source", daemon=True))
+    for index, stage in enumerate(stages):
+        workers = 1 if stage.ordered else max(1, stage.workers)
+        remaining, lock = [workers], threading.Lock()
+        for n in range(workers):
+            threads.append(threading.Thread(
+                target=work, args=(index, stage, remaining, lock),
+                name=f"pipeline-{stage.name}-{n}", daemon=True
+            ))
+
+    for thread in threads:
+        thread.start()
+    try:
+        for _, value in _in_order(results, cancel):
+            slots.release()
+            if isinstance(value, _Failed):
+                raise value.error
+            yield value
+    finally:
+        cancel.set()
+        for thread in threads:
+            thread.join()
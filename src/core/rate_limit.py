@@ -0,0 +1,42 @@
+import time
+import threading
+from typing import Callable
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every caller of a rate-limited API.
+
+    `rate` tokens are added per second up to `burst`; acquire() blocks until a
+    token is available. A rate of 0 (or less) disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            # Sleep outside the lock so other threads can refill / check too
+            self._sleep(wait)
@@ -0,0 +1,94 @@
+"""
+Similarity engine for short alphanumeric invoice IDs.
+
+score(a, b) is difflib's SequenceMatcher(None, a, b).ratio(), the reference
+every fuzzy decision is held to. matches() gets the same decisions faster:
+it prunes on length, then on a bit-parallel LCS (one big-int update per
+character) that stops as soon as the threshold is out of reach. The LCS
+counts at least the characters SequenceMatcher's greedy block search
+finds, so 2 * LCS / (len(a) + len(b)) is an upper bound on the ratio:
+below the threshold the pair is rejected without difflib, otherwise
+SequenceMatcher has the final say. Most pairs are rejects, so it rarely
+runs.
+
+The bound alone is not enough near the threshold, e.g. M27HL25IOOIOI434
+vs MI9HL25IOOOI36I4: 0.75 for the LCS, 0.6875 for SequenceMatcher.
+"""
+
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict
+
+
+@lru_cache(maxsize=4096)
+def _char_masks(pattern: str) -> Dict[str, int]:
+    """Bit i of masks[c] is set when pattern[i] == c."""
+    masks: Dict[str, int] = {}
+    for i, ch in enumerate(pattern):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+
+if hasattr(int, "bit_count"):   # Python 3.10+
+    _popcount = int.bit_count
+else:
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def _lcs_length(a: str, b: str, min_required: int = 0) -> int:
+    """
+    Bit-parallel LCS length (Allison-Dix / Hyyro).
+
+    Returns -1 as soon as the LCS can no longer reach `min_required`.
+    """
+    if len(a) < len(b):
+        a, b = b, a   # Fewer iterations over the shorter string
+    m = len(a)
+    full = (1 << m) - 1
+    masks = _char_masks(a)
+
+    v = full
+    remaining = len(b)
+    for ch in b:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+        remaining -= 1
+        # Early exit is only possible once the unread tail alone can't cover the gap
+        if remaining < min_required and m - _popcount(v) + remaining < min_required:
+            return -1
+    return m - _popcount(v)
+
+
+def score(a: str, b: str) -> float:
+    """SequenceMatcher ratio in [0, 1]; 1.0 means identical strings."""
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def lcs_bound(a: str, b: str) -> float:
+    """2 * LCS / total length: never below score(a, b)."""
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    return 2.0 * _lcs_length(a, b) / total
+
+
+def matches(a: str, b: str, threshold: float) -> bool:
+    """True when score(a, b) is strictly above `threshold`."""
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0 > threshold
+
+    # 1. Length prune: even a perfect overlap of the shorter ID can't get there
+    if 2.0 * min(len(a), len(b)) / total <= threshold:
+        return False
+
+    # 2. LCS prune: smallest LCS with 2 * lcs / total > threshold (same float expression as the ratio)
+    min_required = int(threshold * total / 2)
+    while 2.0 * min_required / total <= threshold:
+        min_required += 1
+    if _lcs_length(a, b, min_required) < min_required:
+        return False
+
+    # 3. The bound can overshoot (see module docstring): SequenceMatcher decides
+    return score(a, b) > threshold
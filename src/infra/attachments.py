@@ -1,4 +1,5 @@
 import os
+import subprocess
 from pdf2image import convert_from_path
 from src.core.interfaces import IAttachmentProcessor
 
@@ -18,4 +19,18 @@ class PdfAttachmentProcessor(IAttachmentProcessor):
             return image_paths
         except Exception as e:
             print(f"Error converting PDF {pdf_path}: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def extract_text(self, pdf_path: str) -> str:
+        # poppler's pdftotext (installed alongside pdftoppm, which pdf2image uses)
+        try:
+            result = subprocess.run(
+                ["pdftotext", "-enc", "UTF-8", pdf_path, "-"],
+                capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error reading text layer of {pdf_path}: {e}")
+            return ""
+        if result.returncode != 0:
+            return ""
+        return result.stdout.decode("utf-8", errors="replace")
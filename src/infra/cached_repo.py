@@ -0,0 +1,167 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.interfaces import IInvoiceRepository
+from src.models import Invoice, InvoiceReceipt, InvoiceEvent
+
+
+class CachingInvoiceRepository(IInvoiceRepository):
+    """
+    Read-through cache of per-sender PENDING sets around any IInvoiceRepository.
+
+    Entries are LRU-evicted and expire after `ttl_seconds`. Writes go to the
+    wrapped repository first, then drop exactly the entries they affect.
+    Callers always get copies, so mutating a returned Invoice (reconcile does)
+    never leaks into the cache.
+
+    Only writes made through this instance invalidate it; another process
+    writing the same DB is seen once the entry expires.
+    """
+
+    def __init__(
+        self,
+        inner: IInvoiceRepository,
+        max_entries: int = 256,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.inner = inner
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # sender -> (stored_at, invoices)
+        self._entries: "OrderedDict[str, Tuple[float, List[Invoice]]]" = OrderedDict()
+        # Bumped on every invalidation; a read that raced a write is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __getattr__(self, name):
+        # Everything outside the interface (analytics, pagination, ...) is not cached
+        return getattr(self.inner, name)
+
+    @staticmethod
+    def _key(sender_email: str) -> str:
+        return sender_email.strip().lower()
+
+    # --- READS ---
+    def get_pending_invoices_by_sender(self, sender_email: str) -> List[Invoice]:
+        key = self._key(sender_email)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [replace(inv) for inv in entry[1]]
+            if entry:
+                del self._entries[key]   # Expired
+            self.misses += 1
+            generation = self._generation
+
+        invoices = self.inner.get_pending_invoices_by_sender(sender_email)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now, [replace(inv) for inv in invoices])
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return invoices
+
+    def find_pending_by_invoice_keys(self, invoice_ids: List[str]) -> List[Invoice]:
+        return self.inner.find_pending_by_invoice_keys(invoice_ids)
+
+    def has_pending_from_other_vendors(self, sender_email: str) -> bool:
+        return self.inner.has_pending_from_other_vendors(sender_email)
+
+    def get_all_invoices(self) -> List[Invoice]:
+        return self.inner.get_all_invoices()
+
+    def changes_since(self, seq: int = 0, limit: int = 1000) -> List[InvoiceEvent]:
+        return self.inner.changes_since(seq, limit)
+
+    def get_vendors_needing_reminders(self, days_interval: int = 2) -> List[str]:
+        return self.inner.get_vendors_needing_reminders(days_interval)
+
+    # --- WRITES (then precise invalidation) ---
+    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str, invoice_id: Optional[int] = None):
+        self.inner.mark_as_received(invoice_number, filename, thread_id, invoice_id=invoice_id)
+        if invoice_id is not None:
+            self._invalidate(lambda inv: inv.id == invoice_id)
+        else:
+            self._invalidate(lambda inv: inv.invoice_number == invoice_number)
+
+    def mark_many_as_received(self, receipts: List[InvoiceReceipt]):
+        self.inner.mark_many_as_received(receipts)
+        ids = {r.invoice_id for r in receipts}
+        self._invalidate(lambda inv: inv.id in ids)
+
+    def add_invoice(self, invoice: Invoice):
+        self.add_invoices([invoice])
+
+    def add_invoices(self, invoices: List[Invoice]):
+        self.inner.add_invoices(invoices)
+        vendors = {self._key(inv.vendor_email) for inv in invoices}
+        self._invalidate(lambda inv: self._key(inv.vendor_email) in vendors, keys=vendors, include_empty=True)
+
+    def update_reminder_timestamp(self, vendor_email: str):
+        self.inner.update_reminder_timestamp(vendor_email)
+        vendor = self._key(vendor_email)
+        self._invalidate(lambda inv: self._key(inv.vendor_email) == vendor, keys={vendor})
+
+    def record_kickoff(self, vendor_email: str, thread_id: str, invoice_ids: List[int]):
+        # Event log only; PENDING sets are unchanged
+        self.inner.record_kickoff(vendor_email, thread_id, invoice_ids)
+
+    def delete_pending_invoices(self, vendor_email: str) -> int:
+        removed = self.inner.delete_pending_invoices(vendor_email)
+        self.invalidate_all()
+        return removed
+
+    def add_vendor_contact(self, vendor_email: str, address: str):
+        # Changes which vendor a sender resolves to: any entry may be wrong now
+        self.inner.add_vendor_contact(vendor_email, address)
+        self.invalidate_all()
+
+    # --- INVALIDATION / STATS ---
+    def _invalidate(self, affects: Callable[[Invoice], bool], keys: frozenset = frozenset(), include_empty: bool = False):
+        """
+        Drops entries holding an affected invoice, entries keyed by `keys`, and
+        (for inserts) empty entries: a sender cached with nothing pending may
+        resolve to the vendor that just got a new invoice.
+        """
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key for key, (_, invoices) in self._entries.items()
+                if key in keys or (include_empty and not invoices) or any(affects(inv) for inv in invoices)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,140 @@
+import datetime
+import json
+import threading
+from dataclasses import asdict
+from typing import Dict, Optional, Tuple
+
+from src.core.interfaces import IExtractionCache
+from src.infra.sqlite_store import SQLiteStore
+from src.models import ExtractedInvoiceData
+
+# Per-email fields: they come from the email body sent alongside the images,
+# not from the PDF, so a cached copy of the same PDF must not carry them
+EMAIL_SPECIFIC_FIELDS = ("detected_poc_change", "new_poc_details")
+# Hits buffered in memory before their hits / last_used_at updates are written in one transaction
+TOUCH_BATCH = 64
+
+
+class SQLiteExtractionCache(SQLiteStore, IExtractionCache):
+    """
+    Content-addressed extraction results: vendors re-send the same PDFs
+    (next reply, later ZIP), and a hit skips both rasterizing and the vision
+    call. Keyed by (SHA-256 of the PDF bytes, extraction_version()).
+
+    Bounded by `max_bytes` of stored JSON; the least recently used entries
+    are evicted first. Hit / miss counters are per process.
+
+    Lookups are plain reads (WAL: no write lock, concurrent readers don't
+    queue). The access-time bumps they imply are buffered and written in one
+    batch: by put() before it evicts, every TOUCH_BATCH hits, or on close().
+    """
+    SCHEMA = [
+        '''
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            sha256 TEXT NOT NULL,
+            version TEXT NOT NULL,
+            data TEXT NOT NULL,               -- ExtractedInvoiceData as JSON
+            size_bytes INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP,
+            last_used_at TIMESTAMP,
+            PRIMARY KEY (sha256, version)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_extraction_cache_lru ON extraction_cache (last_used_at)",
+    ]
+
+    def __init__(self, db_path: str = "agent_state.db", max_bytes: int = 50 * 1024 * 1024, **kwargs):
+        super().__init__(db_path, **kwargs)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (sha256, version) -> (hits, last_used_at) not written yet
+        self._touched: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+    def get(self, sha256: str, version: str) -> Optional[ExtractedInvoiceData]:
+        row = self._connection().execute(
+            "SELECT data FROM extraction_cache WHERE sha256 = ? AND version = ?", (sha256, version)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            hits, _ = self._touched.get((sha256, version), (0, None))
+            self._touched[(sha256, version)] = (hits + 1, datetime.datetime.now().isoformat())
+            full = len(self._touched) >= TOUCH_BATCH
+        if full:
+            self.flush()
+        return ExtractedInvoiceData(detected_poc_change=False, **json.loads(row["data"]))
+
+    def flush(self):
+        """Writes the buffered hits / last_used_at updates."""
+        with self.transaction() as conn:
+            self._write_touches(conn)
+
+    def _write_touches(self, conn):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE extraction_cache SET hits = hits + ?, last_used_at = MAX(COALESCE(last_used_at, ''), ?) "
+                "WHERE sha256 = ? AND version = ?",
+                [(hits, used_at, sha256, version) for (sha256, version), (hits, used_at) in touched.items()]
+            )
+
+    def close(self):
+        if self._touched:
+            self.flush()
+        super().close()
+
+    def put(self, sha256: str, version: str, data: ExtractedInvoiceData):
+        fields = {k: v for k, v in asdict(data).items() if k not in EMAIL_SPECIFIC_FIELDS}
+        payload = json.dumps(fields)
+        now = datetime.datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO extraction_cache (sha256, version, data, size_bytes, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(sha256, version) DO UPDATE SET
+                    data = excluded.data, size_bytes = excluded.size_bytes, last_used_at = excluded.last_used_at
+            ''', (sha256, version, payload, len(payload), now, now))
+            # Recent hits must count before picking what to evict
+            self._write_touches(conn)
+            evicted = self._evict(conn)
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def _evict(self, conn) -> int:
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for row in conn.execute(
+            "SELECT rowid, size_bytes FROM extraction_cache ORDER BY last_used_at, rowid"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM extraction_cache WHERE rowid = ?", (row["rowid"],))
+            total -= row["size_bytes"]
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Dict:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM extraction_cache"
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
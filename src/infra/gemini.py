@@ -10,6 +10,9 @@ from src.core.interfaces import ILLMProvider
 from src.models import ExtractedInvoiceData
 
 class GeminiLLMProvider(ILLMProvider):
+    # Bump when the extraction prompt below changes (invalidates cached extractions)
+    EXTRACTION_PROMPT_VERSION = "1"
+
     def __init__(self, api_key: str):
         self.client = genai.Client(api_key=api_key)
         self.model_name = "gemini-2.0-flash"
@@ -22,6 +25,9 @@ class GeminiLLMProvider(ILLMProvider):
             text = text.split("```")[1].split("```")[0]
         return text.strip()
 
+    def extraction_version(self) -> str:
+        return f"{self.model_name}/prompt-v{self.EXTRACTION_PROMPT_VERSION}"
+
     def extract_invoice_data(self, text_context: str, image_paths: List[str]) -> ExtractedInvoiceData:
         images = []
         for path in image_paths:
@@ -85,8 +91,9 @@ class GeminiLLMProvider(ILLMProvider):
             )
 
         except Exception as e:
+            # Raised, not returned as an empty result: callers record "nothing found" as final
             print(f"LLM Vision Extraction Error: {e}")
-            return ExtractedInvoiceData([], False, None)
+            raise
 
     def draft_reply(self, sender: str, missing_invoices: List[str], received_invoices: List[str], context: str) -> str:
         prompt = f"""
@@ -1,6 +1,7 @@
 import os
 import base64
-from typing import List
+import threading
+from typing import Iterator, List, Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from google.oauth2.credentials import Credentials
@@ -13,10 +14,14 @@ from src.models import EmailMessage
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
 
 class GmailProvider(IEmailProvider):
-    def __init__(self, credentials_path="credentials.json", token_path="token.json"):
+    def __init__(self, credentials_path="credentials.json", token_path="token.json", processed_label="invoice-agent-processed"):
         self.creds = None
         self.service = None
         self.download_folder = "download"
+        self.processed_label = processed_label
+        self._processed_label_id = None
+        self._label_lock = threading.Lock()
+        self._local = threading.local()
         
         if not os.path.exists(self.download_folder):
             os.makedirs(self.download_folder)
@@ -39,69 +44,120 @@ class GmailProvider(IEmailProvider):
 
         self.service = build('gmail', 'v1', credentials=self.creds)
 
+    def _thread_service(self):
+        """
+        The API client's HTTP transport is not thread-safe: pipeline workers
+        each build their own client from the shared credentials.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.service
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = build('gmail', 'v1', credentials=self.creds)
+            self._local.service = service
+        return service
+
     def fetch_unread_emails(self, limit: int = 5) -> List[EmailMessage]:
         if not self.service: return []
-        
-        # Get unread messages
-        results = self.service.users().messages().list(
-            userId='me', q='is:unread', maxResults=limit
-        ).execute()
-        
-        messages = results.get('messages', [])
-        email_objects = []
-
-        for msg in messages:
-            msg_detail = self.service.users().messages().get(userId='me', id=msg['id']).execute()
-            payload = msg_detail['payload']
-            headers = payload['headers']
-            
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
-            thread_id = msg_detail['threadId']
-            
-            body = msg_detail.get('snippet', '')
-
-            attachments = []
-            parts = payload.get('parts', [])
-            
-            if not parts and 'body' in payload:
-                pass 
-            else:
-                for part in parts:
-                    filename = part.get('filename')
-                    if not filename: continue
-                    
-                    # --- CRITICAL FIX: ALLOW ZIP FILES ---
-                    # We now download .pdf AND .zip files
-                    ext = filename.lower()
-                    if ext.endswith('.pdf') or ext.endswith('.zip'):
-                        if 'data' in part['body']:
-                            data = part['body']['data']
-                        elif 'attachmentId' in part['body']:
-                            att_id = part['body']['attachmentId']
-                            att = self.service.users().messages().attachments().get(
-                                userId='me', messageId=msg['id'], id=att_id
-                            ).execute()
-                            data = att['data']
-                        else:
-                            continue
-                        
-                        file_data = base64.urlsafe_b64decode(data.encode('UTF-8'))
-                        path = os.path.join(self.download_folder, filename)
-                        with open(path, 'wb') as f:
-                            f.write(file_data)
-                        attachments.append(path)
-            
-            email_objects.append(EmailMessage(
-                id=msg['id'],
-                thread_id=thread_id,
-                sender=sender,
-                subject=subject,
-                body=body,
-                attachments=attachments
-            ))
-        
-        return email_objects
+        return [self.fetch_email(message_id) for message_id in self.list_unread_message_ids(limit)]
+
+    def list_unread_message_ids(self, limit: Optional[int] = 5) -> Iterator[str]:
+        if not self.service: return
+
+        # Get unread messages (IDs only; pages are fetched as the consumer asks).
+        # Handled mail carries the processed label, so it is not listed again
+        query = f'is:unread -label:{self.processed_label}'
+        page_token = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = 500 if remaining is None else min(remaining, 500)
+            results = self._thread_service().users().messages().list(
+                userId='me', q=query, maxResults=page_size, pageToken=page_token
+            ).execute()
+
+            for msg in results.get('messages', [])[:page_size]:
+                yield msg['id']
+                if remaining is not None:
+                    remaining -= 1
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _label_id(self) -> str:
+        """ID of the processed label, created on first use."""
+        with self._label_lock:
+            if self._processed_label_id is None:
+                labels = self._thread_service().users().labels()
+                existing = labels.list(userId='me').execute().get('labels', [])
+                label = next((l for l in existing if l['name'] == self.processed_label), None)
+                if label is None:
+                    label = labels.create(userId='me', body={'name': self.processed_label}).execute()
+                self._processed_label_id = label['id']
+            return self._processed_label_id
+
+    def mark_processed(self, message_id: str):
+        if not self.service: return
+        try:
+            self._thread_service().users().messages().modify(
+                userId='me', id=message_id, body={'addLabelIds': [self._label_id()]}
+            ).execute()
+        except Exception as e:
+            # The ledger still skips it; only the listing gets longer
+            print(f"Failed to label email {message_id}: {e}")
+
+    def fetch_email(self, message_id: str) -> EmailMessage:
+        service = self._thread_service()
+        msg_detail = service.users().messages().get(userId='me', id=message_id).execute()
+        payload = msg_detail['payload']
+        headers = payload['headers']
+
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), "Unknown")
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "No Subject")
+        thread_id = msg_detail['threadId']
+
+        body = msg_detail.get('snippet', '')
+
+        attachments = []
+        parts = payload.get('parts', [])
+
+        # One folder per message: two vendors' "invoice.pdf" must not overwrite each other
+        message_folder = os.path.join(self.download_folder, message_id)
+
+        for part in parts:
+            filename = part.get('filename')
+            if not filename: continue
+
+            # --- CRITICAL FIX: ALLOW ZIP FILES ---
+            # We now download .pdf AND .zip files
+            ext = filename.lower()
+            if ext.endswith('.pdf') or ext.endswith('.zip'):
+                if 'data' in part['body']:
+                    data = part['body']['data']
+                elif 'attachmentId' in part['body']:
+                    att_id = part['body']['attachmentId']
+                    att = service.users().messages().attachments().get(
+                        userId='me', messageId=message_id, id=att_id
+                    ).execute()
+                    data = att['data']
+                else:
+                    continue
+
+                file_data = base64.urlsafe_b64decode(data.encode('UTF-8'))
+                os.makedirs(message_folder, exist_ok=True)
+                path = os.path.join(message_folder, os.path.basename(filename))
+                with open(path, 'wb') as f:
+                    f.write(file_data)
+                attachments.append(path)
+
+        return EmailMessage(
+            id=message_id,
+            thread_id=thread_id,
+            sender=sender,
+            subject=subject,
+            body=body,
+            attachments=attachments
+        )
 
     def _create_message(self, to_email, subject, body_html, thread_id=None):
         message = MIMEMultipart()
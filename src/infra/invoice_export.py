@@ -0,0 +1,24 @@
+import csv
+from typing import TextIO
+
+from src.core.interfaces import IInvoiceStore
+
+EXPORT_COLUMNS = ["id", "invoice_number", "vendor_email", "amount", "status", "gstin", "hotel_name", "workspace", "thread_id", "filename"]
+
+
+def export_invoices_csv(repo: IInvoiceStore, out: TextIO, page_size: int = 1000, **filters) -> int:
+    """
+    Writes matching invoices as CSV, page by page (keyset pagination), so
+    memory stays at one page regardless of table size. Returns the row count.
+    Filters are those of the repository's get_invoice_page (SQLite or SQLAlchemy).
+    """
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for inv in repo.iter_invoices(page_size=page_size, **filters):
+        writer.writerow([
+            inv.id, inv.invoice_number, inv.vendor_email, inv.amount, inv.status.value,
+            inv.gstin, inv.hotel_name, inv.workspace, inv.thread_id or "", inv.filename or ""
+        ])
+        count += 1
+    return count
@@ -0,0 +1,186 @@
+import os
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.core.interfaces import IInvoiceStore
+from src.models import Invoice, InvoiceStatus
+
+# Expected columns / JSON keys (same names as the Invoice fields)
+REQUIRED_FIELDS = ("invoice_number", "vendor_email")
+MAX_REJECTS_KEPT = 1000
+
+
+@dataclass
+class ImportProgress:
+    source: str
+    checkpoint: str = ""      # Resume key: the source plus its size and mtime
+    row_offset: int = 0       # Data rows consumed so far (committed), i.e. the resume point
+    imported: int = 0
+    rejected: int = 0
+    rejects: List[Tuple[int, str]] = field(default_factory=list)   # (row number, reason), capped
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Dict]:
+    """Streams raw records; never holds the whole file in memory."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                # Blank / broken lines still count as rows so offsets stay stable
+                line = line.strip()
+                try:
+                    yield json.loads(line) if line else {}
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"invalid JSON: {e.msg}")
+
+
+def _checkpoint_key(path: str) -> str:
+    """
+    Resume key for `path`. Includes size and mtime so a new export saved under the
+    same name starts from row 0 instead of inheriting the previous file's offset.
+    """
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _to_invoice(record: Dict) -> Invoice:
+    """Validates one record. Raises ValueError with a readable reason."""
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    for name in REQUIRED_FIELDS:
+        if not str(record.get(name) or "").strip():
+            raise ValueError(f"missing {name}")
+
+    vendor_email = str(record["vendor_email"]).strip()
+    if "@" not in vendor_email:
+        raise ValueError(f"invalid vendor_email '{vendor_email}'")
+
+    raw_amount = record.get("amount")
+    try:
+        amount = float(raw_amount) if raw_amount not in (None, "") else 0.0
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid amount '{raw_amount}'")
+
+    raw_status = str(record.get("status") or InvoiceStatus.PENDING.value).strip().upper()
+    try:
+        status = InvoiceStatus(raw_status)
+    except ValueError:
+        raise ValueError(f"invalid status '{raw_status}'")
+
+    return Invoice(
+        id=None,
+        invoice_number=str(record["invoice_number"]).strip(),
+        vendor_email=vendor_email,
+        amount=amount,
+        status=status,
+        gstin=str(record.get("gstin") or ""),
+        hotel_name=str(record.get("hotel_name") or ""),
+        workspace=str(record.get("workspace") or ""),
+    )
+
+
+class InvoiceImporter:
+    """
+    Streams CSV / JSONL exports of expected invoices into the repository.
+
+    Rows are validated and inserted in chunks, each chunk in one transaction
+    together with its resume offset, so an interrupted import picks up at the
+    first uncommitted row. Secondary indexes and the per-row summary
+    maintenance can be dropped for the duration of the load and rebuilt once
+    at the end. Works with either repository (both keep import checkpoints
+    and can drop / rebuild their indexes and summary). Events are still
+    logged per row: incremental consumers see a CREATED for every imported
+    invoice.
+    """
+
+    def __init__(
+        self,
+        repo: IInvoiceStore,
+        chunk_size: int = 5000,
+        on_progress: Optional[Callable[[ImportProgress], None]] = None
+    ):
+        self.repo = repo
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            return "csv"
+        if ext in (".jsonl", ".ndjson"):
+            return "jsonl"
+        raise ValueError(f"Unsupported import format: {path} (expected .csv or .jsonl)")
+
+    def import_file(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        resume: bool = True,
+        start_offset: Optional[int] = None,
+        defer_indexes: bool = True,
+        defer_summary: bool = True
+    ) -> ImportProgress:
+        """
+        Imports `path`. Resumes from the stored checkpoint of this exact file
+        (same path, size and mtime) unless `resume` is False; `start_offset`
+        overrides both.
+        """
+        fmt = fmt or self.detect_format(path)
+        checkpoint = _checkpoint_key(path)
+        if start_offset is None:
+            start_offset = self.repo.get_import_offset(checkpoint) if resume else 0
+            if start_offset:
+                print(f"   ⏩ Resuming {path}: skipping {start_offset:,} rows already imported (restart to re-import them).")
+
+        progress = ImportProgress(source=os.path.abspath(path), checkpoint=checkpoint, row_offset=start_offset)
+        rows = islice(_read_rows(path, fmt), start_offset, None)
+
+        if defer_indexes:
+            self.repo.drop_secondary_indexes()
+        if defer_summary:
+            self.repo.defer_summary()
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, progress)
+                if self.on_progress:
+                    self.on_progress(progress)
+        finally:
+            if defer_summary:
+                self.repo.rebuild_summary()
+            if defer_indexes:
+                self.repo.create_secondary_indexes()
+
+        return progress
+
+    def _import_chunk(self, chunk: List[Dict], progress: ImportProgress):
+        invoices = []
+        rejects = []
+        for i, record in enumerate(chunk):
+            row_number = progress.row_offset + i + 1
+            try:
+                invoices.append(_to_invoice(record))
+            except ValueError as e:
+                rejects.append((row_number, str(e)))
+
+        # Rows + resume point commit atomically
+        with self.repo.transaction():
+            self.repo.add_invoices(invoices)
+            self.repo.set_import_offset(progress.checkpoint, progress.row_offset + len(chunk))
+
+        progress.row_offset += len(chunk)
+        progress.imported += len(invoices)
+        progress.rejected += len(rejects)
+        room = MAX_REJECTS_KEPT - len(progress.rejects)
+        progress.rejects.extend(rejects[:max(room, 0)])
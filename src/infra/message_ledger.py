@@ -0,0 +1,89 @@
+import datetime
+import json
+from typing import List, Optional
+
+from src.core.interfaces import IProcessedLedger
+from src.infra.sqlite_store import SQLiteStore
+from src.models import MessageOutcome, ProcessedAttachment
+
+
+class SQLiteProcessedLedger(SQLiteStore, IProcessedLedger):
+    """
+    Which Gmail messages the reconciliation cycle has finished, and what every
+    attachment (by SHA-256 of its bytes) extracted to. Lets the scheduler rerun
+    on the same unread inbox without re-downloading or re-OCR'ing anything.
+    """
+    SCHEMA = [
+        '''
+        CREATE TABLE IF NOT EXISTS processed_messages (
+            message_id TEXT PRIMARY KEY,
+            thread_id TEXT,
+            sender TEXT,
+            outcome TEXT NOT NULL,
+            processed_at TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS processed_attachments (
+            sha256 TEXT PRIMARY KEY,
+            message_id TEXT,
+            filename TEXT,
+            invoice_numbers TEXT NOT NULL,   -- JSON list
+            failed INTEGER NOT NULL DEFAULT 0,
+            processed_at TIMESTAMP
+        )
+        ''',
+    ]
+
+    def is_processed(self, message_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM processed_messages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_attachment(self, sha256: str) -> Optional[ProcessedAttachment]:
+        row = self._connection().execute(
+            "SELECT * FROM processed_attachments WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        if row is None:
+            return None
+        return ProcessedAttachment(
+            sha256=row["sha256"],
+            filename=row["filename"],
+            invoice_numbers=json.loads(row["invoice_numbers"]),
+            failed=bool(row["failed"]),
+            processed_at=datetime.datetime.fromisoformat(row["processed_at"]) if row["processed_at"] else None
+        )
+
+    def record_message(
+        self, message_id: str, thread_id: str, sender: str,
+        outcome: MessageOutcome, attachments: List[ProcessedAttachment]
+    ):
+        now = datetime.datetime.now().isoformat()
+        with self.transaction() as conn:
+            # A successful extraction is never overwritten by a later failure of the same bytes
+            conn.executemany('''
+                INSERT INTO processed_attachments (sha256, message_id, filename, invoice_numbers, failed, processed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    message_id = excluded.message_id, filename = excluded.filename,
+                    invoice_numbers = excluded.invoice_numbers, failed = excluded.failed,
+                    processed_at = excluded.processed_at
+                WHERE processed_attachments.failed = 1 OR excluded.failed = 0
+            ''', [
+                (a.sha256, message_id, a.filename, json.dumps(a.invoice_numbers), int(a.failed), now)
+                for a in attachments
+            ])
+            conn.execute('''
+                INSERT INTO processed_messages (message_id, thread_id, sender, outcome, processed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET outcome = excluded.outcome, processed_at = excluded.processed_at
+            ''', (message_id, thread_id, sender, outcome.value, now))
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        by_outcome = dict(conn.execute(
+            "SELECT outcome, COUNT(*) FROM processed_messages GROUP BY outcome"
+        ).fetchall())
+        attachments = conn.execute("SELECT COUNT(*) FROM processed_attachments").fetchone()[0]
+        return {"messages": by_outcome, "attachments": attachments}
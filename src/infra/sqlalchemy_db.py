@@ -0,0 +1,764 @@
+import datetime
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import List, Dict, Optional, Iterator, Iterable, Mapping
+
+from sqlalchemy import (
+    MetaData, Table, Column, Index, Integer, String, Float, DateTime,
+    ForeignKey, create_engine, event, select, insert, update, delete,
+    func, case, or_, bindparam, inspect, text
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine, make_url
+
+from src.core.interfaces import IInvoiceStore
+from src.core.matching import normalize_invoice_id
+from src.infra.sqlite_db import SQLiteInvoiceRepository, SUMMARY_TRIGGERS, summary_trigger_statements, _invoice_key_suffix
+from src.models import Invoice, InvoiceStatus, InvoiceReceipt, InvoicePage, InvoiceEvent, InvoiceEventType
+
+# Same layout as the SQLite repository's migrated schema, so data can move
+# between the two and the analytics / pagination queries mean the same thing.
+metadata = MetaData()
+
+vendor_table = Table(
+    "vendors", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(320)),
+)
+
+contact_table = Table(
+    "vendor_contacts", metadata,
+    Column("address", String(320), primary_key=True),
+    Column("vendor_id", Integer, ForeignKey("vendors.id"), nullable=False),
+)
+
+invoice_table = Table(
+    "invoices", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("invoice_number", String(128)),
+    Column("vendor_email", String(320)),
+    Column("amount", Float),
+    Column("status", String(16)),
+    Column("gstin", String(32)),
+    Column("hotel_name", String(255)),
+    Column("workspace", String(255)),
+    Column("thread_id", String(128)),
+    Column("filename", String(512)),
+    Column("last_reminder_sent_at", DateTime),
+    Column("received_at", DateTime),
+    Column("invoice_key", String(128)),
+    Column("invoice_key_suffix", String(16)),
+    Column("vendor_id", Integer, ForeignKey("vendors.id")),
+    Index("idx_invoices_vendor_status", "vendor_id", "status"),
+    Index("idx_invoices_key", "invoice_key", "status"),
+    Index("idx_invoices_key_suffix", "invoice_key_suffix", "status"),
+    Index("idx_invoices_status_vendor_email", "status", "vendor_email"),
+    Index("idx_invoices_status_reminder", "status", "last_reminder_sent_at"),
+    Index("idx_invoices_number", "invoice_number"),
+)
+
+# Materialized counts / amount sums per group, maintained by the write methods
+# in the same transaction (dialect-neutral, unlike the SQLite repo's triggers).
+# NULLs are stored as '' because NULLs never collide in a primary key.
+SUMMARY_GROUP = ("vendor_email", "workspace", "hotel_name", "gstin", "status")
+
+summary_table = Table(
+    "invoice_summary", metadata,
+    Column("vendor_email", String(320), primary_key=True),
+    Column("workspace", String(255), primary_key=True),
+    Column("hotel_name", String(255), primary_key=True),
+    Column("gstin", String(32), primary_key=True),
+    Column("status", String(16), primary_key=True),
+    Column("invoice_count", Integer, nullable=False),
+    Column("total_amount", Float, nullable=False),
+)
+
+# Append-only change log. Written by the write methods in the same transaction.
+# On a server database, concurrent writers can commit sequence numbers out of
+# order, so consumers that must not miss events should re-read a short window
+# behind their last seq.
+event_table = Table(
+    "invoice_events", metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("event_type", String(32), nullable=False),
+    Column("invoice_id", Integer),
+    Column("invoice_number", String(128)),
+    Column("vendor_email", String(320)),
+    Column("old_status", String(16)),
+    Column("new_status", String(16)),
+    Column("thread_id", String(128)),
+    Column("filename", String(512)),
+    Column("created_at", DateTime),
+)
+
+# Resume points for streaming imports (see src/infra/invoice_import.py)
+import_checkpoint_table = Table(
+    "import_checkpoints", metadata,
+    Column("source", String(1024), primary_key=True),
+    Column("row_offset", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+# A SQLite file created by SQLiteInvoiceRepository already maintains the summary and
+# these events with triggers; the write methods must not add them a second time.
+# Its summary triggers are missing while a bulk import defers them (defer_summary)
+EVENTS_TRIGGER = "trg_events_insert"
+TRIGGER_LOGGED_EVENTS = {
+    InvoiceEventType.CREATED, InvoiceEventType.DELETED,
+    InvoiceEventType.STATUS_CHANGED, InvoiceEventType.REMINDER_SENT,
+}
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE (others fall back to update-then-insert)
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Keeps IN (...) lists well under every driver's bound-parameter limit
+MAX_IN_PARAMS = 500
+
+
+class SQLAlchemyInvoiceRepository(IInvoiceStore):
+    """
+    IInvoiceStore on SQLAlchemy Core, for server databases shared by
+    several scheduler workers and the UI (e.g. postgresql+psycopg://...).
+
+    Connections come from the engine's pool; batches go out as one
+    executemany per statement. Queries stick to Core constructs, so the
+    same code runs on SQLite (used by the tests) and server dialects.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = 1800,
+        busy_timeout_ms: int = 5000,
+        engine: Optional[Engine] = None
+    ):
+        self.engine = engine or self._create_engine(db_url, pool_size, max_overflow, pool_recycle, busy_timeout_ms)
+        # Connection of the transaction() block the current thread is inside, if any
+        self._local = threading.local()
+        backfill_summary = not inspect(self.engine).has_table("invoice_summary")
+        metadata.create_all(self.engine)
+        self._summary_by_triggers, self._events_by_triggers = self._detect_triggers()
+        # ...or a crashed import left the summary triggers dropped: rebuild_summary re-creates them
+        if backfill_summary or self._summary_by_triggers and self._summary_deferred():
+            self.rebuild_summary()
+
+    @staticmethod
+    def _create_engine(db_url: str, pool_size: int, max_overflow: int, pool_recycle: int, busy_timeout_ms: int) -> Engine:
+        url = make_url(db_url)
+        options = {"pool_pre_ping": True}
+        in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+        if not in_memory:
+            # Bounded pool: enough for the worker threads, capped so N workers can't exhaust the server
+            options.update(pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle)
+        engine = create_engine(url, **options)
+
+        if url.get_backend_name() == "sqlite":
+            @event.listens_for(engine, "connect")
+            def _tune_sqlite(dbapi_conn, _record):
+                # Same tuning as SQLiteInvoiceRepository for the file-backed stand-in
+                dbapi_conn.execute("PRAGMA journal_mode=WAL")
+                dbapi_conn.execute("PRAGMA synchronous=NORMAL")
+                dbapi_conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        return engine
+
+    # --- CONNECTION LAYER ---
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """
+        Runs the block in one transaction on a pooled connection (COMMIT on
+        success, ROLLBACK on error). Nested calls join the outer transaction.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        with self.engine.begin() as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    @contextmanager
+    def _reader(self) -> Iterator[Connection]:
+        """Reads see the current thread's open transaction, else borrow a pooled connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.engine.connect() as conn:
+            yield conn
+
+    def close(self):
+        """Closes every pooled connection."""
+        self.engine.dispose()
+
+    # --- VENDORS ---
+    @staticmethod
+    def _normalize_address(address: str) -> str:
+        return address.strip().lower()
+
+    def _ensure_vendor(self, conn: Connection, vendor_email: str) -> int:
+        """Returns the vendor owning `vendor_email`, registering a new one if unknown."""
+        address = self._normalize_address(vendor_email)
+        vendor_id = conn.execute(
+            select(contact_table.c.vendor_id).where(contact_table.c.address == address)
+        ).scalar()
+        if vendor_id is not None:
+            return vendor_id
+        vendor_id = conn.execute(insert(vendor_table).values(name=address)).inserted_primary_key[0]
+        conn.execute(insert(contact_table).values(address=address, vendor_id=vendor_id))
+        return vendor_id
+
+    def _resolve_vendor_id(self, conn: Connection, sender_email: str) -> Optional[int]:
+        """Exact address first, then the sender's whole domain ('@hotel.com')."""
+        address = self._normalize_address(sender_email)
+        candidates = [address]
+        if "@" in address:
+            candidates.append("@" + address.split("@", 1)[1])
+
+        rows = conn.execute(
+            select(contact_table.c.address, contact_table.c.vendor_id)
+            .where(contact_table.c.address.in_(candidates))
+        ).all()
+        found = {row.address: row.vendor_id for row in rows}
+        for candidate in candidates:
+            if candidate in found:
+                return found[candidate]
+        return None
+
+    def add_vendor_contact(self, vendor_email: str, address: str):
+        """
+        Links another billing address, or a whole domain given as '@hotel.com',
+        to the vendor that owns `vendor_email`.
+        """
+        address = self._normalize_address(address)
+        with self.transaction() as conn:
+            vendor_id = self._ensure_vendor(conn, vendor_email)
+            # Dialect-neutral upsert: repoint if present, insert otherwise
+            moved = conn.execute(
+                update(contact_table).where(contact_table.c.address == address).values(vendor_id=vendor_id)
+            ).rowcount
+            if not moved:
+                conn.execute(insert(contact_table).values(address=address, vendor_id=vendor_id))
+
+    def _trigger_names(self) -> set:
+        if self.engine.dialect.name != "sqlite":
+            return set()
+        with self.engine.connect() as conn:
+            return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+
+    def _detect_triggers(self) -> tuple:
+        """(summary, events) already maintained by the SQLite repository's triggers."""
+        names = self._trigger_names()
+        # The SQLite repository creates both sets; the summary ones may be deferred
+        by_triggers = EVENTS_TRIGGER in names or SUMMARY_TRIGGERS[0] in names
+        return by_triggers, EVENTS_TRIGGER in names
+
+    def _summary_deferred(self) -> bool:
+        return not set(SUMMARY_TRIGGERS) <= self._trigger_names()
+
+    # --- STATUS SUMMARY ---
+    @staticmethod
+    def _group_key(values: Mapping) -> tuple:
+        return tuple(values[column] or "" for column in SUMMARY_GROUP)
+
+    def _apply_summary_deltas(self, conn: Connection, deltas: Dict[tuple, List[float]]):
+        """Adds [count, amount] deltas to their summary groups and prunes emptied groups."""
+        if self._summary_by_triggers:
+            return
+        rows = [
+            dict(zip(SUMMARY_GROUP, key), invoice_count=int(count), total_amount=amount)
+            for key, (count, amount) in deltas.items() if count or amount
+        ]
+        if not rows:
+            return
+
+        make_insert = UPSERT_DIALECTS.get(conn.dialect.name)
+        if make_insert:
+            stmt = make_insert(summary_table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(SUMMARY_GROUP),
+                set_={
+                    "invoice_count": summary_table.c.invoice_count + stmt.excluded.invoice_count,
+                    "total_amount": summary_table.c.total_amount + stmt.excluded.total_amount,
+                }
+            )
+            conn.execute(stmt, rows)
+        else:
+            for row in rows:
+                moved = conn.execute(
+                    update(summary_table)
+                    .where(*(summary_table.c[column] == row[column] for column in SUMMARY_GROUP))
+                    .values(
+                        invoice_count=summary_table.c.invoice_count + row["invoice_count"],
+                        total_amount=summary_table.c.total_amount + row["total_amount"],
+                    )
+                ).rowcount
+                if not moved:
+                    conn.execute(insert(summary_table).values(**row))
+        conn.execute(delete(summary_table).where(summary_table.c.invoice_count <= 0))
+
+    def _summary_deltas(self, rows: Iterable[Mapping], sign: int, status: Optional[str] = None) -> Dict[tuple, List[float]]:
+        """[count, amount] per group for invoice `rows`, optionally re-grouped under a new status."""
+        deltas: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+        for row in rows:
+            key = self._group_key(row)
+            if status is not None:
+                key = key[:-1] + (status,)
+            deltas[key][0] += sign
+            deltas[key][1] += sign * (row["amount"] or 0)
+        return deltas
+
+    def _receive_deltas(self, rows: List[Mapping]) -> Dict[tuple, List[float]]:
+        """Summary moves for rows (not RECEIVED yet) that are about to become RECEIVED."""
+        deltas = self._summary_deltas(rows, -1)
+        for key, (count, amount) in self._summary_deltas(rows, 1, InvoiceStatus.RECEIVED.value).items():
+            deltas[key][0] += count
+            deltas[key][1] += amount
+        return deltas
+
+    @staticmethod
+    def _locked_rows(conn: Connection, *conditions) -> List[Mapping]:
+        """The rows a write is about to change (summary + event columns), locked FOR UPDATE."""
+        columns = [invoice_table.c[column] for column in SUMMARY_GROUP] + [
+            invoice_table.c.id, invoice_table.c.invoice_number, invoice_table.c.amount
+        ]
+        rows = conn.execute(select(*columns).where(*conditions).with_for_update()).all()
+        return [row._mapping for row in rows]
+
+    def _log_events(self, conn: Connection, event_type: InvoiceEventType, rows: List[Mapping], **fields):
+        """
+        Appends one event per invoice row. `fields` (old_status, new_status,
+        thread_id, filename) are values, or callables taking the row.
+        """
+        if not rows or (self._events_by_triggers and event_type in TRIGGER_LOGGED_EVENTS):
+            return
+        now = datetime.datetime.now()
+        events = []
+        for row in rows:
+            event = {
+                "event_type": event_type.value, "invoice_id": row["id"],
+                "invoice_number": row["invoice_number"], "vendor_email": row["vendor_email"],
+                "old_status": None, "new_status": None, "thread_id": None, "filename": None,
+                "created_at": now,
+            }
+            for name, value in fields.items():
+                event[name] = value(row) if callable(value) else value
+            events.append(event)
+        conn.execute(insert(event_table), events)
+
+    def defer_summary(self):
+        """
+        For bulk loads. Writes here already apply one upsert per summary group
+        per batch, so only a trigger-maintained SQLite file changes: its summary
+        triggers are dropped until rebuild_summary().
+        """
+        if not self._summary_by_triggers:
+            return
+        with self.transaction() as conn:
+            for name in SUMMARY_TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+    def rebuild_summary(self):
+        """Recomputes invoice_summary from scratch (repair tool / end of a bulk load; writes keep it current)."""
+        grouped = [func.coalesce(invoice_table.c[column], "") for column in SUMMARY_GROUP]
+        with self.transaction() as conn:
+            if self._summary_by_triggers:
+                for statement in summary_trigger_statements():
+                    conn.exec_driver_sql(statement)
+            conn.execute(delete(summary_table))
+            conn.execute(insert(summary_table).from_select(
+                list(SUMMARY_GROUP) + ["invoice_count", "total_amount"],
+                select(*grouped, func.count(), func.coalesce(func.sum(invoice_table.c.amount), 0))
+                .group_by(*grouped)
+            ))
+
+    def create_secondary_indexes(self):
+        with self.transaction() as conn:
+            for index in invoice_table.indexes:
+                index.create(conn, checkfirst=True)
+
+    def drop_secondary_indexes(self):
+        """For bulk loads: inserting without index maintenance, then one rebuild, is far cheaper."""
+        with self.transaction() as conn:
+            for index in invoice_table.indexes:
+                index.drop(conn, checkfirst=True)
+
+    # --- IMPORT CHECKPOINTS ---
+    def get_import_offset(self, source: str) -> int:
+        with self._reader() as conn:
+            offset = conn.execute(
+                select(import_checkpoint_table.c.row_offset).where(import_checkpoint_table.c.source == source)
+            ).scalar()
+        return offset or 0
+
+    def set_import_offset(self, source: str, row_offset: int):
+        """Call inside the chunk's transaction so the rows and the offset commit together."""
+        now = datetime.datetime.now()
+        with self.transaction() as conn:
+            moved = conn.execute(
+                update(import_checkpoint_table).where(import_checkpoint_table.c.source == source)
+                .values(row_offset=row_offset, updated_at=now)
+            ).rowcount
+            if not moved:
+                conn.execute(insert(import_checkpoint_table).values(source=source, row_offset=row_offset, updated_at=now))
+
+    # --- WRITES ---
+    def add_invoice(self, invoice: Invoice):
+        self.add_invoices([invoice])
+
+    def add_invoices(self, invoices: List[Invoice]):
+        """Inserts a batch as one executemany in one transaction."""
+        if not invoices:
+            return
+        with self.transaction() as conn:
+            vendor_ids: Dict[str, int] = {}
+            rows = []
+            for invoice in invoices:
+                if invoice.vendor_email not in vendor_ids:
+                    vendor_ids[invoice.vendor_email] = self._ensure_vendor(conn, invoice.vendor_email)
+                invoice_key = normalize_invoice_id(invoice.invoice_number)
+                rows.append({
+                    "invoice_number": invoice.invoice_number,
+                    "vendor_email": invoice.vendor_email,
+                    "amount": invoice.amount,
+                    "status": invoice.status.value,
+                    "gstin": invoice.gstin,
+                    "hotel_name": invoice.hotel_name,
+                    "workspace": invoice.workspace,
+                    "thread_id": invoice.thread_id,
+                    "filename": invoice.filename,
+                    "last_reminder_sent_at": None,
+                    "received_at": None,
+                    "invoice_key": invoice_key,
+                    "invoice_key_suffix": _invoice_key_suffix(invoice_key),
+                    "vendor_id": vendor_ids[invoice.vendor_email],
+                })
+            if conn.dialect.insert_executemany_returning_sort_by_parameter_order:
+                ids = conn.execute(
+                    insert(invoice_table).returning(invoice_table.c.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+            else:
+                ids = [conn.execute(insert(invoice_table).values(**row)).inserted_primary_key[0] for row in rows]
+            for row, invoice_id in zip(rows, ids):
+                row["id"] = invoice_id
+
+            self._apply_summary_deltas(conn, self._summary_deltas(rows, 1))
+            self._log_events(conn, InvoiceEventType.CREATED, rows, new_status=lambda row: row["status"])
+
+    def delete_pending_invoices(self, vendor_email: str) -> int:
+        """Drops a vendor's PENDING rows (e.g. before a re-seed); RECEIVED history is kept."""
+        with self.transaction() as conn:
+            vendor_id = self._resolve_vendor_id(conn, vendor_email)
+            if vendor_id is None:
+                return 0
+            conditions = (
+                invoice_table.c.vendor_id == vendor_id,
+                invoice_table.c.status == InvoiceStatus.PENDING.value
+            )
+            doomed = self._locked_rows(conn, *conditions)
+            self._apply_summary_deltas(conn, self._summary_deltas(doomed, -1))
+            self._log_events(conn, InvoiceEventType.DELETED, doomed, old_status=lambda row: row["status"])
+            return conn.execute(delete(invoice_table).where(*conditions)).rowcount
+
+    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str, invoice_id: Optional[int] = None):
+        if invoice_id is not None:
+            self.mark_many_as_received([InvoiceReceipt(invoice_id, filename, thread_id)])
+            return
+
+        # Legacy path: every row sharing the number (possibly across vendors)
+        with self.transaction() as conn:
+            moving = self._locked_rows(
+                conn,
+                invoice_table.c.invoice_number == invoice_number,
+                invoice_table.c.status != InvoiceStatus.RECEIVED.value
+            )
+            self._apply_summary_deltas(conn, self._receive_deltas(moving))
+            self._log_events(
+                conn, InvoiceEventType.STATUS_CHANGED, moving,
+                old_status=lambda row: row["status"], new_status=InvoiceStatus.RECEIVED.value,
+                thread_id=thread_id, filename=filename
+            )
+            conn.execute(
+                update(invoice_table).where(invoice_table.c.invoice_number == invoice_number).values(
+                    status=InvoiceStatus.RECEIVED.value, filename=filename,
+                    thread_id=thread_id, received_at=datetime.datetime.now()
+                )
+            )
+
+    def mark_many_as_received(self, receipts: List[InvoiceReceipt]):
+        """One executemany in one transaction, rows targeted by primary key."""
+        if not receipts:
+            return
+        now = datetime.datetime.now()
+        stmt = update(invoice_table).where(invoice_table.c.id == bindparam("b_id")).values(
+            status=InvoiceStatus.RECEIVED.value,
+            filename=bindparam("b_filename"),
+            thread_id=bindparam("b_thread_id"),
+            received_at=now,
+        )
+        ids = sorted({r.invoice_id for r in receipts})
+        with self.transaction() as conn:
+            moving = []
+            for start in range(0, len(ids), MAX_IN_PARAMS):
+                moving += self._locked_rows(
+                    conn,
+                    invoice_table.c.id.in_(ids[start:start + MAX_IN_PARAMS]),
+                    invoice_table.c.status != InvoiceStatus.RECEIVED.value
+                )
+            self._apply_summary_deltas(conn, self._receive_deltas(moving))
+            by_id = {r.invoice_id: r for r in receipts}
+            self._log_events(
+                conn, InvoiceEventType.STATUS_CHANGED, moving,
+                old_status=lambda row: row["status"], new_status=InvoiceStatus.RECEIVED.value,
+                thread_id=lambda row: by_id[row["id"]].thread_id, filename=lambda row: by_id[row["id"]].filename
+            )
+            conn.execute(stmt, [
+                {"b_id": r.invoice_id, "b_filename": r.filename, "b_thread_id": r.thread_id}
+                for r in receipts
+            ])
+
+    def update_reminder_timestamp(self, vendor_email: str):
+        """Updates the reminder timestamp for all pending invoices of a vendor."""
+        conditions = (
+            invoice_table.c.vendor_email == vendor_email,
+            invoice_table.c.status == InvoiceStatus.PENDING.value
+        )
+        with self.transaction() as conn:
+            self._log_events(conn, InvoiceEventType.REMINDER_SENT, self._locked_rows(conn, *conditions))
+            conn.execute(
+                update(invoice_table).where(*conditions).values(last_reminder_sent_at=datetime.datetime.now())
+            )
+
+    # --- EVENT LOG ---
+    def record_kickoff(self, vendor_email: str, thread_id: str, invoice_ids: List[int]):
+        """Logs a KICKOFF_SENT event for each invoice listed in a kickoff email."""
+        ids = sorted(set(invoice_ids))
+        with self.transaction() as conn:
+            for start in range(0, len(ids), MAX_IN_PARAMS):
+                rows = conn.execute(
+                    select(invoice_table).where(invoice_table.c.id.in_(ids[start:start + MAX_IN_PARAMS]))
+                ).all()
+                self._log_events(
+                    conn, InvoiceEventType.KICKOFF_SENT, [row._mapping for row in rows],
+                    new_status=lambda row: row["status"], thread_id=thread_id
+                )
+
+    def changes_since(self, seq: int = 0, limit: int = 1000) -> List[InvoiceEvent]:
+        """Events after `seq`, oldest first. Pass the last seq seen to read the next batch."""
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(event_table).where(event_table.c.seq > seq).order_by(event_table.c.seq).limit(limit)
+            ).all()
+        return [self._map_row_to_event(row) for row in rows]
+
+    # --- LOOKUPS ---
+    def get_pending_invoices_by_sender(self, sender_email: str) -> List[Invoice]:
+        with self._reader() as conn:
+            vendor_id = self._resolve_vendor_id(conn, sender_email)
+            if vendor_id is None:
+                return []
+            rows = conn.execute(
+                select(invoice_table).where(
+                    invoice_table.c.vendor_id == vendor_id,
+                    invoice_table.c.status == InvoiceStatus.PENDING.value
+                ).order_by(invoice_table.c.id)
+            ).all()
+        return [self._map_row_to_invoice(row) for row in rows]
+
+    def find_pending_by_invoice_keys(self, invoice_ids: List[str]) -> List[Invoice]:
+        """
+        Cross-vendor lookup of PENDING invoices whose normalized key or last-6
+        suffix equals that of any given ID (indexed IN lookups, chunked).
+        """
+        keys = sorted({normalize_invoice_id(i) for i in invoice_ids if i})
+        suffixes = sorted({_invoice_key_suffix(k) for k in keys} - {None})
+        if not keys:
+            return []
+
+        found: Dict[int, Invoice] = {}
+        with self._reader() as conn:
+            for column, values in ((invoice_table.c.invoice_key, keys), (invoice_table.c.invoice_key_suffix, suffixes)):
+                for start in range(0, len(values), MAX_IN_PARAMS):
+                    rows = conn.execute(
+                        select(invoice_table).where(
+                            invoice_table.c.status == InvoiceStatus.PENDING.value,
+                            column.in_(values[start:start + MAX_IN_PARAMS])
+                        )
+                    ).all()
+                    for row in rows:
+                        found.setdefault(row.id, self._map_row_to_invoice(row))
+        return [found[i] for i in sorted(found)]
+
+    def has_pending_from_other_vendors(self, sender_email: str) -> bool:
+        with self._reader() as conn:
+            vendor_id = self._resolve_vendor_id(conn, sender_email)
+            query = select(invoice_table.c.id).where(invoice_table.c.status == InvoiceStatus.PENDING.value)
+            if vendor_id is not None:
+                query = query.where(or_(invoice_table.c.vendor_id.is_(None), invoice_table.c.vendor_id != vendor_id))
+            return conn.execute(query.limit(1)).first() is not None
+
+    def get_vendors_needing_reminders(self, days_interval: int = 2) -> List[str]:
+        """Finds vendor emails who have pending invoices AND haven't been emailed in X days."""
+        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days_interval)
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(invoice_table.c.vendor_email).distinct().where(
+                    invoice_table.c.status == InvoiceStatus.PENDING.value,
+                    or_(invoice_table.c.last_reminder_sent_at.is_(None), invoice_table.c.last_reminder_sent_at < cutoff_date)
+                )
+            ).all()
+        return [row.vendor_email for row in rows]
+
+    # --- ANALYTICS (read from invoice_summary; result size ~ number of groups) ---
+    def _status_sum(self, column, status: InvoiceStatus):
+        return func.coalesce(func.sum(case((summary_table.c.status == status.value, column), else_=0)), 0)
+
+    def get_kpi_totals(self) -> Dict:
+        with self._reader() as conn:
+            row = conn.execute(select(
+                self._status_sum(summary_table.c.invoice_count, InvoiceStatus.RECEIVED).label("received_count"),
+                self._status_sum(summary_table.c.total_amount, InvoiceStatus.RECEIVED).label("received_value"),
+                self._status_sum(summary_table.c.invoice_count, InvoiceStatus.PENDING).label("pending_count"),
+            )).one()
+        return dict(row._mapping)
+
+    def get_client_breakdown(self) -> List[Dict]:
+        """Received value per workspace (client), largest first."""
+        amount = func.sum(summary_table.c.total_amount).label("amount")
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(func.nullif(summary_table.c.workspace, "").label("workspace"), amount)
+                .where(summary_table.c.status == InvoiceStatus.RECEIVED.value)
+                .group_by(summary_table.c.workspace)
+                .order_by(amount.desc())
+            ).all()
+        return [dict(row._mapping) for row in rows]
+
+    def get_hotel_breakdown(self) -> List[Dict]:
+        """Received count and value per hotel / GSTIN."""
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(
+                    func.nullif(summary_table.c.hotel_name, "").label("hotel_name"),
+                    func.nullif(summary_table.c.gstin, "").label("gstin"),
+                    func.sum(summary_table.c.invoice_count).label("invoice_count"),
+                    func.sum(summary_table.c.total_amount).label("total_value"),
+                )
+                .where(summary_table.c.status == InvoiceStatus.RECEIVED.value)
+                .group_by(summary_table.c.hotel_name, summary_table.c.gstin)
+                .order_by(summary_table.c.hotel_name, summary_table.c.gstin)
+            ).all()
+        return [dict(row._mapping) for row in rows]
+
+    def get_vendor_breakdown(self) -> List[Dict]:
+        """Pending / received counts and values per vendor."""
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(
+                    summary_table.c.vendor_email,
+                    self._status_sum(summary_table.c.invoice_count, InvoiceStatus.PENDING).label("pending_count"),
+                    self._status_sum(summary_table.c.total_amount, InvoiceStatus.PENDING).label("pending_value"),
+                    self._status_sum(summary_table.c.invoice_count, InvoiceStatus.RECEIVED).label("received_count"),
+                    self._status_sum(summary_table.c.total_amount, InvoiceStatus.RECEIVED).label("received_value"),
+                )
+                .group_by(summary_table.c.vendor_email)
+                .order_by(summary_table.c.vendor_email)
+            ).all()
+        return [dict(row._mapping) for row in rows]
+
+    def get_recent_received(self, limit: int = 10) -> List[Dict]:
+        with self._reader() as conn:
+            rows = conn.execute(
+                select(
+                    invoice_table.c.invoice_number, invoice_table.c.status, invoice_table.c.hotel_name,
+                    invoice_table.c.workspace, invoice_table.c.amount, invoice_table.c.gstin, invoice_table.c.received_at
+                )
+                .where(invoice_table.c.status == InvoiceStatus.RECEIVED.value)
+                .order_by(invoice_table.c.received_at.desc(), invoice_table.c.id.desc())
+                .limit(limit)
+            ).all()
+        return [dict(row._mapping) for row in rows]
+
+    # --- KEYSET PAGINATION (same cursor format as the SQLite repository) ---
+    def get_invoice_page(
+        self,
+        status: Optional[InvoiceStatus] = None,
+        vendor_email: Optional[str] = None,
+        received_after: Optional[datetime.datetime] = None,
+        received_before: Optional[datetime.datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> InvoicePage:
+        """One page in id order, seeking past the cursor's id (no OFFSET)."""
+        stmt = select(invoice_table)
+        with self._reader() as conn:
+            if status is not None:
+                stmt = stmt.where(invoice_table.c.status == status.value)
+            if vendor_email is not None:
+                vendor_id = self._resolve_vendor_id(conn, vendor_email)
+                if vendor_id is None:
+                    return InvoicePage(invoices=[])
+                stmt = stmt.where(invoice_table.c.vendor_id == vendor_id)
+            if received_after is not None:
+                stmt = stmt.where(invoice_table.c.received_at >= received_after)
+            if received_before is not None:
+                stmt = stmt.where(invoice_table.c.received_at < received_before)
+            if cursor:
+                stmt = stmt.where(invoice_table.c.id > SQLiteInvoiceRepository._decode_cursor(cursor))
+            # One extra row tells us whether another page exists
+            rows = conn.execute(stmt.order_by(invoice_table.c.id).limit(limit + 1)).all()
+
+        page = [self._map_row_to_invoice(row) for row in rows[:limit]]
+        next_cursor = SQLiteInvoiceRepository._encode_cursor(page[-1].id) if len(rows) > limit else None
+        return InvoicePage(invoices=page, next_cursor=next_cursor)
+
+    def iter_invoices(self, page_size: int = 1000, **filters) -> Iterator[Invoice]:
+        """Streams every matching invoice, holding at most one page in memory."""
+        cursor = None
+        while True:
+            page = self.get_invoice_page(cursor=cursor, limit=page_size, **filters)
+            yield from page.invoices
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
+    def get_all_invoices(self) -> List[Invoice]:
+        with self._reader() as conn:
+            rows = conn.execute(select(invoice_table).order_by(invoice_table.c.id)).all()
+        return [self._map_row_to_invoice(row) for row in rows]
+
+    def _map_row_to_event(self, row) -> InvoiceEvent:
+        return InvoiceEvent(
+            seq=row.seq,
+            event_type=InvoiceEventType(row.event_type),
+            invoice_id=row.invoice_id,
+            invoice_number=row.invoice_number,
+            vendor_email=row.vendor_email,
+            old_status=InvoiceStatus(row.old_status) if row.old_status else None,
+            new_status=InvoiceStatus(row.new_status) if row.new_status else None,
+            thread_id=row.thread_id,
+            filename=row.filename,
+            created_at=row.created_at
+        )
+
+    def _map_row_to_invoice(self, row) -> Invoice:
+        return Invoice(
+            id=row.id,
+            invoice_number=row.invoice_number,
+            vendor_email=row.vendor_email,
+            amount=row.amount,
+            status=InvoiceStatus(row.status),
+            gstin=row.gstin,
+            hotel_name=row.hotel_name,
+            workspace=row.workspace,
+            thread_id=row.thread_id,
+            filename=row.filename,
+            received_at=row.received_at,
+            last_reminder_sent_at=row.last_reminder_sent_at
+        )
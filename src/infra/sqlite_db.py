@@ -1,19 +1,174 @@
 import sqlite3
 import datetime # <--- New import
-from typing import List, Dict, Optional
-from src.core.interfaces import IInvoiceRepository
-from src.models import Invoice, InvoiceStatus
+import threading
+import base64
+import json
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterator, Tuple
+from src.core.interfaces import IInvoiceStore
+from src.core.matching import normalize_invoice_id, SUFFIX_LENGTH, MIN_HEURISTIC_LENGTH
+from src.models import Invoice, InvoiceStatus, InvoiceReceipt, InvoicePage, InvoiceEvent, InvoiceEventType
 
-class SQLiteInvoiceRepository(IInvoiceRepository):
-    def __init__(self, db_path: str = "invoices.db"):
+def _invoice_key_suffix(invoice_key: str) -> Optional[str]:
+    """Last-6 suffix, only stored for keys long enough for the suffix heuristic."""
+    if invoice_key and len(invoice_key) > MIN_HEURISTIC_LENGTH:
+        return invoice_key[-SUFFIX_LENGTH:]
+    return None
+
+def _parse_timestamp(value) -> Optional[datetime.datetime]:
+    """Timestamps are stored as ISO text; tolerate legacy / malformed values."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+# Triggers that keep invoice_summary current. Bulk imports drop them (defer_summary)
+# and rebuild_summary re-creates them and recomputes the table once.
+SUMMARY_TRIGGERS = ("trg_summary_insert", "trg_summary_delete", "trg_summary_update")
+
+def summary_trigger_statements() -> List[str]:
+    """CREATE TRIGGER statements for SUMMARY_TRIGGERS (idempotent)."""
+    def add(row: str, sign: str) -> str:
+        return f'''
+            INSERT INTO invoice_summary VALUES (
+                COALESCE({row}.vendor_email, ''), COALESCE({row}.workspace, ''),
+                COALESCE({row}.hotel_name, ''), COALESCE({row}.gstin, ''),
+                COALESCE({row}.status, ''), {sign}1, {sign}COALESCE({row}.amount, 0)
+            )
+            ON CONFLICT (vendor_email, workspace, hotel_name, gstin, status) DO UPDATE SET
+                invoice_count = invoice_count + excluded.invoice_count,
+                total_amount = total_amount + excluded.total_amount;
+        '''
+
+    prune = "DELETE FROM invoice_summary WHERE invoice_count = 0;"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_summary_insert AFTER INSERT ON invoices BEGIN {add('NEW', '')} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_summary_delete AFTER DELETE ON invoices BEGIN {add('OLD', '-')} {prune} END",
+        # Only columns the summary groups or sums on; reminder timestamps etc. don't fire it
+        f'''
+            CREATE TRIGGER IF NOT EXISTS trg_summary_update
+            AFTER UPDATE OF vendor_email, workspace, hotel_name, gstin, status, amount ON invoices
+            BEGIN {add('OLD', '-')} {add('NEW', '')} {prune} END
+        ''',
+    ]
+
+# Secondary indexes on invoices, by name. Kept in one place so bulk imports
+# can drop them and rebuild them once at the end (see drop/create_secondary_indexes).
+INVOICE_INDEXES = {
+    "idx_invoices_vendor_status": "invoices (vendor_id, status)",
+    "idx_invoices_key": "invoices (invoice_key, status)",
+    "idx_invoices_key_suffix": "invoices (invoice_key_suffix, status)",
+    # Reminder scheduling (update_reminder_timestamp, get_vendors_needing_reminders)
+    "idx_invoices_status_vendor_email": "invoices (status, vendor_email)",
+    "idx_invoices_status_reminder": "invoices (status, last_reminder_sent_at)",
+    # Legacy mark_as_received by number
+    "idx_invoices_number": "invoices (invoice_number)",
+}
+
+class SQLiteInvoiceRepository(IInvoiceStore):
+    def __init__(self, db_path: str = "invoices.db", busy_timeout_ms: int = 5000):
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        # One connection per thread: the Streamlit UI and the scheduler/worker
+        # threads each reuse their own instead of reconnecting on every call
+        self._local = threading.local()
         self._init_db()
 
+    # --- CONNECTION LAYER ---
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, opening + tuning it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit reads, explicit BEGIN in transaction()
+            conn = sqlite3.connect(
+                self.db_path, timeout=self.busy_timeout_ms / 1000, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers (UI) and the writer (reconciliation loop) run concurrently;
+            # NORMAL sync is durable in WAL mode and skips an fsync per commit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.create_function("normalize_invoice_id", 1, normalize_invoice_id)
+            conn.create_function("invoice_key_suffix", 1, _invoice_key_suffix)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Runs the block in one write transaction (COMMIT on success, ROLLBACK on error).
+        Nested calls join the outer transaction.
+        """
+        conn = self._connection()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        # IMMEDIATE takes the write lock up front, so a busy DB waits (busy_timeout)
+        # instead of failing halfway through the block
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """Closes the calling thread's connection (it reopens lazily if used again)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- SCHEMA MIGRATIONS ---
+    # Versioned with PRAGMA user_version. Each step runs in its own transaction
+    # together with the version bump, and is written to be safe on databases
+    # created by older ad-hoc schemas (IF NOT EXISTS / add-missing-column), so
+    # upgrades happen in place without wiping production state.
+    # Append new steps at the end; never edit or reorder shipped ones.
+    MIGRATIONS = [
+        (1, "invoices base table", "_migrate_base_table"),
+        (2, "normalized invoice keys", "_migrate_invoice_keys"),
+        (3, "vendor / contact tables", "_migrate_vendors"),
+        (4, "import checkpoints", "_migrate_import_checkpoints"),
+        (5, "materialized status summary", "_migrate_status_summary"),
+        (6, "append-only invoice events", "_migrate_invoice_events"),
+    ]
+
+    @property
+    def schema_version(self) -> int:
+        return self._connection().execute("PRAGMA user_version").fetchone()[0]
+
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        # Added: last_reminder_sent_at, received_at
-        c.execute('''
+        for version, description, method in self.MIGRATIONS:
+            if version <= self.schema_version:
+                continue
+            with self.transaction() as conn:
+                # Re-checked under the write lock: another process may have just migrated
+                if version <= self.schema_version:
+                    continue
+                getattr(self, method)(conn)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+            print(f"🛠️  DB migrated to v{version}: {description}")
+
+        # Declarative: also re-creates anything a crashed bulk import left dropped
+        self.create_secondary_indexes()
+        if self._summary_deferred():
+            self.rebuild_summary()
+
+    @staticmethod
+    def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: List[Tuple[str, str]]):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, col_type in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+
+    def _migrate_base_table(self, conn: sqlite3.Connection):
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS invoices (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 invoice_number TEXT,
@@ -24,105 +179,525 @@ class SQLiteInvoiceRepository(IInvoiceRepository):
                 hotel_name TEXT,
                 workspace TEXT,
                 thread_id TEXT,
+                filename TEXT
+            )
+        ''')
+        # First-generation databases lack the reminder / receipt timestamps
+        self._add_missing_columns(conn, "invoices", [
+            ("last_reminder_sent_at", "TIMESTAMP"),
+            ("received_at", "TIMESTAMP"),
+        ])
+
+    def _migrate_invoice_keys(self, conn: sqlite3.Connection):
+        self._add_missing_columns(conn, "invoices", [
+            ("invoice_key", "TEXT"),
+            ("invoice_key_suffix", "TEXT"),
+        ])
+        conn.execute('''
+            UPDATE invoices SET invoice_key = normalize_invoice_id(invoice_number)
+            WHERE invoice_key IS NULL AND invoice_number IS NOT NULL
+        ''')
+        conn.execute('''
+            UPDATE invoices SET invoice_key_suffix = invoice_key_suffix(invoice_key)
+            WHERE invoice_key_suffix IS NULL AND invoice_key IS NOT NULL
+        ''')
+
+    def _migrate_vendors(self, conn: sqlite3.Connection):
+        # Vendors and their contact addresses: an exact email ('billing@hotel.com')
+        # or a whole domain ('@hotel.com'). The primary key makes sender
+        # resolution a B-tree lookup instead of a LIKE scan.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS vendors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS vendor_contacts (
+                address TEXT PRIMARY KEY,
+                vendor_id INTEGER NOT NULL REFERENCES vendors(id)
+            ) WITHOUT ROWID
+        ''')
+        self._add_missing_columns(conn, "invoices", [("vendor_id", "INTEGER")])
+
+        unlinked = conn.execute(
+            "SELECT DISTINCT vendor_email FROM invoices WHERE vendor_id IS NULL AND vendor_email IS NOT NULL"
+        ).fetchall()
+        for row in unlinked:
+            vendor_id = self._ensure_vendor(conn, row[0])
+            conn.execute(
+                "UPDATE invoices SET vendor_id = ? WHERE vendor_id IS NULL AND vendor_email = ?",
+                (vendor_id, row[0])
+            )
+
+    def _migrate_import_checkpoints(self, conn: sqlite3.Connection):
+        # Resume points for streaming imports (see src/infra/invoice_import.py)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source TEXT PRIMARY KEY,
+                row_offset INTEGER NOT NULL,
+                updated_at TIMESTAMP
+            )
+        ''')
+
+    def _migrate_status_summary(self, conn: sqlite3.Connection):
+        # Counts and amount sums per (vendor, workspace, hotel, status), kept
+        # current by triggers in the same transaction as every invoice write, so
+        # dashboards read O(groups) rows. NULLs are stored as '' because NULLs
+        # never collide in a primary key.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS invoice_summary (
+                vendor_email TEXT NOT NULL,
+                workspace TEXT NOT NULL,
+                hotel_name TEXT NOT NULL,
+                gstin TEXT NOT NULL,
+                status TEXT NOT NULL,
+                invoice_count INTEGER NOT NULL,
+                total_amount REAL NOT NULL,
+                PRIMARY KEY (vendor_email, workspace, hotel_name, gstin, status)
+            ) WITHOUT ROWID
+        ''')
+
+        for statement in summary_trigger_statements():
+            conn.execute(statement)
+        self._rebuild_summary(conn)
+
+    def _migrate_invoice_events(self, conn: sqlite3.Connection):
+        # Append-only change log for incremental consumers (changes_since).
+        # AUTOINCREMENT guarantees seq is never reused, even after deletes.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS invoice_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                invoice_id INTEGER,
+                invoice_number TEXT,
+                vendor_email TEXT,
+                old_status TEXT,
+                new_status TEXT,
+                thread_id TEXT,
                 filename TEXT,
-                last_reminder_sent_at TIMESTAMP,
-                received_at TIMESTAMP
+                created_at TIMESTAMP
             )
         ''')
-        conn.commit()
-        conn.close()
+
+        def log(event_type: InvoiceEventType, row: str, old_status: str = "NULL", new_status: str = "NULL") -> str:
+            return f'''
+                INSERT INTO invoice_events (event_type, invoice_id, invoice_number, vendor_email, old_status, new_status, thread_id, filename, created_at)
+                VALUES ('{event_type.value}', {row}.id, {row}.invoice_number, {row}.vendor_email, {old_status}, {new_status},
+                        {row}.thread_id, {row}.filename, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'));
+            '''
+
+        # Same transaction as the write that caused them
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_events_insert AFTER INSERT ON invoices BEGIN {log(InvoiceEventType.CREATED, 'NEW', new_status='NEW.status')} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_events_delete AFTER DELETE ON invoices BEGIN {log(InvoiceEventType.DELETED, 'OLD', old_status='OLD.status')} END")
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_events_status AFTER UPDATE OF status ON invoices
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN {log(InvoiceEventType.STATUS_CHANGED, 'NEW', 'OLD.status', 'NEW.status')} END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_events_reminder AFTER UPDATE OF last_reminder_sent_at ON invoices
+            WHEN NEW.last_reminder_sent_at IS NOT NULL AND OLD.last_reminder_sent_at IS NOT NEW.last_reminder_sent_at
+            BEGIN {log(InvoiceEventType.REMINDER_SENT, 'NEW')} END
+        ''')
+
+    @staticmethod
+    def _rebuild_summary(conn: sqlite3.Connection):
+        conn.execute("DELETE FROM invoice_summary")
+        conn.execute('''
+            INSERT INTO invoice_summary
+            SELECT COALESCE(vendor_email, ''), COALESCE(workspace, ''), COALESCE(hotel_name, ''),
+                   COALESCE(gstin, ''), COALESCE(status, ''), COUNT(*), COALESCE(SUM(amount), 0)
+            FROM invoices
+            GROUP BY 1, 2, 3, 4, 5
+        ''')
+
+    def defer_summary(self):
+        """
+        For bulk loads: drops the summary triggers, so rows go in without a
+        summary upsert each, until rebuild_summary() recomputes it once. The
+        event triggers stay: every imported invoice still logs CREATED.
+        """
+        with self.transaction() as conn:
+            for name in SUMMARY_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    def rebuild_summary(self):
+        """Recomputes invoice_summary from scratch and (re-)enables the triggers that keep it current."""
+        with self.transaction() as conn:
+            for statement in summary_trigger_statements():
+                conn.execute(statement)
+            self._rebuild_summary(conn)
+
+    def _summary_deferred(self) -> bool:
+        names = {row[0] for row in self._connection().execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        return not set(SUMMARY_TRIGGERS) <= names
+
+    def create_secondary_indexes(self):
+        with self.transaction() as conn:
+            for name, target in INVOICE_INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+    def drop_secondary_indexes(self):
+        """For bulk loads: inserting without index maintenance, then one rebuild, is far cheaper."""
+        with self.transaction() as conn:
+            for name in INVOICE_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    # --- IMPORT CHECKPOINTS ---
+    def get_import_offset(self, source: str) -> int:
+        row = self._connection().execute(
+            "SELECT row_offset FROM import_checkpoints WHERE source = ?", (source,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_import_offset(self, source: str, row_offset: int):
+        """Call inside the chunk's transaction so the rows and the offset commit together."""
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO import_checkpoints (source, row_offset, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET row_offset = excluded.row_offset, updated_at = excluded.updated_at
+            ''', (source, row_offset, datetime.datetime.now()))
+
+    # --- VENDORS ---
+    @staticmethod
+    def _normalize_address(address: str) -> str:
+        return address.strip().lower()
+
+    def _ensure_vendor(self, conn: sqlite3.Connection, vendor_email: str) -> int:
+        """Returns the vendor owning `vendor_email`, registering a new one if unknown."""
+        address = self._normalize_address(vendor_email)
+        row = conn.execute("SELECT vendor_id FROM vendor_contacts WHERE address = ?", (address,)).fetchone()
+        if row:
+            return row[0]
+        vendor_id = conn.execute("INSERT INTO vendors (name) VALUES (?)", (address,)).lastrowid
+        conn.execute("INSERT INTO vendor_contacts (address, vendor_id) VALUES (?, ?)", (address, vendor_id))
+        return vendor_id
+
+    def _resolve_vendor_id(self, sender_email: str) -> Optional[int]:
+        """Exact address first, then the sender's whole domain ('@hotel.com')."""
+        address = self._normalize_address(sender_email)
+        candidates = [address]
+        if "@" in address:
+            candidates.append("@" + address.split("@", 1)[1])
+
+        conn = self._connection()
+        for candidate in candidates:
+            row = conn.execute("SELECT vendor_id FROM vendor_contacts WHERE address = ?", (candidate,)).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def add_vendor_contact(self, vendor_email: str, address: str):
+        """
+        Links another billing address, or a whole domain given as '@hotel.com',
+        to the vendor that owns `vendor_email`.
+        """
+        with self.transaction() as conn:
+            vendor_id = self._ensure_vendor(conn, vendor_email)
+            conn.execute(
+                "INSERT OR REPLACE INTO vendor_contacts (address, vendor_id) VALUES (?, ?)",
+                (self._normalize_address(address), vendor_id)
+            )
 
     def add_invoice(self, invoice: Invoice):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        # Initialize timestamps as None
-        c.execute('''
-            INSERT INTO invoices (invoice_number, vendor_email, amount, status, gstin, hotel_name, workspace, thread_id, filename, last_reminder_sent_at, received_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)
-        ''', (invoice.invoice_number, invoice.vendor_email, invoice.amount, invoice.status.value, 
-              invoice.gstin, invoice.hotel_name, invoice.workspace, invoice.thread_id, invoice.filename))
-        conn.commit()
-        conn.close()
+        self.add_invoices([invoice])
+
+    def add_invoices(self, invoices: List[Invoice]):
+        """Inserts a batch with one executemany and one commit."""
+        with self.transaction() as conn:
+            vendor_ids: Dict[str, int] = {}
+            rows = []
+            for invoice in invoices:
+                if invoice.vendor_email not in vendor_ids:
+                    vendor_ids[invoice.vendor_email] = self._ensure_vendor(conn, invoice.vendor_email)
+                # Initialize timestamps as None; normalized keys are computed once, here
+                invoice_key = normalize_invoice_id(invoice.invoice_number)
+                rows.append((
+                    invoice.invoice_number, invoice.vendor_email, invoice.amount, invoice.status.value,
+                    invoice.gstin, invoice.hotel_name, invoice.workspace, invoice.thread_id, invoice.filename,
+                    invoice_key, _invoice_key_suffix(invoice_key), vendor_ids[invoice.vendor_email]
+                ))
+
+            conn.executemany('''
+                INSERT INTO invoices (invoice_number, vendor_email, amount, status, gstin, hotel_name, workspace, thread_id, filename, last_reminder_sent_at, received_at, invoice_key, invoice_key_suffix, vendor_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?, ?)
+            ''', rows)
+
+    def delete_pending_invoices(self, vendor_email: str) -> int:
+        """Drops a vendor's PENDING rows (e.g. before a re-seed); RECEIVED history is kept."""
+        vendor_id = self._resolve_vendor_id(vendor_email)
+        if vendor_id is None:
+            return 0
+        with self.transaction() as conn:
+            return conn.execute(
+                "DELETE FROM invoices WHERE vendor_id = ? AND status = ?",
+                (vendor_id, InvoiceStatus.PENDING.value)
+            ).rowcount
 
     def get_pending_invoices_by_sender(self, sender_email: str) -> List[Invoice]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('''
-            SELECT * FROM invoices 
-            WHERE vendor_email LIKE ? AND status = ?
-        ''', (f"%{sender_email}%", InvoiceStatus.PENDING.value))
-        
-        rows = c.fetchall()
-        invoices = []
-        for row in rows:
-            invoices.append(self._map_row_to_invoice(row))
-        conn.close()
-        return invoices
-
-    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        vendor_id = self._resolve_vendor_id(sender_email)
+        if vendor_id is None:
+            return []
+
+        rows = self._connection().execute('''
+            SELECT * FROM invoices
+            WHERE vendor_id = ? AND status = ?
+        ''', (vendor_id, InvoiceStatus.PENDING.value)).fetchall()
+        return [self._map_row_to_invoice(row) for row in rows]
+
+    def find_pending_by_invoice_keys(self, invoice_ids: List[str]) -> List[Invoice]:
+        """
+        Cross-vendor lookup of PENDING invoices whose normalized key or last-6
+        suffix equals that of any given ID (two indexed lookups, no scan).
+        """
+        keys = {normalize_invoice_id(i) for i in invoice_ids if i}
+        suffixes = {_invoice_key_suffix(k) for k in keys} - {None}
+        if not keys:
+            return []
+
+        key_marks = ",".join("?" * len(keys))
+        suffix_marks = ",".join("?" * len(suffixes)) or "NULL"
+        rows = self._connection().execute(f'''
+            SELECT * FROM invoices WHERE status = ? AND invoice_key IN ({key_marks})
+            UNION
+            SELECT * FROM invoices WHERE status = ? AND invoice_key_suffix IN ({suffix_marks})
+            ORDER BY id
+        ''', (InvoiceStatus.PENDING.value, *keys, InvoiceStatus.PENDING.value, *suffixes)).fetchall()
+        return [self._map_row_to_invoice(row) for row in rows]
+
+    def has_pending_from_other_vendors(self, sender_email: str) -> bool:
+        vendor_id = self._resolve_vendor_id(sender_email)
+        row = self._connection().execute('''
+            SELECT 1 FROM invoices WHERE status = ? AND vendor_id IS NOT ? LIMIT 1
+        ''', (InvoiceStatus.PENDING.value, vendor_id)).fetchone()
+        return row is not None
+
+    def mark_as_received(self, invoice_number: str, filename: str, thread_id: str, invoice_id: Optional[int] = None):
+        if invoice_id is not None:
+            self.mark_many_as_received([InvoiceReceipt(invoice_id, filename, thread_id)])
+            return
+
+        # Legacy path: every row sharing the number (possibly across vendors)
         now = datetime.datetime.now()
-        c.execute('''
-            UPDATE invoices 
-            SET status = ?, filename = ?, thread_id = ?, received_at = ?
-            WHERE invoice_number = ?
-        ''', (InvoiceStatus.RECEIVED.value, filename, thread_id, now, invoice_number))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                UPDATE invoices
+                SET status = ?, filename = ?, thread_id = ?, received_at = ?
+                WHERE invoice_number = ?
+            ''', (InvoiceStatus.RECEIVED.value, filename, thread_id, now, invoice_number))
+
+    def mark_many_as_received(self, receipts: List[InvoiceReceipt]):
+        """One transaction (one fsync) for the whole batch, rows targeted by primary key."""
+        if not receipts:
+            return
+        now = datetime.datetime.now()
+        with self.transaction() as conn:
+            conn.executemany('''
+                UPDATE invoices
+                SET status = ?, filename = ?, thread_id = ?, received_at = ?
+                WHERE id = ?
+            ''', [(InvoiceStatus.RECEIVED.value, r.filename, r.thread_id, now, r.invoice_id) for r in receipts])
 
     def update_reminder_timestamp(self, vendor_email: str):
         """Updates the reminder timestamp for all pending invoices of a vendor."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
         now = datetime.datetime.now()
-        c.execute('''
-            UPDATE invoices 
-            SET last_reminder_sent_at = ?
-            WHERE vendor_email = ? AND status = 'PENDING'
-        ''', (now, vendor_email))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                UPDATE invoices
+                SET last_reminder_sent_at = ?
+                WHERE vendor_email = ? AND status = 'PENDING'
+            ''', (now, vendor_email))
+
+    # --- EVENT LOG ---
+    def record_kickoff(self, vendor_email: str, thread_id: str, invoice_ids: List[int]):
+        """Logs a KICKOFF_SENT event for each invoice listed in a kickoff email."""
+        if not invoice_ids:
+            return
+        now = datetime.datetime.now()
+        with self.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO invoice_events (event_type, invoice_id, invoice_number, vendor_email, new_status, thread_id, created_at)
+                SELECT ?, id, invoice_number, vendor_email, status, ?, ? FROM invoices WHERE id = ?
+            ''', [(InvoiceEventType.KICKOFF_SENT.value, thread_id, now, invoice_id) for invoice_id in invoice_ids])
+
+    def changes_since(self, seq: int = 0, limit: int = 1000) -> List[InvoiceEvent]:
+        """Events after `seq`, oldest first. Pass the last seq seen to read the next batch."""
+        rows = self._connection().execute(
+            "SELECT * FROM invoice_events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        ).fetchall()
+        return [self._map_row_to_event(row) for row in rows]
 
     def get_vendors_needing_reminders(self, days_interval: int = 2) -> List[str]:
         """Finds vendor emails who have pending invoices AND haven't been emailed in X days."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         # Logic: Find Pending invoices where (Time Now - Last Reminder) > 2 days
         # OR where Last Reminder is NULL (never sent)
         cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days_interval)
-        
-        c.execute('''
+
+        rows = self._connection().execute('''
             SELECT DISTINCT vendor_email FROM invoices
             WHERE status = 'PENDING'
             AND (last_reminder_sent_at IS NULL OR last_reminder_sent_at < ?)
-        ''', (cutoff_date,))
-        
-        rows = c.fetchall()
-        conn.close()
+        ''', (cutoff_date,)).fetchall()
         return [row[0] for row in rows]
 
     def get_analytics_data(self):
         """Fetches raw data for the dashboard."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM invoices WHERE status = "RECEIVED"')
-        rows = c.fetchall()
-        conn.close()
+        rows = self._connection().execute("SELECT * FROM invoices WHERE status = 'RECEIVED'").fetchall()
         return [self._map_row_to_invoice(row) for row in rows]
 
+    # --- ANALYTICS (read from invoice_summary; result size ~ number of groups) ---
+    def get_kpi_totals(self) -> Dict:
+        row = self._connection().execute('''
+            SELECT
+                COALESCE(SUM(CASE WHEN status = 'RECEIVED' THEN invoice_count END), 0) AS received_count,
+                COALESCE(SUM(CASE WHEN status = 'RECEIVED' THEN total_amount END), 0) AS received_value,
+                COALESCE(SUM(CASE WHEN status = 'PENDING' THEN invoice_count END), 0) AS pending_count
+            FROM invoice_summary
+        ''').fetchone()
+        return dict(row)
+
+    def get_client_breakdown(self) -> List[Dict]:
+        """Received value per workspace (client), largest first."""
+        rows = self._connection().execute('''
+            SELECT NULLIF(workspace, '') AS workspace, SUM(total_amount) AS amount
+            FROM invoice_summary WHERE status = 'RECEIVED'
+            GROUP BY workspace
+            ORDER BY amount DESC
+        ''').fetchall()
+        return [dict(row) for row in rows]
+
+    def get_hotel_breakdown(self) -> List[Dict]:
+        """Received count and value per hotel / GSTIN."""
+        rows = self._connection().execute('''
+            SELECT NULLIF(hotel_name, '') AS hotel_name, NULLIF(gstin, '') AS gstin,
+                   SUM(invoice_count) AS invoice_count, SUM(total_amount) AS total_value
+            FROM invoice_summary WHERE status = 'RECEIVED'
+            GROUP BY invoice_summary.hotel_name, invoice_summary.gstin
+            ORDER BY invoice_summary.hotel_name, invoice_summary.gstin
+        ''').fetchall()
+        return [dict(row) for row in rows]
+
+    def get_vendor_breakdown(self) -> List[Dict]:
+        """Pending / received counts and values per vendor."""
+        rows = self._connection().execute('''
+            SELECT vendor_email,
+                   SUM(CASE WHEN status = 'PENDING' THEN invoice_count ELSE 0 END) AS pending_count,
+                   SUM(CASE WHEN status = 'PENDING' THEN total_amount ELSE 0 END) AS pending_value,
+                   SUM(CASE WHEN status = 'RECEIVED' THEN invoice_count ELSE 0 END) AS received_count,
+                   SUM(CASE WHEN status = 'RECEIVED' THEN total_amount ELSE 0 END) AS received_value
+            FROM invoice_summary
+            GROUP BY vendor_email
+            ORDER BY vendor_email
+        ''').fetchall()
+        return [dict(row) for row in rows]
+
+    def get_recent_received(self, limit: int = 10) -> List[Dict]:
+        rows = self._connection().execute('''
+            SELECT invoice_number, status, hotel_name, workspace, amount, gstin, received_at
+            FROM invoices WHERE status = 'RECEIVED'
+            ORDER BY received_at DESC, id DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    # --- KEYSET PAGINATION (UI lists, exports) ---
+    @staticmethod
+    def _encode_cursor(last_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps({"after_id": last_id}).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> int:
+        try:
+            return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["after_id"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"Invalid page cursor: {cursor!r}")
+
+    def _filter_clause(
+        self,
+        status: Optional[InvoiceStatus],
+        vendor_email: Optional[str],
+        received_after: Optional[datetime.datetime],
+        received_before: Optional[datetime.datetime]
+    ) -> Optional[Tuple[List[str], List]]:
+        """WHERE parts + params for the list filters; None when nothing can match."""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status.value)
+        if vendor_email is not None:
+            vendor_id = self._resolve_vendor_id(vendor_email)
+            if vendor_id is None:
+                return None
+            clauses.append("vendor_id = ?")
+            params.append(vendor_id)
+        if received_after is not None:
+            clauses.append("received_at >= ?")
+            params.append(received_after)
+        if received_before is not None:
+            clauses.append("received_at < ?")
+            params.append(received_before)
+        return clauses, params
+
+    def get_invoice_page(
+        self,
+        status: Optional[InvoiceStatus] = None,
+        vendor_email: Optional[str] = None,
+        received_after: Optional[datetime.datetime] = None,
+        received_before: Optional[datetime.datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> InvoicePage:
+        """
+        One page in id order. Seeks past the cursor's id (no OFFSET), so every
+        page costs the same no matter how deep it is.
+        """
+        where = self._filter_clause(status, vendor_email, received_after, received_before)
+        if where is None:
+            return InvoicePage(invoices=[])
+        clauses, params = where
+        if cursor:
+            clauses.append("id > ?")
+            params.append(self._decode_cursor(cursor))
+
+        sql = "SELECT * FROM invoices"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # One extra row tells us whether another page exists
+        rows = self._connection().execute(sql + " ORDER BY id LIMIT ?", (*params, limit + 1)).fetchall()
+
+        invoices = [self._map_row_to_invoice(row) for row in rows[:limit]]
+        next_cursor = self._encode_cursor(invoices[-1].id) if len(rows) > limit else None
+        return InvoicePage(invoices=invoices, next_cursor=next_cursor)
+
+    def iter_invoices(self, page_size: int = 1000, **filters) -> Iterator[Invoice]:
+        """Streams every matching invoice, holding at most one page in memory."""
+        cursor = None
+        while True:
+            page = self.get_invoice_page(cursor=cursor, limit=page_size, **filters)
+            yield from page.invoices
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
     def get_all_invoices(self) -> List[Invoice]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute('SELECT * FROM invoices')
-        rows = c.fetchall()
-        conn.close()
+        rows = self._connection().execute('SELECT * FROM invoices').fetchall()
         return [self._map_row_to_invoice(row) for row in rows]
 
+    def _map_row_to_event(self, row) -> InvoiceEvent:
+        return InvoiceEvent(
+            seq=row['seq'],
+            event_type=InvoiceEventType(row['event_type']),
+            invoice_id=row['invoice_id'],
+            invoice_number=row['invoice_number'],
+            vendor_email=row['vendor_email'],
+            old_status=InvoiceStatus(row['old_status']) if row['old_status'] else None,
+            new_status=InvoiceStatus(row['new_status']) if row['new_status'] else None,
+            thread_id=row['thread_id'],
+            filename=row['filename'],
+            created_at=_parse_timestamp(row['created_at'])
+        )
+
     def _map_row_to_invoice(self, row) -> Invoice:
         # Helper to map DB row to Object
         return Invoice(
@@ -135,5 +710,7 @@ class SQLiteInvoiceRepository(IInvoiceRepository):
             hotel_name=row['hotel_name'],
             workspace=row['workspace'],
             thread_id=row['thread_id'],
-            filename=row['filename']
-        )
\ No newline at end of file
+            filename=row['filename'],
+            received_at=_parse_timestamp(row['received_at']),
+            last_reminder_sent_at=_parse_timestamp(row['last_reminder_sent_at'])
+        )
@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+class SQLiteStore:
+    """
+    Small SQLite-backed store for agent-side state (ledgers, caches) that
+    must survive restarts whatever the invoice backend is. Same connection
+    handling as SQLiteInvoiceRepository: one WAL connection per thread and
+    BEGIN IMMEDIATE write transactions. Subclasses list their DDL in SCHEMA
+    (idempotent statements, run on every start) and columns added to an
+    existing table later in ADDED_COLUMNS as (table, column, definition).
+    """
+    SCHEMA: List[str] = []
+    ADDED_COLUMNS: List[Tuple[str, str, str]] = []
+
+    def __init__(self, db_path: str = "agent_state.db", busy_timeout_ms: int = 5000):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        with self.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            for table, column, definition in self.ADDED_COLUMNS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, timeout=self.busy_timeout_ms / 1000, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
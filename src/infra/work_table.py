@@ -0,0 +1,103 @@
+import datetime
+import json
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from src.core.interfaces import IWorkCheckpoints
+from src.infra.sqlite_store import SQLiteStore
+from src.models import ExtractedInvoiceData, EmailCheckpoint, InvoiceReceipt
+
+
+class SQLiteWorkTable(SQLiteStore, IWorkCheckpoints):
+    """
+    Per-document checkpoints of in-flight emails. Every vision result is
+    written as soon as it arrives, and each email's reconcile outcome is saved
+    before its receipts are committed. A cycle restarted after a crash or
+    deploy resumes those emails first, without repeating a Gemini call or
+    losing a match. Rows are dropped once the email reaches the ledger.
+    """
+    SCHEMA = [
+        '''
+        CREATE TABLE IF NOT EXISTS work_messages (
+            message_id TEXT PRIMARY KEY,
+            result TEXT,                     -- EmailCheckpoint as JSON, once reconciled
+            attempts INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS work_documents (
+            message_id TEXT NOT NULL,
+            path TEXT NOT NULL,
+            data TEXT NOT NULL,              -- ExtractedInvoiceData as JSON
+            updated_at TIMESTAMP,
+            PRIMARY KEY (message_id, path)
+        )
+        ''',
+    ]
+
+    # Added after the first release: tables created before it get the column on start
+    ADDED_COLUMNS = [("work_messages", "attempts", "INTEGER NOT NULL DEFAULT 0")]
+
+    def start(self, message_id: str) -> int:
+        now = datetime.datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO work_messages (message_id, attempts, started_at, updated_at) VALUES (?, 1, ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET attempts = attempts + 1, updated_at = excluded.updated_at
+            ''', (message_id, now, now))
+            return conn.execute(
+                "SELECT attempts FROM work_messages WHERE message_id = ?", (message_id,)
+            ).fetchone()[0]
+
+    def attempts(self, message_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT attempts FROM work_messages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def in_progress(self) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT message_id FROM work_messages ORDER BY started_at, rowid"
+        ).fetchall()
+        return [row["message_id"] for row in rows]
+
+    def save_document(self, message_id: str, path: str, data: ExtractedInvoiceData):
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO work_documents (message_id, path, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(message_id, path) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            ''', (message_id, path, json.dumps(asdict(data)), datetime.datetime.now().isoformat()))
+
+    def load_documents(self, message_id: str) -> Dict[str, ExtractedInvoiceData]:
+        rows = self._connection().execute(
+            "SELECT path, data FROM work_documents WHERE message_id = ?", (message_id,)
+        ).fetchall()
+        return {row["path"]: ExtractedInvoiceData(**json.loads(row["data"])) for row in rows}
+
+    def save_result(self, message_id: str, checkpoint: EmailCheckpoint):
+        now = datetime.datetime.now().isoformat()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO work_messages (message_id, result, started_at, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(message_id) DO UPDATE SET result = excluded.result, updated_at = excluded.updated_at
+            ''', (message_id, json.dumps(asdict(checkpoint)), now, now))
+
+    def load_result(self, message_id: str) -> Optional[EmailCheckpoint]:
+        row = self._connection().execute(
+            "SELECT result FROM work_messages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row is None or row["result"] is None:
+            return None
+        saved = json.loads(row["result"])
+        return EmailCheckpoint(
+            entry=saved["entry"],
+            receipts=[InvoiceReceipt(**r) for r in saved["receipts"]],
+            draft_request=saved["draft_request"]
+        )
+
+    def finish(self, message_id: str):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM work_documents WHERE message_id = ?", (message_id,))
+            conn.execute("DELETE FROM work_messages WHERE message_id = ?", (message_id,))
@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from datetime import datetime
 from typing import List, Optional
 from enum import Enum
 
@@ -19,6 +20,42 @@ class Invoice:
     workspace: str = ""  # This usually corresponds to "Bill To" name
     thread_id: Optional[str] = None
     filename: Optional[str] = None
+    received_at: Optional[datetime] = None
+    last_reminder_sent_at: Optional[datetime] = None
+
+@dataclass
+class InvoiceReceipt:
+    """One RECEIVED status change, targeted by the invoice's primary key."""
+    invoice_id: int
+    filename: str
+    thread_id: str
+
+class InvoiceEventType(Enum):
+    CREATED = "CREATED"
+    STATUS_CHANGED = "STATUS_CHANGED"
+    REMINDER_SENT = "REMINDER_SENT"
+    KICKOFF_SENT = "KICKOFF_SENT"
+    DELETED = "DELETED"
+
+@dataclass
+class InvoiceEvent:
+    """One row of the append-only invoice_events log; `seq` only ever grows."""
+    seq: int
+    event_type: InvoiceEventType
+    invoice_id: Optional[int]
+    invoice_number: Optional[str]
+    vendor_email: Optional[str]
+    old_status: Optional[InvoiceStatus] = None
+    new_status: Optional[InvoiceStatus] = None
+    thread_id: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+@dataclass
+class InvoicePage:
+    invoices: List[Invoice]
+    # Opaque keyset token for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 @dataclass
 class EmailMessage:
@@ -44,4 +81,30 @@ class ExtractedInvoiceData:
 class ReconciliationResult:
     received_invoices: List[str]
     missing_invoices: List[str]
-    updated_invoices: List[Invoice]
\ No newline at end of file
+    updated_invoices: List[Invoice]
+    # Extracted IDs that matched no expected invoice
+    unmatched_extracted: List[str] = field(default_factory=list)
+
+class MessageOutcome(Enum):
+    RECONCILED = "RECONCILED"
+    PARTIAL = "PARTIAL"                 # Some attachments still failed after the last attempt
+    NO_PENDING = "NO_PENDING"
+    NO_ATTACHMENTS = "NO_ATTACHMENTS"
+    MANUAL_REVIEW = "MANUAL_REVIEW"
+    FAILED = "FAILED"                   # Given up after repeated errors (see InvoiceAgent.max_attempts)
+
+@dataclass
+class ProcessedAttachment:
+    """A PDF already run through extraction, keyed by the SHA-256 of its bytes."""
+    sha256: str
+    filename: str
+    invoice_numbers: List[str] = field(default_factory=list)
+    failed: bool = False
+    processed_at: Optional[datetime] = None
+
+@dataclass
+class EmailCheckpoint:
+    """Reconcile outcome of one email, saved before its receipts are committed."""
+    entry: dict
+    receipts: List[InvoiceReceipt] = field(default_factory=list)
+    draft_request: Optional[dict] = None
@@ -0,0 +1,579 @@
+import sys
+import os
+import hashlib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from typing import List
+from src.core.agent import InvoiceAgent
+from src.core.matching import normalize_invoice_id
+from src.core.interfaces import IInvoiceRepository, ILLMProvider, IAttachmentProcessor, IEmailProvider
+from src.models import Invoice, InvoiceStatus, EmailMessage, ExtractedInvoiceData
+
+
+# --- In-memory fakes (no Gmail / Gemini / Poppler needed) ---
+class FakeRepo(IInvoiceRepository):
+    def __init__(self, invoices: List[Invoice]):
+        self.invoices = []
+        self.pending_queries = []
+        self.commits = 0
+        self.add_invoices(invoices)
+
+    def get_pending_invoices_by_sender(self, sender_email):
+        self.pending_queries.append(sender_email)
+        return [
+            Invoice(**vars(i)) for i in self.invoices
+            if i.vendor_email == sender_email and i.status == InvoiceStatus.PENDING
+        ]
+
+    def find_pending_by_invoice_keys(self, invoice_ids):
+        keys = {normalize_invoice_id(i) for i in invoice_ids}
+        return [
+            Invoice(**vars(i)) for i in self.invoices
+            if i.status == InvoiceStatus.PENDING and normalize_invoice_id(i.invoice_number) in keys
+        ]
+
+    def mark_as_received(self, invoice_number, filename, thread_id, invoice_id=None):
+        for inv in self.invoices:
+            if inv.id == invoice_id or (invoice_id is None and inv.invoice_number == invoice_number):
+                inv.status, inv.filename, inv.thread_id = InvoiceStatus.RECEIVED, filename, thread_id
+
+    def mark_many_as_received(self, receipts):
+        self.commits += 1
+        for r in receipts:
+            self.mark_as_received(None, r.filename, r.thread_id, invoice_id=r.invoice_id)
+
+    def add_invoice(self, invoice):
+        self.add_invoices([invoice])
+
+    def add_invoices(self, invoices):
+        for invoice in invoices:
+            invoice.id = len(self.invoices) + 1
+            self.invoices.append(invoice)
+
+    def has_pending_from_other_vendors(self, sender_email):
+        return any(i.vendor_email != sender_email and i.status == InvoiceStatus.PENDING for i in self.invoices)
+
+    def get_all_invoices(self):
+        return list(self.invoices)
+
+    def record_kickoff(self, vendor_email, thread_id, invoice_ids):
+        pass
+
+    def changes_since(self, seq=0, limit=1000):
+        return []
+
+    def get_vendors_needing_reminders(self, days_interval=2):
+        return []
+
+    def update_reminder_timestamp(self, vendor_email):
+        pass
+
+
+class FakeProcessor(IAttachmentProcessor):
+    def convert_pdf_to_images(self, pdf_path):
+        return [pdf_path + ".jpg"]
+
+
+class FakeLLM(ILLMProvider):
+    """Each 'image' is named after the invoice number printed on it."""
+    def __init__(self):
+        self.extract_calls = 0
+
+    def extract_invoice_data(self, text_context, image_paths):
+        self.extract_calls += 1
+        ids = [os.path.basename(p).split(".")[0] for p in image_paths]
+        return ExtractedInvoiceData(invoice_numbers=ids, detected_poc_change=False)
+
+    def draft_reply(self, sender, missing_invoices, received_invoices, context):
+        return f"received={received_invoices} missing={missing_invoices}"
+
+
+class FakeEmail(IEmailProvider):
+    def __init__(self, emails):
+        self.emails = emails
+        self.processed = set()
+        self.listed = []
+
+    def fetch_unread_emails(self, limit=5):
+        return list(self.emails)
+
+    def list_unread_message_ids(self, limit=5):
+        ids = [e.id for e in self.emails if e.id not in self.processed]
+        self.listed.append(ids)
+        return iter(ids)
+
+    def mark_processed(self, message_id):
+        self.processed.add(message_id)
+
+    def fetch_email(self, message_id):
+        return next(e for e in self.emails if e.id == message_id)
+
+    def send_reply(self, thread_id, to_email, body):
+        pass
+
+    def send_new_email(self, to_email, subject, body):
+        return "thread-new"
+
+
+def _pending(number, vendor="hotel@a.com"):
+    return Invoice(id=None, invoice_number=number, vendor_email=vendor, amount=100, status=InvoiceStatus.PENDING)
+
+
+def _email(msg_id, sender, attachments):
+    return EmailMessage(id=msg_id, thread_id=f"t-{msg_id}", sender=sender, subject="Invoices", body="Attached", attachments=attachments)
+
+
+def _agent(repo, emails=(), **kwargs):
+    return InvoiceAgent(FakeEmail(list(emails)), FakeLLM(), repo, None, FakeProcessor(), **kwargs)
+
+
+# 1. Same vendor twice: one pending query, second email sees the first's matches
+def test_cycle_shares_pending_set_per_vendor():
+    repo = FakeRepo([_pending("INV-A"), _pending("INV-B"), _pending("INV-X", vendor="other@b.com")])
+    emails = [
+        _email("1", "Hotel A <hotel@a.com>", ["dl/INV-A.pdf"]),
+        _email("2", "Other <other@b.com>", ["dl/INV-X.pdf"]),
+        _email("3", "hotel@a.com", ["dl/INV-A.pdf", "dl/INV-B.pdf"]),
+    ]
+
+    report = _agent(repo, emails).run_reconciliation_cycle()
+
+    assert repo.pending_queries == ["hotel@a.com", "other@b.com"]
+    assert repo.commits == 2   # one bulk commit per vendor
+    assert [r["thread_id"] for r in report] == ["t-1", "t-2", "t-3"]
+    assert report[0]["received"] == ["INV-A"] and report[0]["missing"] == ["INV-B"]
+    assert report[2]["received"] == ["INV-B"] and report[2]["missing"] == []
+    assert all(i.status == InvoiceStatus.RECEIVED for i in repo.invoices)
+
+
+# 2. Forwarded email: sender has nothing pending, IDs resolve to another vendor
+def test_cycle_matches_other_vendors():
+    repo = FakeRepo([_pending("INV-A"), _pending("INV-X", vendor="other@b.com")])
+    emails = [_email("1", "Finance Team <ap@ourcompany.com>", ["dl/INV-X.pdf"])]
+
+    report = _agent(repo, emails).run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-X"]
+    assert [i.status for i in repo.invoices] == [InvoiceStatus.PENDING, InvoiceStatus.RECEIVED]
+
+
+# 2b. Forwards are gated before vision: nothing pending anywhere, or a text layer without any pending number
+def test_forward_without_pending_numbers_skips_vision():
+    class TextProcessor(FakeProcessor):
+        def extract_text(self, pdf_path):
+            if "scan" in pdf_path:
+                return ""
+            if "newsletter" in pdf_path:
+                return "Monthly offers: 20% off weekend stays, book by 31/12"
+            return f"Tax Invoice No. {os.path.basename(pdf_path)[:-4]}"
+
+    repo = FakeRepo([_pending("INV-A"), _pending("INV-7", vendor="other@b.com"), _pending("INV-8", vendor="other@b.com")])
+    attachments = ["dl/newsletter.pdf", "dl/INV-7.pdf", "dl/scan/INV-8.pdf"]
+    agent = InvoiceAgent(
+        FakeEmail([_email("1", "Finance Team <ap@ourcompany.com>", attachments)]), FakeLLM(), repo, None, TextProcessor()
+    )
+
+    report = agent.run_reconciliation_cycle()
+
+    # Only the scan (no text layer) reaches vision
+    assert report[0]["received"] == ["INV-7", "INV-8"]
+    assert agent.llm.extract_calls == 1
+
+    # Nothing pending for any vendor: not even the scan is read
+    for inv in repo.invoices:
+        inv.status = InvoiceStatus.RECEIVED
+    agent.email.emails = [_email("2", "news@deals.com", ["dl/scan/promo.pdf"])]
+    assert agent.run_reconciliation_cycle()[0]["status"].startswith("Log: No pending invoices")
+    assert agent.llm.extract_calls == 1
+
+
+# 3. Stage workers: same report as a serial cycle, extraction actually overlaps
+def test_concurrent_cycle_matches_serial():
+    import threading
+    import time
+
+    def build():
+        return FakeRepo([_pending(f"INV-{i}", vendor=f"v{i % 3}@h.com") for i in range(9)])
+
+    emails = [_email(str(i), f"v{i % 3}@h.com", [f"dl/INV-{i}.pdf"]) for i in range(9)]
+    emails.append(_email("9", "v0@h.com", []))   # no attachments -> draft only
+
+    serial = _agent(build(), emails).run_reconciliation_cycle(limit=len(emails))
+
+    repo = build()
+    agent = _agent(repo, emails, max_workers=4, pipeline_queue_size=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    extract = agent.llm.extract_invoice_data
+
+    def slow_extract(text_context, image_paths):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return extract(text_context, image_paths)
+
+    agent.llm.extract_invoice_data = slow_extract
+    assert agent.run_reconciliation_cycle(limit=len(emails)) == serial
+    assert peak[0] > 1
+    assert all(i.status == InvoiceStatus.RECEIVED for i in repo.invoices)
+    assert sorted(repo.pending_queries) == ["v0@h.com", "v1@h.com", "v2@h.com"]
+
+
+# 4. Per-PDF fan-out: queue order kept, one bad document isolated
+def test_parallel_extraction_isolates_failures():
+    from src.core.rate_limit import RateLimiter
+
+    class FlakyProcessor(FakeProcessor):
+        def convert_pdf_to_images(self, pdf_path):
+            if "BROKEN" in pdf_path:
+                raise RuntimeError("corrupt PDF")
+            return super().convert_pdf_to_images(pdf_path)
+
+    repo = FakeRepo([_pending(f"INV-{i}") for i in range(6)])
+    attachments = [f"dl/INV-{i}.pdf" for i in (5, 0, 3)] + ["dl/BROKEN.pdf", "dl/INV-1.pdf"]
+    agent = InvoiceAgent(
+        FakeEmail([_email("1", "hotel@a.com", attachments)]), FakeLLM(), repo, None, FlakyProcessor(),
+        extraction_concurrency=3, llm_rate_limiter=RateLimiter(rate=1000, burst=5)
+    )
+
+    report = agent.run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-5", "INV-0", "INV-3", "INV-1"]
+    assert report[0]["missing"] == ["INV-2", "INV-4"]
+    assert report[0]["failed_documents"] == ["dl/BROKEN.pdf"]
+    assert agent.llm.extract_calls == 4
+
+
+# 5. Ledger: a rerun skips handled emails; a re-sent PDF is not OCR'd again
+def test_ledger_skips_processed_messages_and_attachments(tmp_path):
+    from src.infra.message_ledger import SQLiteProcessedLedger
+    from src.models import MessageOutcome
+
+    def pdf(name, content):
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    first = _email("1", "hotel@a.com", [pdf("INV-1.pdf", b"%PDF invoice one")])
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2")])
+    ledger = SQLiteProcessedLedger(str(tmp_path / "state.db"))
+    agent = _agent(repo, [first], ledger=ledger)
+
+    assert agent.run_reconciliation_cycle()[0]["received"] == ["INV-1"]
+    assert agent.run_reconciliation_cycle() == []
+    assert agent.llm.extract_calls == 1
+    # Recorded mail is flagged, so the next listing doesn't return it at all
+    assert agent.email.processed == {"1"} and agent.email.listed[-1] == []
+
+    # Recorded before the flag existed (or died before flagging): skipped and flagged now
+    agent.email.processed.clear()
+    assert agent.run_reconciliation_cycle() == []
+    assert agent.email.processed == {"1"}
+
+    # Same bytes under another name (FakeLLM would read it as "copy") + a new PDF
+    resend = _email("2", "hotel@a.com", [pdf("copy.pdf", b"%PDF invoice one"), pdf("INV-2.pdf", b"%PDF invoice two")])
+    agent.email.emails.append(resend)
+    report = agent.run_reconciliation_cycle()
+
+    assert agent.llm.extract_calls == 2
+    assert report[0]["received"] == ["INV-2"] and report[0]["missing"] == []
+    assert ledger.stats() == {"messages": {MessageOutcome.RECONCILED.value: 2}, "attachments": 2}
+
+
+# 6. Extraction cache: the same PDF bytes in another email skip rasterizing and OCR
+def test_extraction_cache_skips_rasterize_and_vision(tmp_path):
+    from src.infra.extraction_cache import SQLiteExtractionCache
+
+    class CountingProcessor(FakeProcessor):
+        calls = 0
+
+        def convert_pdf_to_images(self, pdf_path):
+            CountingProcessor.calls += 1
+            return super().convert_pdf_to_images(pdf_path)
+
+    (tmp_path / "INV-1.pdf").write_bytes(b"%PDF invoice one")
+    (tmp_path / "resent.pdf").write_bytes(b"%PDF invoice one")
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2")])
+    cache = SQLiteExtractionCache(str(tmp_path / "state.db"))
+    email = FakeEmail([_email("1", "hotel@a.com", [str(tmp_path / "INV-1.pdf")])])
+    agent = InvoiceAgent(email, FakeLLM(), repo, None, CountingProcessor(), extraction_cache=cache)
+
+    agent.run_reconciliation_cycle()
+    repo.invoices[0].status = InvoiceStatus.PENDING
+    email.emails = [_email("2", "hotel@a.com", [str(tmp_path / "resent.pdf")])]
+    report = agent.run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-1"]
+    assert agent.llm.extract_calls == 1 and CountingProcessor.calls == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+# 7. Text-layer fast path: digital PDFs never reach rasterize / vision
+def test_text_layer_fast_path():
+    class TextProcessor(FakeProcessor):
+        rasterized = []
+
+        def extract_text(self, pdf_path):
+            # Scanned PDFs have no text layer; the rest print their number
+            return "" if "scan" in pdf_path else f"Tax Invoice No. {os.path.basename(pdf_path)[:-4]} dated 01/01"
+
+        def convert_pdf_to_images(self, pdf_path):
+            TextProcessor.rasterized.append(pdf_path)
+            return super().convert_pdf_to_images(pdf_path)
+
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2"), _pending("INV-3")])
+    attachments = ["dl/INV-1.pdf", "dl/scan/INV-2.pdf", "dl/INV-9.pdf"]
+    agent = InvoiceAgent(FakeEmail([_email("1", "hotel@a.com", attachments)]), FakeLLM(), repo, None, TextProcessor())
+
+    report = agent.run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-1", "INV-2"]
+    assert report[0]["missing"] == ["INV-3"]
+    # INV-9 has text but no pending number in it: vision decides
+    assert TextProcessor.rasterized == ["dl/scan/INV-2.pdf", "dl/INV-9.pdf"]
+    assert agent.llm.extract_calls == 2
+
+
+# 8. Early termination: once nothing is pending anywhere, the rest of the ZIP is not scanned
+def test_stops_scanning_once_all_pending_found():
+    received = _pending("INV-9", vendor="other@b.com")
+    received.status = InvoiceStatus.RECEIVED
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2"), received])
+    attachments = ["dl/INV-2.pdf", "dl/INV-1.pdf", "dl/dup/INV-1.pdf", "dl/INV-9.pdf"]
+    agent = _agent(repo, [_email("1", "hotel@a.com", attachments)], extraction_concurrency=2)
+
+    report = agent.run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-2", "INV-1"] and report[0]["missing"] == []
+    assert report[0]["skipped_documents"] == ["dl/dup/INV-1.pdf", "dl/INV-9.pdf"]
+    assert agent.llm.extract_calls == 2
+
+
+# 8b. ...but while another vendor has pending invoices, the rest may hold them: read in full
+def test_reads_everything_while_other_vendors_pending():
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2"), _pending("INV-9", vendor="other@b.com")])
+    attachments = ["dl/INV-2.pdf", "dl/INV-1.pdf", "dl/dup/INV-1.pdf", "dl/INV-9.pdf"]
+    agent = _agent(repo, [_email("1", "hotel@a.com", attachments)], extraction_concurrency=2)
+
+    report = agent.run_reconciliation_cycle()
+
+    assert report[0]["received"] == ["INV-2", "INV-1", "INV-9"]
+    assert report[0]["skipped_documents"] == []
+    assert agent.llm.extract_calls == 4
+
+
+# 9. Checkpoints: a cycle killed mid-ZIP or mid-commit resumes without new vision calls
+def test_interrupted_cycle_resumes_from_checkpoints(tmp_path):
+    from src.infra.work_table import SQLiteWorkTable
+
+    class Crash(BaseException):
+        pass
+
+    class CrashingLLM(FakeLLM):
+        def extract_invoice_data(self, text_context, image_paths):
+            if "INV-3" in image_paths[0]:
+                raise Crash()
+            return super().extract_invoice_data(text_context, image_paths)
+
+    repo = FakeRepo([_pending(f"INV-{i}") for i in range(1, 5)])
+    emails = [_email("1", "hotel@a.com", ["dl/INV-1.pdf", "dl/INV-2.pdf", "dl/INV-3.pdf"])]
+    table_path = str(tmp_path / "state.db")
+
+    crashing = InvoiceAgent(FakeEmail(emails), CrashingLLM(), repo, None, FakeProcessor(), checkpoints=SQLiteWorkTable(table_path))
+    with pytest.raises(Crash):
+        crashing.run_reconciliation_cycle()
+    assert crashing.llm.extract_calls == 2
+
+    # Restart: only INV-3 is scanned; then the commit dies after reconcile
+    commit = repo.mark_many_as_received
+    repo.mark_many_as_received = lambda receipts: (_ for _ in ()).throw(Crash())
+    restarted = _agent(repo, emails, checkpoints=SQLiteWorkTable(table_path))
+    with pytest.raises(Crash):
+        restarted.run_reconciliation_cycle()
+    assert restarted.llm.extract_calls == 1
+
+    # Second restart: the saved outcome is committed, nothing is re-extracted
+    repo.mark_many_as_received = commit
+    table = SQLiteWorkTable(table_path)
+    final = _agent(repo, emails, checkpoints=table)
+    report = final.run_reconciliation_cycle()
+
+    assert final.llm.extract_calls == 0
+    assert report[0]["received"] == ["INV-1", "INV-2", "INV-3"] and report[0]["missing"] == ["INV-4"]
+    assert [i.status for i in repo.invoices] == [InvoiceStatus.RECEIVED] * 3 + [InvoiceStatus.PENDING]
+    assert table.in_progress() == []
+
+
+# 10. Metrics: every stage and provider call is timed, the cycle report is written
+def test_cycle_metrics_report(tmp_path):
+    import json
+
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2")])
+    emails = [_email("1", "hotel@a.com", ["dl/INV-1.pdf"]), _email("2", "hotel@a.com", [])]
+    agent = _agent(repo, emails, metrics_dir=str(tmp_path))
+
+    agent.run_reconciliation_cycle()
+
+    report = json.loads((tmp_path / "cycle_report.json").read_text())
+    stages = ["download", "unpack", "text", "rasterize", "extract", "reconcile", "draft"]
+    assert all(report["spans"][f"stage.{name}"]["count"] == 2 for name in stages)
+    assert report["spans"]["stage.persist"]["count"] == 1   # one commit pass per vendor
+    assert report["spans"]["llm.extract_invoice_data"]["count"] == 1
+    assert report["spans"]["llm.draft_reply"]["count"] == 2
+    assert report["counters"] == {
+        "documents_total": 1, "documents_vision": 1, "emails_processed": 2, "invoices_received": 1
+    }
+    assert 'span="processor.convert_pdf_to_images"' in (tmp_path / "metrics.prom").read_text()
+
+
+# 11. Ledger: a PDF with no invoice number is final; a failed one is retried, up to max_attempts
+def test_ledger_records_empty_and_bounds_failed_extractions(tmp_path):
+    from src.infra.message_ledger import SQLiteProcessedLedger
+    from src.infra.work_table import SQLiteWorkTable
+
+    def sha(path):
+        return hashlib.sha256((tmp_path / path).read_bytes()).hexdigest()
+
+    class OutageLLM(FakeLLM):
+        def extract_invoice_data(self, text_context, image_paths):
+            if "cover" in image_paths[0]:
+                self.extract_calls += 1
+                return ExtractedInvoiceData([], False, None)
+            if "broken" in image_paths[0]:
+                self.extract_calls += 1
+                raise RuntimeError("503 Service Unavailable")
+            return super().extract_invoice_data(text_context, image_paths)
+
+    def pdf(name):
+        (tmp_path / name).write_bytes(f"%PDF {name}".encode())
+        return str(tmp_path / name)
+
+    state = str(tmp_path / "state.db")
+    ledger = SQLiteProcessedLedger(state)
+    llm = OutageLLM()
+    emails = [
+        _email("1", "hotel@a.com", [pdf("INV-1.pdf"), pdf("cover.pdf")]),
+        _email("2", "hotel@a.com", [pdf("INV-2.pdf"), pdf("broken.pdf")]),
+    ]
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2"), _pending("INV-3")])
+    agent = InvoiceAgent(
+        FakeEmail(emails), llm, repo, None, FakeProcessor(),
+        ledger=ledger, checkpoints=SQLiteWorkTable(state), max_attempts=2
+    )
+
+    report = agent.run_reconciliation_cycle()
+    assert report[0]["received"] == ["INV-1"] and report[1]["received"] == ["INV-2"]
+    assert ledger.is_processed("1") and not ledger.is_processed("2")
+    assert llm.extract_calls == 4
+
+    # Only the failed PDF is sent again (INV-2 comes from the checkpoint); then it's given up on
+    assert agent.run_reconciliation_cycle()[0]["failed_documents"] == [str(tmp_path / "broken.pdf")]
+    assert llm.extract_calls == 5
+    assert ledger.stats()["messages"] == {"RECONCILED": 1, "PARTIAL": 1}
+    assert ledger.get_attachment(sha("broken.pdf")).failed
+    assert ledger.get_attachment(sha("cover.pdf")).invoice_numbers == []
+    assert agent.run_reconciliation_cycle() == []
+    assert llm.extract_calls == 5
+
+
+# 12. Unknown sender whose PDFs match no vendor either: logged, nothing drafted or marked
+def test_unknown_sender_without_matches_is_only_logged():
+    repo = FakeRepo([_pending("INV-A")])
+    agent = _agent(repo, [_email("1", "Spam <noreply@promo.com>", ["dl/FLYER-9.pdf"])])
+
+    report = agent.run_reconciliation_cycle()
+
+    assert report == [{"thread_id": "t-1", "sender": "Spam <noreply@promo.com>", "status": "Log: No pending invoices for noreply@promo.com"}]
+    assert repo.invoices[0].status == InvoiceStatus.PENDING
+
+
+# 13. Checkpoints: a failed extraction is not saved, the restart scans it again
+def test_checkpoints_skip_failed_extractions(tmp_path):
+    from src.infra.work_table import SQLiteWorkTable
+
+    class Crash(BaseException):
+        pass
+
+    class OutageLLM(FakeLLM):
+        def extract_invoice_data(self, text_context, image_paths):
+            if "INV-2" in image_paths[0]:
+                raise Crash()
+            self.extract_calls += 1
+            raise RuntimeError("503 Service Unavailable")
+
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2")])
+    emails = [_email("1", "hotel@a.com", ["dl/INV-1.pdf", "dl/INV-2.pdf"])]
+    table = SQLiteWorkTable(str(tmp_path / "state.db"))
+
+    crashing = InvoiceAgent(FakeEmail(emails), OutageLLM(), repo, None, FakeProcessor(), checkpoints=table)
+    with pytest.raises(Crash):
+        crashing.run_reconciliation_cycle()
+    assert crashing.llm.extract_calls == 1 and table.load_documents("1") == {}
+
+    restarted = _agent(repo, emails, checkpoints=table)
+    assert restarted.run_reconciliation_cycle()[0]["received"] == ["INV-1", "INV-2"]
+    assert restarted.llm.extract_calls == 2
+
+
+# 14. Fetched batch: same stages and report as the cycle, one commit per vendor
+def test_reconcile_many_matches_cycle():
+    def build():
+        return FakeRepo([_pending(f"INV-{i}", vendor=f"v{i % 2}@h.com") for i in range(4)])
+
+    emails = [_email(str(i), f"v{i % 2}@h.com", [f"dl/INV-{i}.pdf"]) for i in range(4)]
+    cycle = _agent(build(), emails).run_reconciliation_cycle()
+
+    repo = build()
+    report = _agent(repo, max_workers=2).reconcile_many(emails)
+
+    assert report == cycle
+    assert repo.commits == 2
+    assert all(i.status == InvoiceStatus.RECEIVED for i in repo.invoices)
+
+
+# 15. A failing email only fails itself: retried next cycle, given up after max_attempts
+def test_failing_email_does_not_wedge_the_cycle(tmp_path):
+    from src.infra.message_ledger import SQLiteProcessedLedger
+    from src.infra.work_table import SQLiteWorkTable
+
+    class GoneEmail(FakeEmail):
+        def fetch_email(self, message_id):
+            if message_id == "gone":
+                raise LookupError("404 Not Found")
+            return super().fetch_email(message_id)
+
+    class FlakyDraftLLM(FakeLLM):
+        drafts_fail = True
+
+        def draft_reply(self, sender, missing_invoices, received_invoices, context):
+            if self.drafts_fail:
+                raise RuntimeError("503 draft")
+            return super().draft_reply(sender, missing_invoices, received_invoices, context)
+
+    table = SQLiteWorkTable(str(tmp_path / "state.db"))
+    ledger = SQLiteProcessedLedger(str(tmp_path / "state.db"))
+    table.start("gone")   # Checkpointed, then deleted from the mailbox
+    repo = FakeRepo([_pending("INV-1"), _pending("INV-2")])
+    llm = FlakyDraftLLM()
+    agent = InvoiceAgent(
+        GoneEmail([_email("1", "hotel@a.com", ["dl/INV-1.pdf"])]), llm, repo, None, FakeProcessor(),
+        ledger=ledger, checkpoints=table, max_attempts=3
+    )
+
+    report = agent.run_reconciliation_cycle()
+    assert [entry["status"].split(" failed")[0] for entry in report] == ["Log: download", "Log: draft"]
+    assert repo.invoices[0].status == InvoiceStatus.RECEIVED   # the draft failing doesn't void receipts
+    assert table.attempts("gone") == 2 and table.attempts("1") == 1
+
+    llm.drafts_fail = False
+    report = agent.run_reconciliation_cycle()
+    assert report[1]["received"] == ["INV-1"] and report[1]["draft_reply"]
+    assert ledger.is_processed("1") and not ledger.is_processed("gone")
+
+    assert agent.run_reconciliation_cycle() == []   # third attempt used up: given up
+    assert ledger.stats()["messages"] == {"RECONCILED": 1, "FAILED": 1}
+    assert table.in_progress() == []
@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.infra.cached_repo import CachingInvoiceRepository
+from src.models import Invoice, InvoiceStatus, InvoiceReceipt
+
+
+def _invoice(number, vendor="hotel@a.com"):
+    return Invoice(id=None, invoice_number=number, vendor_email=vendor, amount=100.0, status=InvoiceStatus.PENDING)
+
+
+# 1. Hits return copies; writes drop only the affected vendor's entry
+def test_read_through_and_precise_invalidation(tmp_path):
+    repo = CachingInvoiceRepository(SQLiteInvoiceRepository(str(tmp_path / "invoices.db")))
+    repo.add_invoices([_invoice("A-1"), _invoice("A-2"), _invoice("B-1", vendor="other@b.com")])
+
+    first = repo.get_pending_invoices_by_sender("hotel@a.com")
+    first[0].status = InvoiceStatus.RECEIVED   # reconcile mutates what it gets back
+    again = repo.get_pending_invoices_by_sender("HOTEL@a.com ")
+    assert [i.status for i in again] == [InvoiceStatus.PENDING, InvoiceStatus.PENDING]
+    repo.get_pending_invoices_by_sender("other@b.com")
+    assert (repo.hits, repo.misses) == (1, 2)
+
+    repo.mark_many_as_received([InvoiceReceipt(invoice_id=again[0].id, filename="a.pdf", thread_id="t1")])
+    assert repo.stats()["entries"] == 1   # other@b.com survives
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("hotel@a.com")] == ["A-2"]
+
+    repo.add_invoice(_invoice("B-2", vendor="other@b.com"))
+    assert len(repo.get_pending_invoices_by_sender("other@b.com")) == 2
+    assert repo.hits == 1
+
+
+# 2. TTL expiry and LRU eviction
+def test_ttl_and_lru(tmp_path):
+    now = [0.0]
+    repo = CachingInvoiceRepository(
+        SQLiteInvoiceRepository(str(tmp_path / "invoices.db")),
+        max_entries=2, ttl_seconds=10, clock=lambda: now[0]
+    )
+    repo.add_invoices([_invoice("A-1", vendor=v) for v in ("a@x.com", "b@x.com", "c@x.com")])
+
+    repo.get_pending_invoices_by_sender("a@x.com")
+    repo.get_pending_invoices_by_sender("b@x.com")
+    repo.get_pending_invoices_by_sender("a@x.com")   # hit: a becomes most recent
+    repo.get_pending_invoices_by_sender("c@x.com")   # evicts b
+    assert repo.evictions == 1
+    repo.get_pending_invoices_by_sender("a@x.com")
+    assert repo.hits == 2
+
+    now[0] = 11
+    repo.get_pending_invoices_by_sender("a@x.com")
+    assert repo.hits == 2 and repo.misses == 4
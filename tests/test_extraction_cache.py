@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.extraction_cache import SQLiteExtractionCache
+from src.models import ExtractedInvoiceData
+
+
+def _data(*numbers):
+    return ExtractedInvoiceData(
+        invoice_numbers=list(numbers), detected_poc_change=True, new_poc_details="new AP contact",
+        amounts=[100.0], hotel_names=["Hotel A"]
+    )
+
+
+# 1. Keyed by hash + version, email-specific POC fields never cached
+def test_cache_roundtrip_and_versioning(tmp_path):
+    path = str(tmp_path / "state.db")
+    cache = SQLiteExtractionCache(path)
+    cache.put("aaa", "model/prompt-v1", _data("INV-1"))
+
+    hit = SQLiteExtractionCache(path).get("aaa", "model/prompt-v1")
+    assert hit.invoice_numbers == ["INV-1"] and hit.amounts == [100.0] and hit.hotel_names == ["Hotel A"]
+    assert hit.detected_poc_change is False and hit.new_poc_details is None
+    assert cache.get("aaa", "model/prompt-v2") is None
+    assert cache.get("bbb", "model/prompt-v1") is None
+
+
+# 2. Size bound: least recently used entries go first; hit rate reported
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteExtractionCache(str(tmp_path / "state.db"))
+    cache.put("a", "v", _data("INV-A"))
+    cache.max_bytes = 2 * cache.stats()["bytes"]
+    cache.put("b", "v", _data("INV-B"))
+    cache.get("a", "v")                     # "b" is now the least recently used
+    cache.put("c", "v", _data("INV-C"))
+
+    assert cache.get("b", "v") is None
+    assert cache.get("a", "v") and cache.get("c", "v")
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["hit_rate"] == 0.75
+
+
+# 3. Lookups never take the write lock; their access-time updates are written in a batch
+def test_get_reads_without_write_lock(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "state.db")
+    cache = SQLiteExtractionCache(path, busy_timeout_ms=100)
+    cache.put("a", "v", _data("INV-A"))
+
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")   # Another process mid-write
+    try:
+        assert cache.get("a", "v").invoice_numbers == ["INV-A"]
+        assert cache.get("a", "v") is not None
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+    hits = lambda: cache._connection().execute("SELECT hits FROM extraction_cache").fetchone()[0]
+    assert hits() == 0
+    cache.flush()
+    assert hits() == 2
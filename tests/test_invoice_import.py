@@ -0,0 +1,104 @@
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.infra.invoice_import import InvoiceImporter
+from src.models import Invoice, InvoiceStatus
+
+
+def _write_csv(path, rows):
+    with open(path, "w") as f:
+        f.write("invoice_number,vendor_email,amount,status,hotel_name\n")
+        for row in rows:
+            f.write(",".join(row) + "\n")
+
+
+# 1. Chunked CSV import with validation + progress
+def test_csv_import_validates_and_reports(tmp_path):
+    src = str(tmp_path / "erp.csv")
+    _write_csv(src, [
+        ("INV-1", "a@hotel.com", "100.5", "", "Hotel A"),
+        ("", "a@hotel.com", "1", "", ""),                # missing number
+        ("INV-2", "not-an-email", "1", "", ""),          # bad vendor
+        ("INV-3", "b@hotel.com", "abc", "", ""),         # bad amount
+        ("INV-4", "b@hotel.com", "", "received", ""),
+    ])
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    seen = []
+
+    result = InvoiceImporter(repo, chunk_size=2, on_progress=lambda p: seen.append(p.row_offset)).import_file(src)
+
+    assert (result.imported, result.rejected) == (2, 3)
+    assert [r[0] for r in result.rejects] == [2, 3, 4]
+    assert seen == [2, 4, 5]
+    by_number = {i.invoice_number: i for i in repo.get_all_invoices()}
+    assert by_number["INV-1"].amount == 100.5 and by_number["INV-4"].status == InvoiceStatus.RECEIVED
+    # Indexes are back after the deferred build
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("a@hotel.com")] == ["INV-1"]
+    # Summary rebuilt once at the end, triggers back on; events still logged per row
+    assert repo.get_kpi_totals() == {"received_count": 1, "received_value": 0.0, "pending_count": 1}
+    assert len(repo.changes_since(0)) == 2
+    repo.add_invoice(Invoice(None, "INV-5", "a@hotel.com", 5.0, InvoiceStatus.PENDING))
+    assert repo.get_kpi_totals()["pending_count"] == 2
+
+
+# 2. Resume: a rerun continues from the committed checkpoint, no duplicates
+def test_jsonl_import_resumes_from_checkpoint(tmp_path):
+    src = str(tmp_path / "erp.jsonl")
+    with open(src, "w") as f:
+        for i in range(10):
+            f.write(json.dumps({"invoice_number": f"INV-{i}", "vendor_email": "a@hotel.com", "amount": i}) + "\n")
+        f.write("{broken\n")
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+
+    first = InvoiceImporter(repo, chunk_size=4).import_file(src, start_offset=0)
+    again = InvoiceImporter(repo, chunk_size=4).import_file(src)
+
+    assert (first.imported, first.rejected, first.row_offset) == (10, 1, 11)
+    assert (again.imported, again.row_offset) == (0, 11)
+    assert len(repo.get_all_invoices()) == 10
+
+
+# 2b. An import killed while the summary was deferred: the next start re-creates the triggers and rebuilds it
+def test_deferred_summary_repaired_on_restart(tmp_path):
+    path = str(tmp_path / "invoices.db")
+    repo = SQLiteInvoiceRepository(path)
+    repo.defer_summary()
+    repo.add_invoices([Invoice(None, "INV-1", "a@hotel.com", 10.0, InvoiceStatus.PENDING)])
+    assert repo.get_kpi_totals()["pending_count"] == 0
+
+    restarted = SQLiteInvoiceRepository(path)
+    assert restarted.get_kpi_totals()["pending_count"] == 1
+    restarted.add_invoice(Invoice(None, "INV-2", "a@hotel.com", 10.0, InvoiceStatus.PENDING))
+    assert restarted.get_kpi_totals()["pending_count"] == 2
+
+
+# 3. A new export saved under the same name starts over instead of inheriting the old offset
+def test_new_export_with_same_name_is_imported(tmp_path):
+    src = str(tmp_path / "erp.csv")
+    _write_csv(src, [("INV-1", "a@hotel.com", "1", "", ""), ("INV-2", "a@hotel.com", "2", "", "")])
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    InvoiceImporter(repo).import_file(src)
+
+    _write_csv(src, [("INV-3", "b@hotel.com", "3", "", ""), ("INV-4", "b@hotel.com", "4", "", "")])
+    os.utime(src, ns=(os.stat(src).st_atime_ns, os.stat(src).st_mtime_ns + 1_000_000_000))
+    result = InvoiceImporter(repo).import_file(src)
+
+    assert (result.imported, result.row_offset) == (2, 2)
+    assert sorted(i.invoice_number for i in repo.get_all_invoices()) == ["INV-1", "INV-2", "INV-3", "INV-4"]
+
+
+# 4. Same importer on the SQLAlchemy repository (INVOICE_DB_URL): checkpoints and deferred indexes
+def test_import_into_sqlalchemy_repository(tmp_path):
+    from src.infra.sqlalchemy_db import SQLAlchemyInvoiceRepository
+    src = str(tmp_path / "erp.csv")
+    _write_csv(src, [("INV-1", "a@hotel.com", "1", "", ""), ("INV-2", "a@hotel.com", "2", "", ""), ("INV-3", "", "3", "", "")])
+    repo = SQLAlchemyInvoiceRepository(f"sqlite:///{tmp_path / 'invoices.db'}")
+
+    first = InvoiceImporter(repo, chunk_size=2).import_file(src)
+    again = InvoiceImporter(repo, chunk_size=2).import_file(src)
+
+    assert (first.imported, first.rejected, again.imported) == (2, 1, 0)
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("a@hotel.com")] == ["INV-1", "INV-2"]
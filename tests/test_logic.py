@@ -3,6 +3,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.core.logic import ReconciliationService
+from src.core.assignment import score_matrix, max_score_assignment, STRICT_SCORE
+from src.core.matching import InvoiceMatchIndex, find_invoice_ids_in_text, invoice_id_candidates, normalize_invoice_id
 from src.core.agent import InvoiceAgent
 from src.models import Invoice, InvoiceStatus
 
@@ -37,4 +39,69 @@ def test_email_extraction():
 
     assert agent._extract_email_address(raw_1) == "orionbee13@gmail.com"
     assert agent._extract_email_address(raw_2) == "orionbee13@gmail.com"
-    assert agent._extract_email_address(raw_3) == "billing@hotel.com"
\ No newline at end of file
+    assert agent._extract_email_address(raw_3) == "billing@hotel.com"
+
+# 3. Test the Matcher Index (same answer as the pairwise scan)
+def test_match_index_parity():
+    expected = ["H29HL25100006225", "H20HL26100000352", "INV-001", "M03HL25100004993", "FB0426"]
+    extracted = [
+        "H29HL25100006225",   # strict
+        "inv_00I",            # normalized
+        "X20HL26100000352",   # suffix (noisy prefix)
+        "M03HL2510004993",    # fuzzy (dropped char)
+        "UNKNOWN-999",        # no match
+    ]
+    index = InvoiceMatchIndex(expected)
+
+    for extracted_id in extracted:
+        brute = next((e for e in expected if ReconciliationService._is_match(e, extracted_id)), None)
+        assert index.find(extracted_id) == brute
+
+    assert index.find("UNKNOWN-999") is None
+
+
+# 4. Test Batch Mode (optimal one-to-one assignment)
+def test_reconciliation_optimal_assignment():
+    # Both noisy IDs fuzzily match the first row; greedy lets the first one claim it
+    pending = [
+        Invoice(id=1, invoice_number="H29HL25100006225", vendor_email="v@t.com", amount=100, status=InvoiceStatus.PENDING),
+        Invoice(id=2, invoice_number="H29HL25100006252", vendor_email="v@t.com", amount=100, status=InvoiceStatus.PENDING),
+    ]
+    extracted_ids = ["H29HL2510000625", "H29HL25100006252"]
+
+    greedy = ReconciliationService.reconcile([Invoice(**vars(i)) for i in pending], extracted_ids)
+    optimal = ReconciliationService.reconcile(pending, extracted_ids, optimal=True)
+
+    assert greedy.received_invoices == ["H29HL25100006225"]
+    assert sorted(optimal.received_invoices) == ["H29HL25100006225", "H29HL25100006252"]
+    assert optimal.missing_invoices == []
+
+    # Input order never changes the batch result
+    shuffled = ReconciliationService.reconcile(pending[::-1], extracted_ids[::-1], optimal=True)
+    assert sorted(shuffled.received_invoices) == sorted(optimal.received_invoices)
+
+
+# 4b. A stronger stage always wins: two suffix pairs (2.6 + 2.6) don't displace one strict pair (4.0)
+def test_optimal_assignment_keeps_stage_precedence():
+    expected = ["KX7742551983", "PLM551983"]
+    extracted = ["KX7742551983", "QWRTZMN42551983"]
+    scores = score_matrix(expected, extracted)
+    assert scores[0, 0] == STRICT_SCORE and scores[0, 1] + scores[1, 0] > STRICT_SCORE
+
+    assert max_score_assignment(scores) == [(0, 0)]
+
+
+# 5. Test Text-Layer Scan (normalized keys only, split IDs rejoined)
+def test_find_invoice_ids_in_text():
+    text = "TAX INVOICE\nInvoice No: INV 2024 0O1.\nRef: inv-2024-002, GSTIN 29ABCDE1234F1Z5\nTotal 4,500.00"
+    expected = ["INV-2024-002", "INV-2024-001", "H29HL25100006225"]
+
+    assert find_invoice_ids_in_text(text, expected) == ["INV-2024-001", "INV-2024-002"]
+    # No fuzzy / suffix matching on free text
+    assert find_invoice_ids_in_text("Folio H29HL25100006252", expected) == []
+    assert find_invoice_ids_in_text("", expected) == []
+    # Without an expected list: the keys to look up, words with no digit left out
+    keys = invoice_id_candidates(text)
+    assert normalize_invoice_id("INV-2024-001") in keys and normalize_invoice_id("inv-2024-002") in keys
+    assert normalize_invoice_id("TAX INVOICE") not in keys
+    assert invoice_id_candidates("Monthly offers for our guests") == []
@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.message_ledger import SQLiteProcessedLedger
+from src.models import MessageOutcome, ProcessedAttachment
+
+
+# 1. Outcomes persist across instances; a failure never overwrites a good extraction
+def test_ledger_roundtrip(tmp_path):
+    path = str(tmp_path / "state.db")
+    ledger = SQLiteProcessedLedger(path)
+    ledger.record_message("m1", "t1", "hotel@a.com", MessageOutcome.RECONCILED, [
+        ProcessedAttachment("aaa", "a.pdf", ["INV-1", "INV-2"]),
+        ProcessedAttachment("bbb", "b.pdf", [], failed=True),
+    ])
+    ledger.record_message("m2", "t1", "hotel@a.com", MessageOutcome.RECONCILED, [
+        ProcessedAttachment("aaa", "a-again.pdf", [], failed=True),
+        ProcessedAttachment("bbb", "b.pdf", ["INV-3"]),
+    ])
+
+    reopened = SQLiteProcessedLedger(path)
+    assert reopened.is_processed("m1") and reopened.is_processed("m2")
+    assert not reopened.is_processed("m3")
+    assert reopened.get_attachment("aaa").invoice_numbers == ["INV-1", "INV-2"]
+    assert reopened.get_attachment("bbb").invoice_numbers == ["INV-3"]
+    assert not reopened.get_attachment("bbb").failed
+    assert reopened.get_attachment("zzz") is None
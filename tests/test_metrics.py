@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+from src.core.metrics import CycleMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# 1. Spans aggregate count / total / max; bottleneck is the slowest stage
+def test_spans_counters_and_exports(tmp_path):
+    clock = FakeClock()
+    metrics = CycleMetrics(clock=clock)
+
+    for seconds in (1.0, 3.0):
+        with metrics.span("stage.extract"):
+            clock.now += seconds
+    with metrics.span("stage.download"):
+        clock.now += 0.5
+    metrics.incr("documents_vision", 2)
+    metrics.finish()
+
+    report = metrics.report()
+    assert report["duration_seconds"] == 4.5
+    assert report["spans"]["stage.extract"] == {"count": 2, "total_seconds": 4.0, "avg_seconds": 2.0, "max_seconds": 3.0}
+    assert report["bottleneck"] == "stage.extract"
+    assert report["counters"] == {"documents_vision": 2}
+
+    text = metrics.to_prometheus()
+    assert '# TYPE autoemail_cycle_span_total_seconds gauge' in text
+    assert 'autoemail_cycle_span_total_seconds{span="stage.extract"} 4.0' in text
+    assert 'autoemail_cycle_events{name="documents_vision"} 2' in text
+
+    metrics.write(str(tmp_path))
+    assert json.loads((tmp_path / "cycle_report.json").read_text()) == report
+    assert (tmp_path / "metrics.prom").read_text() == text
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+import pytest
+from src.core.pipeline import Stage, run_pipeline
+
+
+# 1. Parallel stages still yield in source order; ordered stages see source order
+def test_pipeline_preserves_order():
+    seen = []
+
+    def jitter(x):
+        time.sleep(0.001 * ((x * 7) % 5))
+        return x
+
+    stages = [
+        Stage("jitter", jitter, workers=4),
+        Stage("record", lambda x: seen.append(x) or x * 10, ordered=True),
+    ]
+
+    assert list(run_pipeline(range(30), stages)) == [x * 10 for x in range(30)]
+    assert seen == list(range(30))
+
+
+# 2. A slow consumer stalls the source: in-flight items stay bounded
+def test_pipeline_backpressure_bounds_in_flight():
+    pulled = [0]
+    lock = threading.Lock()
+
+    def source():
+        for i in range(100):
+            with lock:
+                pulled[0] += 1
+            yield i
+
+    results = run_pipeline(source(), [Stage("a", lambda x: x, workers=2, queue_size=1)], max_in_flight=3)
+    consumed = 0
+    for _ in results:
+        consumed += 1
+        time.sleep(0.002)
+        with lock:
+            assert pulled[0] - consumed <= 4
+    assert consumed == 100
+
+
+# 3. A stage error surfaces at its item's turn and stops the workers
+def test_pipeline_propagates_errors():
+    def explode(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return x
+
+    results = []
+    with pytest.raises(ValueError, match="bad item"):
+        for value in run_pipeline(range(10), [Stage("explode", explode, workers=3)]):
+            results.append(value)
+
+    assert results == [0, 1, 2]
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
@@ -0,0 +1,22 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.rate_limit import RateLimiter
+
+
+def test_token_bucket_burst_then_rate():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=3, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        limiter.acquire()
+
+    # 3 immediate (burst), then one token every 0.5s
+    assert sleeps == [0.5, 0.5]
+    assert now[0] == 1.0
@@ -0,0 +1,104 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from difflib import SequenceMatcher
+from src.core import similarity
+from src.core.matching import normalize_invoice_id, FUZZY_THRESHOLD
+
+# Real invoice numbers from the stress test set, paired with OCR-style misreads
+OCR_PAIRS = [
+    ("M29HL2S100014990", "M29HL25100014990"),   # S/5 swap
+    ("H29HLS000002680", "H29HL5000002680"),
+    ("R137152424-00065", "R13715242400065"),    # separator dropped
+    ("FM0602BIL0005457", "FM0602BlL0005457"),   # I/l
+    ("H21HL26100000385", "H21HL2610000385"),    # missing zero
+    ("M03HL25100004993", "MO3HL25100004993"),
+    ("24-25FOBILL3981", "2425F0BILL398"),       # truncated
+    ("RH7HLS900006405", "RH7HL5900006405"),
+    ("HHL-ES000001113", "HHLES000001II3"),
+    ("H2SHL23000001762", "H25HL23000001762"),
+    ("FM1544BIL0003325", "FM1544BIL0003352"),   # transposition
+    # Different invoices from the same hotel chain must stay apart
+    ("H29HL25100006225", "H20HL26100000352"),
+    ("M02HL25100001772", "M03HL25100004993"),
+    ("R201447824-00064", "R137152424-00065"),
+    ("KAGUKA/24/2758", "BSEC-2/2051"),
+    ("SBB000119", "FB0426"),
+]
+
+
+def _baseline(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+# 1. Same decision as SequenceMatcher on these sample IDs
+def test_matches_agrees_with_sequence_matcher_on_samples():
+    for expected, extracted in OCR_PAIRS:
+        s1, s2 = normalize_invoice_id(expected), normalize_invoice_id(extracted)
+        assert similarity.matches(s1, s2, FUZZY_THRESHOLD) == (_baseline(s1, s2) > FUZZY_THRESHOLD), (expected, extracted)
+
+
+# 2. The LCS never undercounts matching characters, so the bound is safe to reject on
+def test_lcs_bound_never_below_sequence_matcher():
+    for expected, extracted in OCR_PAIRS:
+        s1, s2 = normalize_invoice_id(expected), normalize_invoice_id(extracted)
+        assert similarity.lcs_bound(s1, s2) >= _baseline(s1, s2)
+        assert similarity.score(s1, s2) == _baseline(s1, s2)
+
+
+# 3. matches() is exactly "score above threshold", early exit included
+def test_matches_agrees_with_score():
+    for expected, extracted in OCR_PAIRS:
+        for threshold in (0.0, 0.5, 0.7, 0.85, 0.95, 1.0):
+            assert similarity.matches(expected, extracted, threshold) == (similarity.score(expected, extracted) > threshold)
+
+
+def test_score_edge_cases():
+    assert similarity.score("INV001", "INV001") == 1.0
+    assert similarity.score("", "") == 1.0
+    assert similarity.score("ABC", "") == 0.0
+    assert similarity.score("ABCD", "WXYZ") == 0.0
+    assert similarity.score("AB", "BA") == similarity.score("BA", "AB") == 0.5
+    assert similarity.lcs_bound("", "") == 1.0 and similarity.lcs_bound("ABC", "") == 0.0
+
+
+# 4. Bench pairs where the LCS bound alone overshot the threshold: must not match
+BOUND_OVERSHOOTS = [
+    ("M27HL25IOOIOI434", "MI9HL25IOOOI36I4", 0.75, 0.6875),
+    ("H33HL26IOOOOI97O", "H33IHL25IO9OOO4649", 12 / 17, 11 / 17),
+    ("MI2HL25IOOOOI472", "MI8HL25IOOZOI3O95I", 12 / 17, 11 / 17),
+]
+
+
+def test_bound_overshoots_do_not_match():
+    for expected, extracted, bound, ratio in BOUND_OVERSHOOTS:
+        assert similarity.lcs_bound(expected, extracted) == bound
+        assert similarity.score(expected, extracted) == ratio
+        assert not similarity.matches(expected, extracted, FUZZY_THRESHOLD), (expected, extracted)
+
+
+# 5. Same decision as SequenceMatcher on random OCR-style noise, both argument orders
+def test_matches_agrees_with_sequence_matcher_on_noise():
+    import random
+    rng = random.Random(7)
+    alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+
+    def ocr_noise(value):
+        chars = list(value)
+        for _ in range(rng.randint(0, 5)):
+            i = rng.randrange(len(chars))
+            op = rng.random()
+            if op < 0.6:
+                chars[i] = rng.choice(alphabet)
+            elif op < 0.8 and len(chars) > 1:
+                del chars[i]
+            else:
+                chars.insert(i, rng.choice(alphabet))
+        return "".join(chars)
+
+    for _ in range(3000):
+        expected = "".join(rng.choice(alphabet) for _ in range(rng.randint(6, 16)))
+        s1, s2 = normalize_invoice_id(expected), normalize_invoice_id(ocr_noise(expected))
+        assert similarity.matches(s1, s2, FUZZY_THRESHOLD) == (_baseline(s1, s2) > FUZZY_THRESHOLD), (s1, s2)
+        assert similarity.matches(s2, s1, FUZZY_THRESHOLD) == (_baseline(s2, s1) > FUZZY_THRESHOLD), (s2, s1)
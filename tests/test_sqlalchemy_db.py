@@ -0,0 +1,123 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.sqlalchemy_db import SQLAlchemyInvoiceRepository
+from src.models import Invoice, InvoiceStatus, InvoiceReceipt
+
+
+def _invoice(number, vendor="hotel@a.com", amount=100.0, workspace="Acme"):
+    return Invoice(id=None, invoice_number=number, vendor_email=vendor, amount=amount,
+                   status=InvoiceStatus.PENDING, workspace=workspace)
+
+
+def _repo(tmp_path):
+    # File-backed SQLite stand-in for a server database (real pool, WAL)
+    return SQLAlchemyInvoiceRepository(f"sqlite:///{tmp_path / 'invoices.db'}", pool_size=2, max_overflow=2)
+
+
+# 1. Same repository contract as the SQLite implementation
+def test_lookups_and_bulk_receipts(tmp_path):
+    repo = _repo(tmp_path)
+    repo.add_invoices([_invoice("H29HL25100006225"), _invoice("INV-001"), _invoice("X-1", vendor="other@b.com")])
+    repo.add_vendor_contact("hotel@a.com", "@a.com")
+
+    pending = repo.get_pending_invoices_by_sender("Frontdesk@A.com")
+    assert [i.invoice_number for i in pending] == ["H29HL25100006225", "INV-001"]
+
+    found = repo.find_pending_by_invoice_keys(["inv_00I", "Z29HL25100006225", "UNKNOWN"])
+    assert [i.invoice_number for i in found] == ["H29HL25100006225", "INV-001"]
+    assert repo.has_pending_from_other_vendors("hotel@a.com")
+    assert repo.has_pending_from_other_vendors("other@b.com")
+
+    repo.mark_many_as_received([InvoiceReceipt(pending[0].id, "a.pdf", "t1")])
+    repo.update_reminder_timestamp("hotel@a.com")
+    remaining = repo.get_pending_invoices_by_sender("hotel@a.com")
+    assert [i.invoice_number for i in remaining] == ["INV-001"]
+    assert remaining[0].last_reminder_sent_at is not None
+    assert repo.get_vendors_needing_reminders() == ["other@b.com"]
+
+    kpis = repo.get_kpi_totals()
+    assert (kpis["received_count"], kpis["received_value"], kpis["pending_count"]) == (1, 100.0, 2)
+    assert repo.get_client_breakdown() == [{"workspace": "Acme", "amount": 100.0}]
+
+
+def test_transaction_rollback_and_pagination(tmp_path):
+    repo = _repo(tmp_path)
+    try:
+        with repo.transaction():
+            repo.add_invoice(_invoice("INV-1"))   # nested: joins the outer transaction
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert repo.get_all_invoices() == []
+
+    repo.add_invoices([_invoice(f"INV-{i}") for i in range(5)])
+    numbers = [i.invoice_number for i in repo.iter_invoices(page_size=2, status=InvoiceStatus.PENDING)]
+    assert numbers == [f"INV-{i}" for i in range(5)]
+
+
+def test_status_summary_maintained_by_writes(tmp_path):
+    repo = _repo(tmp_path)
+    repo.add_invoices([_invoice("INV-1", amount=10), _invoice("INV-2", amount=20), _invoice("INV-3", vendor="b@hotel.com", amount=5)])
+    first = repo.get_pending_invoices_by_sender("hotel@a.com")[0]
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")] * 2)   # repeats don't double count
+    repo.mark_as_received("INV-3", "b.pdf", "t2")
+    repo.delete_pending_invoices("hotel@a.com")
+
+    assert repo.get_vendor_breakdown() == [
+        {"vendor_email": "b@hotel.com", "pending_count": 0, "pending_value": 0, "received_count": 1, "received_value": 5.0},
+        {"vendor_email": "hotel@a.com", "pending_count": 0, "pending_value": 0, "received_count": 1, "received_value": 10.0},
+    ]
+    summary_before = repo.get_hotel_breakdown()
+    repo.rebuild_summary()
+    assert repo.get_hotel_breakdown() == summary_before == [
+        {"hotel_name": None, "gstin": None, "invoice_count": 2, "total_value": 15.0}
+    ]
+
+
+def test_event_log_changes_since(tmp_path):
+    repo = _repo(tmp_path)
+    repo.add_invoices([_invoice("INV-1"), _invoice("INV-2")])
+    first, second = repo.get_pending_invoices_by_sender("hotel@a.com")
+    repo.record_kickoff("hotel@a.com", "t-kick", [first.id])
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")] * 2)
+    repo.update_reminder_timestamp("hotel@a.com")
+    repo.delete_pending_invoices("hotel@a.com")
+
+    events = repo.changes_since(0)
+    assert [(e.event_type.value, e.invoice_id) for e in events] == [
+        ("CREATED", first.id), ("CREATED", second.id), ("KICKOFF_SENT", first.id),
+        ("STATUS_CHANGED", first.id), ("REMINDER_SENT", second.id), ("DELETED", second.id),
+    ]
+    assert events[3].thread_id == "t1" and events[5].old_status == InvoiceStatus.PENDING
+    assert repo.changes_since(events[-1].seq) == []
+
+
+# A DB created by the SQLite repository keeps its triggers: writes are not summarized / logged twice
+def test_trigger_maintained_db_not_double_counted(tmp_path):
+    from src.infra.sqlite_db import SQLiteInvoiceRepository
+    SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    repo = _repo(tmp_path)
+
+    repo.add_invoices([_invoice("INV-1", amount=10), _invoice("INV-2", amount=20)])
+    first = repo.get_pending_invoices_by_sender("hotel@a.com")[0]
+    repo.record_kickoff("hotel@a.com", "t-kick", [first.id])
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")])
+
+    assert repo.get_kpi_totals()["pending_count"] == 1
+    summary_before = repo.get_vendor_breakdown()
+    repo.rebuild_summary()
+    assert repo.get_vendor_breakdown() == summary_before
+    assert [e.event_type.value for e in repo.changes_since(0)] == [
+        "CREATED", "CREATED", "KICKOFF_SENT", "STATUS_CHANGED"
+    ]
+
+    # Bulk load: summary triggers off, one rebuild at the end; a restart mid-load repairs them too
+    repo.defer_summary()
+    repo.add_invoices([_invoice("INV-3", amount=30)])
+    assert repo.get_kpi_totals()["pending_count"] == 1
+    restarted = _repo(tmp_path)
+    assert restarted.get_kpi_totals()["pending_count"] == 2
+    restarted.add_invoices([_invoice("INV-4", amount=40)])
+    assert restarted.get_kpi_totals()["pending_count"] == 3
@@ -0,0 +1,218 @@
+import sys
+import os
+import sqlite3
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.infra.sqlite_db import SQLiteInvoiceRepository
+from src.models import Invoice, InvoiceStatus, InvoiceReceipt
+
+
+def _invoice(number, vendor="hotel@a.com", amount=100.0):
+    return Invoice(id=None, invoice_number=number, vendor_email=vendor, amount=amount, status=InvoiceStatus.PENDING)
+
+
+# 1. Normalized keys: computed on insert, backfilled for old databases
+def test_invoice_keys_backfilled_and_indexed(tmp_path):
+    db_path = str(tmp_path / "invoices.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE invoices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_number TEXT, vendor_email TEXT,
+            amount REAL, status TEXT, gstin TEXT, hotel_name TEXT, workspace TEXT,
+            thread_id TEXT, filename TEXT, last_reminder_sent_at TIMESTAMP, received_at TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO invoices (invoice_number, vendor_email, amount, status) VALUES ('H29HL25100006225', 'hotel@a.com', 1, 'PENDING')")
+    conn.commit()
+    conn.close()
+
+    repo = SQLiteInvoiceRepository(db_path)
+    repo.add_invoice(_invoice("INV-001", vendor="other@b.com"))
+
+    found = repo.find_pending_by_invoice_keys(["inv_00I", "X29HL25100006225", "UNKNOWN"])
+    assert [i.invoice_number for i in found] == ["H29HL25100006225", "INV-001"]
+
+
+# 2. Connection layer: WAL, rollback on error, concurrent readers + writer
+def test_transaction_rollback_and_wal(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    assert repo._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    try:
+        with repo.transaction():
+            repo.add_invoice(_invoice("INV-1"))   # nested: joins the outer transaction
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert repo.get_all_invoices() == []
+
+
+def test_concurrent_reads_and_writes(tmp_path):
+    import threading
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    errors = []
+
+    def writer(prefix):
+        try:
+            for i in range(50):
+                repo.add_invoice(_invoice(f"{prefix}-{i}"))
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(50):
+                repo.get_pending_invoices_by_sender("hotel@a.com")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(p,)) for p in "AB"] + [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(repo.get_all_invoices()) == 100
+
+
+# 3. Sender resolution through the vendor table (no substring matches)
+def test_sender_resolution_via_vendor_contacts(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    repo.add_invoice(_invoice("INV-1", vendor="Billing@Hotel.com"))
+    repo.add_invoice(_invoice("INV-2", vendor="ops@hotel.com"))
+    repo.add_invoice(_invoice("INV-3", vendor="mybilling@hotel.com.evil"))
+
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("billing@hotel.com")] == ["INV-1"]
+    assert repo.get_pending_invoices_by_sender("unknown@hotel.com") == []
+
+    # Several billing addresses, then the whole domain, for one hotel
+    repo.add_vendor_contact("billing@hotel.com", "accounts@hotel.com")
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("accounts@hotel.com")] == ["INV-1"]
+
+    repo.add_vendor_contact("ops@hotel.com", "@hotel.com")
+    assert [i.invoice_number for i in repo.get_pending_invoices_by_sender("frontdesk@hotel.com")] == ["INV-2"]
+
+
+# 4. Bulk writes: one transaction, updates target the primary key only
+def test_bulk_add_and_mark_by_primary_key(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    # Same invoice number at two different hotels
+    repo.add_invoices([_invoice("INV-1", vendor="a@hotel.com"), _invoice("INV-1", vendor="b@hotel.com"), _invoice("INV-2", vendor="a@hotel.com")])
+
+    pending_a = repo.get_pending_invoices_by_sender("a@hotel.com")
+    repo.mark_many_as_received([InvoiceReceipt(inv.id, "inv.pdf", "t-1") for inv in pending_a])
+
+    statuses = {(i.invoice_number, i.vendor_email): i.status for i in repo.get_all_invoices()}
+    assert statuses[("INV-1", "a@hotel.com")] == InvoiceStatus.RECEIVED
+    assert statuses[("INV-2", "a@hotel.com")] == InvoiceStatus.RECEIVED
+    assert statuses[("INV-1", "b@hotel.com")] == InvoiceStatus.PENDING
+    # Early termination check: only b@ still has pending invoices
+    assert repo.has_pending_from_other_vendors("a@hotel.com")
+    assert not repo.has_pending_from_other_vendors("b@hotel.com")
+
+
+# 5. Dashboard aggregates computed in SQL
+def test_analytics_aggregates(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    rows = [
+        Invoice(None, "INV-1", "a@hotel.com", 100.0, InvoiceStatus.PENDING, gstin="G1", hotel_name="Hotel A", workspace="Acme"),
+        Invoice(None, "INV-2", "a@hotel.com", 250.0, InvoiceStatus.PENDING, gstin="G1", hotel_name="Hotel A", workspace="Acme"),
+        Invoice(None, "INV-3", "b@hotel.com", 50.0, InvoiceStatus.PENDING, gstin="G2", hotel_name="Hotel B", workspace="Globex"),
+    ]
+    repo.add_invoices(rows)
+    received = [i for i in repo.get_all_invoices() if i.invoice_number != "INV-1"]
+    repo.mark_many_as_received([InvoiceReceipt(i.id, "f.pdf", "t") for i in received])
+
+    assert repo.get_kpi_totals() == {"received_count": 2, "received_value": 300.0, "pending_count": 1}
+    assert repo.get_client_breakdown() == [{"workspace": "Acme", "amount": 250.0}, {"workspace": "Globex", "amount": 50.0}]
+    assert repo.get_hotel_breakdown() == [
+        {"hotel_name": "Hotel A", "gstin": "G1", "invoice_count": 1, "total_value": 250.0},
+        {"hotel_name": "Hotel B", "gstin": "G2", "invoice_count": 1, "total_value": 50.0},
+    ]
+    assert [r["invoice_number"] for r in repo.get_recent_received(limit=1)] == ["INV-3"]
+
+
+# 6. Keyset pagination with filters + streaming iterator
+def test_keyset_pagination(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    repo.add_invoices([_invoice(f"INV-{i}", vendor="a@hotel.com" if i % 2 else "b@hotel.com") for i in range(7)])
+
+    page = repo.get_invoice_page(vendor_email="a@hotel.com", limit=2)
+    assert [i.invoice_number for i in page.invoices] == ["INV-1", "INV-3"]
+    page = repo.get_invoice_page(vendor_email="a@hotel.com", limit=2, cursor=page.next_cursor)
+    assert [i.invoice_number for i in page.invoices] == ["INV-5"]
+    assert page.next_cursor is None
+
+    assert len(list(repo.iter_invoices(page_size=3, status=InvoiceStatus.PENDING))) == 7
+    assert list(repo.iter_invoices(status=InvoiceStatus.RECEIVED)) == []
+    assert repo.get_invoice_page(vendor_email="nobody@x.com").invoices == []
+
+
+# 7. Migrations: first-generation schema upgraded in place, data kept
+def test_migrations_upgrade_legacy_db_in_place(tmp_path):
+    db_path = str(tmp_path / "invoices.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE invoices (id INTEGER PRIMARY KEY AUTOINCREMENT, invoice_number TEXT, vendor_email TEXT, amount REAL, status TEXT, gstin TEXT, hotel_name TEXT, workspace TEXT, thread_id TEXT, filename TEXT)")
+    conn.execute("INSERT INTO invoices (invoice_number, vendor_email, amount, status) VALUES ('INV-OLD', 'a@hotel.com', 10, 'RECEIVED')")
+    conn.commit()
+    conn.close()
+
+    repo = SQLiteInvoiceRepository(db_path)
+    assert repo.schema_version == SQLiteInvoiceRepository.MIGRATIONS[-1][0]
+
+    [old] = repo.get_all_invoices()
+    assert old.invoice_number == "INV-OLD" and old.received_at is None
+    indexes = {row[1] for row in repo._connection().execute("PRAGMA index_list(invoices)")}
+    assert {"idx_invoices_status_vendor_email", "idx_invoices_status_reminder", "idx_invoices_number"} <= indexes
+
+    # Timestamps now round-trip into the model; reopening is a no-op
+    repo.update_reminder_timestamp("a@hotel.com")
+    repo.add_invoice(_invoice("INV-NEW", vendor="a@hotel.com"))
+    repo.update_reminder_timestamp("a@hotel.com")
+    reopened = SQLiteInvoiceRepository(db_path)
+    new = [i for i in reopened.get_all_invoices() if i.invoice_number == "INV-NEW"][0]
+    assert new.last_reminder_sent_at is not None
+
+
+# 8. Materialized summary: triggers keep it equal to a full GROUP BY
+def test_status_summary_maintained_by_triggers(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    repo.add_invoices([_invoice("INV-1", amount=10), _invoice("INV-2", amount=20), _invoice("INV-3", vendor="b@hotel.com", amount=5)])
+    first = repo.get_pending_invoices_by_sender("hotel@a.com")[0]
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")])
+    repo.mark_as_received("INV-3", "b.pdf", "t2")
+    repo.update_reminder_timestamp("hotel@a.com")
+    repo.delete_pending_invoices("hotel@a.com")
+
+    conn = repo._connection()
+    summary = conn.execute("SELECT vendor_email, status, invoice_count, total_amount FROM invoice_summary ORDER BY 1, 2").fetchall()
+    recomputed = conn.execute("SELECT vendor_email, status, COUNT(*), SUM(amount) FROM invoices GROUP BY 1, 2 ORDER BY 1, 2").fetchall()
+    assert [tuple(r) for r in summary] == [tuple(r) for r in recomputed] == [
+        ("b@hotel.com", "RECEIVED", 1, 5.0), ("hotel@a.com", "RECEIVED", 1, 10.0)
+    ]
+    assert repo.get_kpi_totals() == {"received_count": 2, "received_value": 15.0, "pending_count": 0}
+    assert [v["vendor_email"] for v in repo.get_vendor_breakdown()] == ["b@hotel.com", "hotel@a.com"]
+
+
+# 9. Append-only event log, read incrementally
+def test_event_log_changes_since(tmp_path):
+    repo = SQLiteInvoiceRepository(str(tmp_path / "invoices.db"))
+    repo.add_invoices([_invoice("INV-1"), _invoice("INV-2")])
+    created = repo.changes_since(0)
+    assert [e.event_type.value for e in created] == ["CREATED", "CREATED"]
+
+    first, second = repo.get_pending_invoices_by_sender("hotel@a.com")
+    repo.record_kickoff("hotel@a.com", "t-kick", [first.id, second.id])
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")])
+    repo.mark_many_as_received([InvoiceReceipt(first.id, "a.pdf", "t1")])   # no transition, no event
+    repo.update_reminder_timestamp("hotel@a.com")
+
+    events = repo.changes_since(created[-1].seq)
+    assert [(e.event_type.value, e.invoice_number) for e in events] == [
+        ("KICKOFF_SENT", "INV-1"), ("KICKOFF_SENT", "INV-2"),
+        ("STATUS_CHANGED", "INV-1"), ("REMINDER_SENT", "INV-2"),
+    ]
+    changed = events[2]
+    assert (changed.old_status, changed.new_status, changed.filename) == (InvoiceStatus.PENDING, InvoiceStatus.RECEIVED, "a.pdf")
+    assert [e.seq for e in repo.changes_since(events[1].seq, limit=1)] == [changed.seq]
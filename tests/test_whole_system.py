@@ -44,8 +44,8 @@ def setup_clean_db():
     
     repo = SQLiteInvoiceRepository()
     
-    for filename, invoice_num in TEST_DATA.items():
-        inv = Invoice(
+    invoices = [
+        Invoice(
             id=None,
             invoice_number=invoice_num,
             vendor_email=SENDER_EMAIL,
@@ -55,7 +55,9 @@ def setup_clean_db():
             hotel_name="TEST_HOTEL",
             workspace="TEST_CLIENT"
         )
-        repo.add_invoice(inv)
+        for invoice_num in TEST_DATA.values()
+    ]
+    repo.add_invoices(invoices)
     print("   ✅ Database seeded.")
 
 def create_zip_payload():